@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark de parse_float (valor a valor) vs parse_float_column (NumPy).
+
+Gera colunas sintéticas nos formatos do docstring de parse_float, confere que
+as duas versões dão resultados bit a bit iguais e mede o tempo de cada uma.
+
+Uso:
+    python3 src/bench_parse_float.py [quantidade] [repeticoes]
+
+Exemplo:
+    python3 src/bench_parse_float.py 200000 3
+"""
+
+import sys
+import random
+import struct
+import time
+
+from worker_csv import parse_float, parse_float_column, np
+
+
+def brazilian_formats(value: float, decimals: int) -> list:
+    """Escreve um número em todos os formatos tratados por parse_float"""
+    text = f"{value:.{decimals}f}"
+    sign = "-" if text.startswith("-") else ""
+    digits = text.lstrip("-").replace(".", "")
+    grouped = ".".join(digits[i:i + 3] for i in range(0, len(digits), 3))
+    head = ".".join(digits[i:i + 3] for i in range(0, len(digits) - 3, 3))
+
+    return [
+        text,                                   # -23.1858
+        text.replace(".", ","),                 # -23,1858
+        sign + grouped,                         # -231.842.640
+        sign + head + "," + digits[-3:],        # -231.842,640
+    ]
+
+
+def generate_values(count: int, seed: int = 42) -> list:
+    """Gera `count` coordenadas/ratings nos formatos suportados"""
+    rng = random.Random(seed)
+    values = []
+    while len(values) < count:
+        kind = rng.random()
+        if kind < 0.45:
+            value = rng.uniform(-24.0, -22.0)      # latitudes SP
+        elif kind < 0.9:
+            value = rng.uniform(-47.5, -46.0)      # longitudes SP
+        else:
+            value = rng.uniform(1.0, 5.0)          # rating
+        values.extend(brazilian_formats(value, rng.randint(4, 10)))
+    values.append("")
+    return values[:count]
+
+
+def same_bits(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return struct.pack("<d", a) == struct.pack("<d", b)
+
+
+def best_time(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    if np is None:
+        print("❌ numpy não instalado: parse_float_column usaria parse_float valor a valor")
+        sys.exit(1)
+
+    values = generate_values(count)
+
+    scalar = [parse_float(v) for v in values]
+    column = parse_float_column(values)
+    mismatches = sum(1 for a, b in zip(scalar, column) if not same_bits(a, b))
+    if mismatches:
+        print(f"❌ {mismatches} valores diferentes entre parse_float e parse_float_column")
+        sys.exit(1)
+
+    t_scalar = best_time(lambda: [parse_float(v) for v in values], repeats)
+    t_column = best_time(lambda: parse_float_column(values), repeats)
+
+    print(f"📊 {count} valores, melhor de {repeats} execuções (resultados idênticos)")
+    print(f"parse_float:        {t_scalar:.3f}s ({count / t_scalar:,.0f} valores/s)")
+    print(f"parse_float_column: {t_column:.3f}s ({count / t_column:,.0f} valores/s)")
+    print(f"Speedup: {t_scalar / t_column:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos workers da Places API contra o servidor local (places_mock_server.py).
+
+Roda worker_places_api.py / worker_enrich_contacts.py como o Node roda
+(processo python3 com argv), apontados para o mock por PLACES_API_BASE_URL,
+e mede de ponta a ponta:
+
+- vazão: chamadas à API com sucesso/s e lugares processados/s;
+- custo dos retries: respostas 429/5xx, % de chamadas a mais e tempo parado
+  em backoff (soma dos "Aguardando Xs" do log do worker);
+- escrita no banco: linhas inseridas+atualizadas em places e
+  places_pending_details (pg_stat_user_tables) por segundo.
+
+O banco deve ser um PostGIS local (DB_HOST=localhost ...): os workers gravam
+de verdade. Lugares sintéticos do mock têm google_place_id "mock-...";
+--cleanup os remove ao final. Um banco descartável:
+    docker run -d --name suphelp-bench -p 5432:5432 -e POSTGRES_USER=admin \
+        -e POSTGRES_PASSWORD=bench -e POSTGRES_DB=suphelp_geo postgis/postgis
+    psql -h localhost -U admin suphelp_geo -f src/setup_complete_db.sql
+    DB_HOST=localhost DB_PASS=bench python3 src/bench_workers.py places
+
+Cenários:
+    places   busca por cidade + keywords (worker_places_api.py cidade keywords max)
+    sweep    varredura por tiles (--bbox da área do mock)
+    details  passe de Place Details da fila (--fields ids antes)
+    enrich   enriquecimento de contatos (worker_enrich_contacts.py all LIMITE)
+
+Uso:
+    python3 src/bench_workers.py <cenário> [opções] [-- argumentos do worker]
+
+Exemplo:
+    python3 src/bench_workers.py places --latency-ms 150 --burst-429 5/50 --repeat 3
+    python3 src/bench_workers.py enrich --mock-url http://127.0.0.1:8765 -- all 500
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+import db
+from places_mock_server import SYNTHETIC_AREA, create_server, parse_burst
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Worker e argumentos padrão de cada cenário
+SCENARIOS = {
+    "places": ("worker_places_api.py", ["Jundiaí, SP", "mercado,farmácia,padaria", "60"]),
+    "sweep": ("worker_places_api.py", ["Jundiaí, SP", "mercado",
+                                       "--bbox=" + ",".join(str(v) for v in SYNTHETIC_AREA)]),
+    "details": ("worker_places_api.py", ["--details"]),
+    "enrich": ("worker_enrich_contacts.py", ["all", "200"]),
+}
+
+# Tabelas cujas escritas contam como "escrita no banco"
+WRITE_TABLES = ("places", "places_pending_details")
+
+LOCAL_DB_HOSTS = ("localhost", "127.0.0.1", "::1", "")
+
+BACKOFF_LOG = re.compile(r"Aguardando (\d+(?:\.\d+)?)s")
+
+
+def db_writes(conn):
+    """Linhas inseridas + atualizadas nas tabelas dos workers desde o start do servidor"""
+    cur = conn.cursor()
+    # As estatísticas são enviadas pelos backends ao fim de cada transação,
+    # com algum atraso: espera um pouco e descarta o snapshot da sessão
+    time.sleep(1.0)
+    cur.execute("SELECT pg_stat_clear_snapshot()")
+    cur.execute("""
+        SELECT COALESCE(SUM(n_tup_ins + n_tup_upd), 0)
+        FROM pg_stat_user_tables
+        WHERE relname = ANY(%s)
+    """, (list(WRITE_TABLES),))
+    value = cur.fetchone()[0]
+    conn.commit()
+    return int(value)
+
+
+def worker_stats(output):
+    """Último JSON de estatísticas impresso pelo worker"""
+    for line in reversed(output.strip().splitlines()):
+        line = line.strip()
+        if line.startswith("{"):
+            try:
+                return json.loads(line)
+            except ValueError:
+                continue
+    return {}
+
+
+def processed_count(stats):
+    """Lugares processados segundo o JSON do worker"""
+    if "enriched" in stats:
+        return stats.get("total", 0)
+    return stats.get("success", 0) + stats.get("duplicates", 0) + stats.get("errors", 0)
+
+
+def run_once(scenario_args, env, mock_url, conn):
+    """
+    Uma execução do worker
+
+    Returns:
+        Dict com as métricas da execução
+    """
+    script, args = scenario_args
+    requests.post(f"{mock_url}/__mock/reset", timeout=5)
+    writes_before = db_writes(conn)
+
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.join(SRC_DIR, script)] + args,
+                          cwd=os.path.dirname(SRC_DIR), env=env,
+                          capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+
+    mock = requests.get(f"{mock_url}/__mock/stats", timeout=5).json()
+    writes = db_writes(conn) - writes_before
+
+    by_status = mock["by_status"]
+    failed = sum(n for status, n in by_status.items() if status == "429" or status.startswith("5"))
+    ok = by_status.get("200", 0)
+    stats = worker_stats(proc.stdout)
+    processed = processed_count(stats)
+    backoff = sum(float(s) for s in BACKOFF_LOG.findall(proc.stderr + proc.stdout))
+
+    return {
+        "exit_code": proc.returncode,
+        "elapsed_s": round(elapsed, 3),
+        "api_requests": mock["requests"],
+        "api_ok": ok,
+        "api_429": by_status.get("429", 0),
+        "api_5xx": sum(n for status, n in by_status.items() if status.startswith("5")),
+        "retry_overhead_pct": round(100.0 * failed / ok, 1) if ok else None,
+        "backoff_s": round(backoff, 1),
+        "api_ok_per_s": round(ok / elapsed, 1),
+        "processed": processed,
+        "processed_per_s": round(processed / elapsed, 1),
+        "db_writes": writes,
+        "db_writes_per_s": round(writes / elapsed, 1),
+        "bytes_received": mock["bytes_sent"],
+        "worker_stats": stats,
+        "stderr_tail": proc.stderr[-2000:] if proc.returncode else "",
+    }
+
+
+def print_run(i, result):
+    icon = "✅" if result["exit_code"] == 0 else "❌"
+    print(f"{icon} Execução {i}: {result['elapsed_s']:.2f}s | "
+          f"API {result['api_ok']} ok/{result['api_requests']} ({result['api_ok_per_s']}/s) | "
+          f"429: {result['api_429']} 5xx: {result['api_5xx']} "
+          f"(+{result['retry_overhead_pct'] or 0}% chamadas, {result['backoff_s']}s em backoff) | "
+          f"{result['processed']} lugares ({result['processed_per_s']}/s) | "
+          f"banco: {result['db_writes']} linhas ({result['db_writes_per_s']}/s)")
+    if result["exit_code"]:
+        print(result["stderr_tail"])
+
+
+def print_summary(results):
+    ok_runs = [r for r in results if r["exit_code"] == 0] or results
+    print(f"\n📊 Mediana de {len(ok_runs)} execuções")
+    for key, label in (("elapsed_s", "Tempo (s)"),
+                       ("api_ok_per_s", "Chamadas OK/s"),
+                       ("processed_per_s", "Lugares/s"),
+                       ("retry_overhead_pct", "Chamadas extras por retry (%)"),
+                       ("backoff_s", "Tempo em backoff (s)"),
+                       ("db_writes_per_s", "Escritas no banco/s")):
+        values = [r[key] for r in ok_runs if r[key] is not None]
+        if values:
+            print(f"{label + ':':32} {statistics.median(values):,.1f}")
+
+
+def cleanup(conn):
+    """Remove os lugares sintéticos do mock (google_place_id 'mock-...')"""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM places WHERE google_place_id LIKE 'mock-%'")
+    removed = cur.rowcount
+    cur.execute("SELECT to_regclass('places_pending_details')")
+    if cur.fetchone()[0]:
+        cur.execute("DELETE FROM places_pending_details WHERE google_place_id LIKE 'mock-%'")
+        removed += cur.rowcount
+    conn.commit()
+    print(f"🧹 {removed} linhas sintéticas removidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos workers contra a Places API local")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS),
+                        help="Argumentos do worker depois de -- substituem os padrões do cenário")
+    parser.add_argument("--repeat", type=int, default=1, help="Execuções do worker")
+    parser.add_argument("--mock-url", help="Mock já rodando (ex.: http://127.0.0.1:8765); "
+                                           "sem isto, um mock é iniciado aqui")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--burst-429", type=parse_burst)
+    parser.add_argument("--burst-5xx", type=parse_burst)
+    parser.add_argument("--quota-qps", type=int, default=0)
+    parser.add_argument("--replay", help="Respostas gravadas para o mock embutido")
+    parser.add_argument("--qps", type=float, help="PLACES_QPS do worker")
+    parser.add_argument("--concurrency", type=int, help="PLACES_MAX_CONCURRENCY do worker")
+    parser.add_argument("--enrich-sleep", type=float, default=0.0,
+                        help="ENRICH_SLEEP_BETWEEN_CALLS do worker de enriquecimento")
+    parser.add_argument("--cleanup", action="store_true", help="Remove os lugares sintéticos ao final")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON")
+    parser.add_argument("--allow-remote-db", action="store_true",
+                        help="Permite rodar com DB_HOST fora desta máquina")
+    argv = sys.argv[1:]
+    worker_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, worker_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    if db.DB_HOST not in LOCAL_DB_HOSTS and not db.DB_HOST.startswith("/") and not args.allow_remote_db:
+        print(f"❌ DB_HOST={db.DB_HOST} não é local: os workers gravam no banco de verdade.\n"
+              f"   Aponte DB_HOST para um PostGIS local ou use --allow-remote-db.")
+        sys.exit(1)
+
+    script, default_args = SCENARIOS[args.scenario]
+    worker_args = worker_args or default_args
+
+    server = None
+    mock_url = args.mock_url
+    if not mock_url:
+        server = create_server(port=0, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               burst_429=args.burst_429, burst_5xx=args.burst_5xx,
+                               quota_qps=args.quota_qps, replay=args.replay)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        mock_url = f"http://127.0.0.1:{server.server_address[1]}"
+    mock_url = mock_url.rstrip("/")
+    if mock_url.endswith("/v1"):
+        mock_url = mock_url[:-3]
+
+    env = dict(os.environ)
+    env.update({
+        "PLACES_API_BASE_URL": f"{mock_url}/v1",
+        "GOOGLE_PLACES_API_KEY": env.get("GOOGLE_PLACES_API_KEY") or "mock-key",
+        # Sem o cache local toda busca chega ao mock
+        "PLACES_CACHE_TTL_HOURS": "0",
+        "ENRICH_SLEEP_BETWEEN_CALLS": str(args.enrich_sleep),
+    })
+    if args.qps:
+        env["PLACES_QPS"] = str(args.qps)
+        env["PLACES_BURST"] = str(max(1, int(args.qps)))
+    if args.concurrency:
+        env["PLACES_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    if not args.json:
+        print(f"🏁 {args.scenario}: {script} {' '.join(worker_args)}")
+        print(f"   Mock: {mock_url}/v1 | banco: {db.DB_HOST}/{db.DB_NAME}")
+
+    conn = db.connect()
+    results = []
+    try:
+        for i in range(1, args.repeat + 1):
+            result = run_once((script, worker_args), env, mock_url, conn)
+            results.append(result)
+            if not args.json:
+                print_run(i, result)
+
+        if args.json:
+            print(json.dumps({"scenario": args.scenario, "worker_args": worker_args,
+                              "runs": results}, ensure_ascii=False, indent=2))
+        else:
+            print_summary(results)
+
+        if args.cleanup:
+            cleanup(conn)
+    finally:
+        conn.close()
+        if server:
+            server.shutdown()
+
+    sys.exit(0 if all(r["exit_code"] == 0 for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
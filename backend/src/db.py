@@ -0,0 +1,205 @@
+# backend/src/db.py
+"""
+Acesso ao PostgreSQL compartilhado pelos workers Python.
+
+Um pool de conexões por processo (ThreadedConnectionPool): cada conexão faz
+o handshake TCP + autenticação uma vez e é reaproveitada por todas as
+operações e threads do worker, em vez de um psycopg2.connect(...) por
+operação. Junto com o pool:
+
+- ajuste de sessão na retirada (statement_timeout, application_name e, no
+  modo bulk, synchronous_commit desligado para a carga em staging);
+- statements preparados por conexão (PREPARE uma vez, EXECUTE nas demais)
+  para os comandos repetidos a cada lote/linha.
+
+Uso:
+    import db
+
+    with db.connection() as conn:
+        cur = conn.cursor()
+        db.execute_prepared(cur, "place_by_id", "SELECT name FROM places WHERE id = $1", (42,))
+"""
+
+import atexit
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv é opcional: sem ele, só as variáveis do ambiente
+    load_dotenv = None
+
+if load_dotenv:
+    load_dotenv()
+
+# Configurações do Banco
+DB_HOST = os.getenv("DB_HOST", "76.13.173.70")
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_NAME = os.getenv("DB_NAME", "suphelp_geo")
+DB_USER = os.getenv("DB_USER", "admin")
+DB_PASS = os.getenv("DB_PASS", "***REMOVED***")
+
+# Tamanho do pool por processo (conexões abertas sob demanda até o máximo)
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "1"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "10"))
+
+# Ajustes de sessão: timeout por comando (ms, 0 = sem limite) e, no modo
+# bulk, synchronous_commit da carga em staging
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "300000"))
+DB_BULK_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_BULK_STATEMENT_TIMEOUT_MS", "0"))
+DB_BULK_SYNCHRONOUS_COMMIT = os.getenv("DB_BULK_SYNCHRONOUS_COMMIT", "off")
+
+# Aparece em pg_stat_activity (ex.: "suphelp-worker_csv")
+APPLICATION_NAME = "suphelp-" + os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class WorkerConnection(psycopg2.extensions.connection):
+    """Conexão do pool: guarda o modo de sessão aplicado e os statements preparados"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session_mode = None
+        self.prepared = set()
+
+
+def get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Pool do processo, criado na primeira chamada"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                host=DB_HOST, port=DB_PORT,
+                database=DB_NAME, user=DB_USER, password=DB_PASS,
+                application_name=APPLICATION_NAME,
+                connection_factory=WorkerConnection
+            )
+        return _pool
+
+
+def close_pool() -> None:
+    """Fecha todas as conexões do pool (chamado também na saída do processo)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+def tune_session(conn, bulk: bool = False) -> None:
+    """
+    Aplica os ajustes de sessão do modo pedido (só se a conexão estiver em outro)
+
+    No modo bulk o statement_timeout é DB_BULK_STATEMENT_TIMEOUT_MS (COPY e
+    merges grandes) e synchronous_commit fica desligado: um crash do servidor
+    pode perder os últimos commits, mas nunca só parte de um. Como o
+    checkpoint de worker_csv.py é gravado na mesma transação do lote, a
+    retomada refaz exatamente o que se perdeu.
+    """
+    mode = "bulk" if bulk else "default"
+    if conn.session_mode == mode:
+        return
+
+    cur = conn.cursor()
+    if bulk:
+        cur.execute("SET statement_timeout = %s", (DB_BULK_STATEMENT_TIMEOUT_MS,))
+        cur.execute("SET synchronous_commit = %s", (DB_BULK_SYNCHRONOUS_COMMIT,))
+    else:
+        cur.execute("SET statement_timeout = %s", (DB_STATEMENT_TIMEOUT_MS,))
+        cur.execute("SET synchronous_commit TO DEFAULT")
+    cur.close()
+    conn.commit()
+    conn.session_mode = mode
+
+
+def release(conn, discard: bool = False) -> None:
+    """
+    Devolve a conexão ao pool, limpa para o próximo uso
+
+    Desfaz transação pendente, solta advisory locks de sessão (ex.: o do
+    job de worker_csv.py) e volta ao padrão se a sessão ficou somente
+    leitura/com outro isolamento (dry-run). Conexão quebrada é descartada.
+    """
+    pool = get_pool()
+    if not discard and not conn.closed:
+        try:
+            conn.rollback()
+            if conn.readonly or conn.isolation_level is not None:
+                # reset() manda DISCARD ALL: os statements preparados somem junto
+                conn.reset()
+                conn.session_mode = None
+                conn.prepared.clear()
+            cur = conn.cursor()
+            cur.execute("SELECT pg_advisory_unlock_all()")
+            cur.close()
+            conn.commit()
+        except psycopg2.Error:
+            discard = True
+    pool.putconn(conn, close=discard or bool(conn.closed))
+
+
+def connect(**kwargs):
+    """
+    Conexão avulsa, fora do pool, com os mesmos parâmetros
+
+    Para sessões que ficam abertas o processo todo (ex.: LISTEN do
+    worker_runner.py) e não devem ocupar uma conexão do pool.
+    """
+    params = dict(host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER,
+                  password=DB_PASS, application_name=APPLICATION_NAME)
+    params.update(kwargs)
+    return psycopg2.connect(**params)
+
+
+@contextmanager
+def connection(bulk: bool = False):
+    """
+    Conexão do pool para um bloco with, com a sessão ajustada (ver tune_session)
+
+    Args:
+        bulk: Sessão de carga em massa (sem timeout por comando,
+            synchronous_commit desligado)
+    """
+    conn = get_pool().getconn()
+    discard = False
+    try:
+        tune_session(conn, bulk)
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        discard = True
+        raise
+    finally:
+        release(conn, discard)
+
+
+def execute_prepared(cur, name: str, sql: str, params: Optional[Sequence] = None) -> None:
+    """
+    Executa um statement preparado, preparando-o na primeira vez nesta conexão
+
+    Args:
+        cur: Cursor de uma conexão do pool
+        name: Nome do statement (único por SQL)
+        sql: Comando com parâmetros $1, $2, ...
+        params: Valores dos parâmetros
+    """
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        conn.prepared.add(name)
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
@@ -0,0 +1,14 @@
+-- Migration: Case-insensitive name index for CSV imports
+-- Description: Functional index on LOWER(name) used by worker_csv.py duplicate detection
+-- Date: 2026-10-18
+
+-- 1. Functional index on LOWER(name)
+-- worker_csv.py checks duplicates with LOWER(name) = LOWER(...), both in the
+-- per-batch lookup and in the bulk INSERT ... SELECT anti-join. Without this
+-- index every lookup is a sequential scan of places.
+CREATE INDEX IF NOT EXISTS idx_places_name_lower ON places (LOWER(name));
+
+-- 2. Verification query
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'places' AND indexname = 'idx_places_name_lower';
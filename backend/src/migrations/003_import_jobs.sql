@@ -0,0 +1,33 @@
+-- Migration: Resumable CSV import jobs
+-- Description: Checkpoint table used by worker_csv.py to resume interrupted imports
+-- Date: 2026-10-18
+
+-- 1. import_jobs table
+-- One row per import run, keyed by the SHA-256 of the file content.
+-- byte_offset/line_no point right after the last committed chunk and are
+-- updated in the same transaction as that chunk's rows, so a rerun of the
+-- same file seeks straight there instead of replaying the whole file.
+-- worker_csv.py also creates this table on demand (CREATE TABLE IF NOT EXISTS).
+CREATE TABLE IF NOT EXISTS import_jobs (
+  id SERIAL PRIMARY KEY,
+  file_hash CHAR(64) NOT NULL,
+  file_path TEXT,
+  status VARCHAR(20) NOT NULL DEFAULT 'running'
+    CHECK (status IN ('running', 'completed', 'failed')),
+  byte_offset BIGINT NOT NULL DEFAULT 0,
+  line_no INTEGER NOT NULL DEFAULT 0,
+  success INTEGER NOT NULL DEFAULT 0,
+  duplicates INTEGER NOT NULL DEFAULT 0,
+  errors INTEGER NOT NULL DEFAULT 0,
+  total INTEGER NOT NULL DEFAULT 0,
+  error_message TEXT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_file_hash ON import_jobs (file_hash);
+
+-- 2. Verification query
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name = 'import_jobs';
@@ -0,0 +1,26 @@
+-- Migration: CSV import manifest
+-- Description: Per-chunk content hashes so re-uploaded files skip data already ingested
+-- Date: 2026-10-18
+
+-- 1. import_manifest_chunks table
+-- File-level manifest: import_jobs (migration 003) rows with status 'completed'
+-- are looked up by file_hash, so an identical re-upload is skipped entirely.
+-- Chunk-level manifest: worker_csv.py hashes every chunk (header + raw bytes)
+-- and records it here in the same transaction as the chunk's rows. Chunk
+-- boundaries are content-defined, so a partially changed file re-imports only
+-- the chunks around the change.
+-- worker_csv.py also creates this table on demand (CREATE TABLE IF NOT EXISTS).
+CREATE TABLE IF NOT EXISTS import_manifest_chunks (
+  chunk_hash CHAR(64) PRIMARY KEY,
+  job_id INTEGER REFERENCES import_jobs(id) ON DELETE SET NULL,
+  rows INTEGER NOT NULL,
+  success INTEGER NOT NULL DEFAULT 0,
+  duplicates INTEGER NOT NULL DEFAULT 0,
+  errors INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. Verification query
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name = 'import_manifest_chunks';
@@ -0,0 +1,22 @@
+-- Migration: Place Details queue for cheap Places searches
+-- Description: place_ids found by worker_places_api.py with --fields ids, waiting for a --details pass
+-- Date: 2026-10-18
+
+-- 1. places_pending_details table
+-- A search or sweep with the "ids" field profile only pays for the IDs Only
+-- SKU. IDs not already in places are queued here; `worker_places_api.py
+-- --details` then fetches Place Details (basic or full fields) for the queue
+-- only, saves them to places and removes them. attempts counts failed detail
+-- calls; IDs that fail DETAILS_MAX_ATTEMPTS times are no longer retried.
+-- worker_places_api.py also creates this table on demand (CREATE TABLE IF NOT EXISTS).
+CREATE TABLE IF NOT EXISTS places_pending_details (
+  google_place_id VARCHAR(255) PRIMARY KEY,
+  category VARCHAR(100),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. Verification query
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name = 'places_pending_details';
@@ -0,0 +1,47 @@
+-- Migration: Background worker jobs
+-- Description: Queue of Python worker jobs claimed by worker_runner.py with FOR UPDATE SKIP LOCKED
+-- Date: 2026-10-18
+
+-- 1. worker_jobs table
+-- The Node routes called with async=true insert a row here and answer 202
+-- with the job id instead of holding the HTTP request open until the worker
+-- finishes; the UI polls GET /api/jobs/:id. Any number of
+-- `worker_runner.py --processes N` (on this or other machines) claim queued
+-- rows with SELECT ... FOR UPDATE SKIP LOCKED, so each job runs exactly once
+-- without runners blocking each other.
+-- args is the worker's command line (the same argv the synchronous routes
+-- pass); files are uploads removed when the job ends. While running, the
+-- runner refreshes heartbeat_at, progress (last output line) and output (tail);
+-- a running job whose heartbeat stops (runner killed, machine down) is
+-- requeued until attempts reaches max_attempts, then marked failed.
+-- result is the JSON stats line printed by the worker.
+-- worker_runner.py and services/jobQueue.js also create this table on demand.
+CREATE TABLE IF NOT EXISTS worker_jobs (
+  id SERIAL PRIMARY KEY,
+  worker VARCHAR(50) NOT NULL,
+  args JSONB NOT NULL DEFAULT '[]',
+  files JSONB NOT NULL DEFAULT '[]',
+  status VARCHAR(20) NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  locked_by VARCHAR(255),
+  progress TEXT,
+  output TEXT,
+  result JSONB,
+  exit_code INTEGER,
+  error_message TEXT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP,
+  heartbeat_at TIMESTAMP,
+  finished_at TIMESTAMP
+);
+
+-- Claim order (only queued rows are indexed)
+CREATE INDEX IF NOT EXISTS idx_worker_jobs_queued ON worker_jobs (id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_worker_jobs_status ON worker_jobs (status, created_at);
+
+-- 2. Verification query
+SELECT table_name
+FROM information_schema.tables
+WHERE table_name = 'worker_jobs';
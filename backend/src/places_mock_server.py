@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# backend/src/places_mock_server.py
+"""
+Servidor local no lugar da Places API (New), para testes de carga sem custo.
+
+Atende os dois endpoints usados pelos workers:
+    POST /v1/places:searchText
+    GET  /v1/places/{id}
+
+Os workers usam este servidor com PLACES_API_BASE_URL=http://127.0.0.1:8765/v1
+(qualquer GOOGLE_PLACES_API_KEY serve). As respostas vêm de:
+
+- gravação (--replay arquivo.jsonl): respostas reais gravadas antes com
+  --record, devolvidas para a mesma requisição (endpoint + corpo);
+- lugares sintéticos (padrão, e para requisições que não estão na gravação):
+  SYNTHETIC_PLACES lugares por textQuery, espalhados de forma determinística
+  em --area; locationRestriction.rectangle filtra pela área, 60 no máximo
+  por busca e páginas de 20 com nextPageToken, como na API real. O
+  X-Goog-FieldMask é respeitado.
+
+Falhas simuladas, para medir retry e backoff dos workers:
+    --latency-ms / --jitter-ms   latência de cada resposta
+    --burst-429 N/M              N respostas 429 a cada M requisições
+    --burst-5xx N/M              N respostas 503 a cada M requisições
+    --quota-qps Q                429 acima de Q requisições/s (cota da API)
+
+GET /__mock/stats devolve os contadores (requisições por endpoint e por
+status, acertos da gravação); POST /__mock/reset zera os contadores.
+
+Uso:
+    python3 src/places_mock_server.py [--port 8765] [--replay gravacao.jsonl] [opções]
+    python3 src/places_mock_server.py --record gravacao.jsonl   # proxy para a API real
+
+Exemplo:
+    python3 src/places_mock_server.py --latency-ms 150 --jitter-ms 50 --burst-429 5/50
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+UPSTREAM_URL = "https://places.googleapis.com/v1"
+
+# Lugares sintéticos por textQuery e área onde ficam (sul, oeste, norte, leste):
+# por padrão, Jundiaí e arredores
+SYNTHETIC_PLACES = 2000
+SYNTHETIC_AREA = (-23.30, -47.00, -23.10, -46.80)
+
+# Limites do Text Search
+SEARCH_RESULT_CAP = 60
+MAX_PAGE_SIZE = 20
+
+SEARCH_PATH = "/v1/places:searchText"
+DETAILS_PATH = re.compile(r"^/v1/places/([^/:]+)$")
+
+ERROR_STATUS = {
+    400: "INVALID_ARGUMENT",
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    503: "UNAVAILABLE",
+}
+
+CATEGORY_TYPES = ["supermarket", "pharmacy", "restaurant", "bakery", "school", "hospital", "store"]
+
+
+def parse_burst(value):
+    """'N/M' -> (N, M): N falhas no começo de cada bloco de M requisições"""
+    if not value:
+        return None
+    try:
+        failures, block = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Burst inválido {value!r}: use N/M (ex.: 5/50)")
+    if block <= 0 or not 0 <= failures <= block:
+        raise argparse.ArgumentTypeError(f"Burst inválido {value!r}: precisa 0 <= N <= M e M > 0")
+    return failures, block
+
+
+def parse_area(value):
+    """'sul,oeste,norte,leste' -> tupla de floats"""
+    try:
+        south, west, north, east = (float(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Área inválida {value!r}: use sul,oeste,norte,leste")
+    return south, west, north, east
+
+
+def request_key(method, path, body):
+    """Chave de uma requisição na gravação: endpoint + corpo JSON canônico"""
+    canonical = json.dumps(body, sort_keys=True, ensure_ascii=False) if body else ""
+    return hashlib.sha256(f"{method} {path} {canonical}".encode("utf-8")).hexdigest()
+
+
+def apply_field_mask(obj, mask, prefix=""):
+    """
+    Mantém só os campos pedidos no X-Goog-FieldMask
+
+    Args:
+        obj: Resposta completa
+        mask: Máscara ("places.id,places.displayName,nextPageToken" ou "*")
+        prefix: Prefixo dos campos dentro de obj ("places." para os itens da busca)
+    """
+    fields = [f.strip() for f in (mask or "*").split(",") if f.strip()]
+    if "*" in fields or f"{prefix}*" in fields:
+        return obj
+    top = {f[len(prefix):].split(".", 1)[0] for f in fields if f.startswith(prefix)}
+    return {key: value for key, value in obj.items() if key in top}
+
+
+class SyntheticPlaces:
+    """Lugares gerados de forma determinística para cada textQuery"""
+
+    def __init__(self, count=SYNTHETIC_PLACES, area=SYNTHETIC_AREA, seed=0):
+        self.count = count
+        self.area = area
+        self.seed = seed
+        self.worlds = {}
+        self.lock = threading.Lock()
+
+    def query_hash(self, query):
+        return hashlib.sha1(f"{self.seed}:{query}".encode("utf-8")).hexdigest()[:10]
+
+    def place(self, place_id):
+        """Lugar completo (todos os campos) a partir do id"""
+        rng = random.Random(place_id)
+        south, west, north, east = self.area
+        n = int(place_id.rsplit("-", 1)[-1]) if place_id.rsplit("-", 1)[-1].isdigit() else rng.randint(0, 9999)
+        category = CATEGORY_TYPES[rng.randrange(len(CATEGORY_TYPES))]
+        return {
+            "id": place_id,
+            "displayName": {"text": f"Lugar {n} ({category})", "languageCode": "pt-BR"},
+            "formattedAddress": f"Rua Sintética, {n} - Jundiaí, SP, Brasil",
+            "location": {"latitude": round(rng.uniform(south, north), 7),
+                         "longitude": round(rng.uniform(west, east), 7)},
+            "types": [category, "point_of_interest", "establishment"],
+            "rating": round(rng.uniform(1, 5), 1),
+            "userRatingCount": rng.randint(0, 3000),
+            "nationalPhoneNumber": f"(11) 4{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "internationalPhoneNumber": f"+55 11 4{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "websiteUri": f"https://lugar-{n}.example.com/",
+            "currentOpeningHours": {"openNow": rng.random() < 0.6},
+        }
+
+    def world(self, query):
+        """Todos os lugares de uma textQuery (gerados uma vez)"""
+        with self.lock:
+            places = self.worlds.get(query)
+            if places is None:
+                qhash = self.query_hash(query)
+                places = self.worlds[query] = [self.place(f"mock-{qhash}-{i}") for i in range(self.count)]
+            return places
+
+    def search(self, body):
+        """
+        Resposta completa do searchText para o corpo da requisição
+
+        Returns:
+            {"places": [...], "nextPageToken": "..."} (sem token na última página)
+        """
+        places = self.world(body.get("textQuery", ""))
+        rect = (body.get("locationRestriction") or {}).get("rectangle")
+        if rect:
+            low, high = rect.get("low", {}), rect.get("high", {})
+            south, north = low.get("latitude", -90), high.get("latitude", 90)
+            west, east = low.get("longitude", -180), high.get("longitude", 180)
+            places = [p for p in places
+                      if south <= p["location"]["latitude"] <= north
+                      and west <= p["location"]["longitude"] <= east]
+        places = places[:SEARCH_RESULT_CAP]
+
+        page_size = min(int(body.get("pageSize") or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        token = body.get("pageToken") or ""
+        start = int(token.split(":", 1)[0]) if token else 0
+        page = places[start:start + page_size]
+        response = {"places": page}
+        if start + page_size < len(places):
+            response["nextPageToken"] = f"{start + page_size}:{self.query_hash(body.get('textQuery', ''))}"
+        return response
+
+
+class MockState:
+    """Configuração, gravação e contadores do servidor (compartilhados entre threads)"""
+
+    def __init__(self, args):
+        self.latency = args.latency_ms / 1000.0
+        self.jitter = args.jitter_ms / 1000.0
+        self.burst_429 = args.burst_429
+        self.burst_5xx = args.burst_5xx
+        self.quota_qps = args.quota_qps
+        self.upstream = args.upstream.rstrip("/")
+        self.synthetic = SyntheticPlaces(args.synthetic_places, args.area, args.seed)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+
+        self.recorded = {}
+        if args.replay:
+            with open(args.replay, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[entry["key"]] = entry
+            print(f"📼 {len(self.recorded)} respostas gravadas carregadas de {args.replay}")
+
+        self.record_file = open(args.record, "a", encoding="utf-8") if args.record else None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.request_no = 0
+            self.quota_window = (int(time.monotonic()), 0)
+            self.stats = {
+                "requests": 0,
+                "by_endpoint": {"searchText": 0, "details": 0},
+                "by_status": {},
+                "replay_hits": 0,
+                "replay_misses": 0,
+                "bytes_sent": 0,
+                "started_at": time.time(),
+            }
+
+    def injected_failure(self):
+        """Status de falha simulada para a próxima requisição, ou None"""
+        with self.lock:
+            n = self.request_no
+            self.request_no += 1
+
+            if self.quota_qps:
+                second, used = self.quota_window
+                now = int(time.monotonic())
+                if now != second:
+                    second, used = now, 0
+                self.quota_window = (second, used + 1)
+                if used >= self.quota_qps:
+                    return 429
+
+            for burst, status in ((self.burst_429, 429), (self.burst_5xx, 503)):
+                if burst and n % burst[1] < burst[0]:
+                    return status
+            return None
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self.lock:
+                extra = self.rng.uniform(-self.jitter, self.jitter)
+            time.sleep(max(0.0, self.latency + extra))
+
+    def count(self, endpoint, status, size, replay=None):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["by_endpoint"][endpoint] += 1
+            key = str(status)
+            self.stats["by_status"][key] = self.stats["by_status"].get(key, 0) + 1
+            self.stats["bytes_sent"] += size
+            if replay is True:
+                self.stats["replay_hits"] += 1
+            elif replay is False:
+                self.stats["replay_misses"] += 1
+
+    def snapshot(self):
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats["uptime_s"] = round(time.time() - stats.pop("started_at"), 1)
+        return stats
+
+    def record(self, key, method, path, body, status, response):
+        line = json.dumps({"key": key, "method": method, "path": path, "body": body,
+                           "status": status, "response": response}, ensure_ascii=False)
+        with self.lock:
+            self.record_file.write(line + "\n")
+            self.record_file.flush()
+
+
+def error_body(status, message):
+    return {"error": {"code": status, "message": message, "status": ERROR_STATUS.get(status, "INTERNAL")}}
+
+
+class PlacesMockHandler(BaseHTTPRequestHandler):
+    """Requisições da Places API e os endpoints /__mock"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+    server_version = "PlacesMock/1.0"
+    state = None
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def send_json(self, status, payload, endpoint=None, replay=None):
+        """Responde em JSON; com endpoint, conta a resposta antes de enviá-la"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if endpoint:
+            self.state.count(endpoint, status, len(data), replay)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/__mock/stats":
+            self.send_json(200, self.state.snapshot())
+            return
+        match = DETAILS_PATH.match(path)
+        if not match:
+            self.send_json(404, error_body(404, f"Endpoint desconhecido: {path}"))
+            return
+        self.handle_places("details", "GET", path, None, unquote(match.group(1)))
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        try:
+            body = self.read_body()
+        except ValueError:
+            self.send_json(400, error_body(400, "Corpo JSON inválido"))
+            return
+
+        if path == "/__mock/reset":
+            self.state.reset()
+            self.send_json(200, {"reset": True})
+        elif path == SEARCH_PATH:
+            self.handle_places("searchText", "POST", path, body)
+        else:
+            self.send_json(404, error_body(404, f"Endpoint desconhecido: {path}"))
+
+    def handle_places(self, endpoint, method, path, body, place_id=None):
+        state = self.state
+        mask = self.headers.get("X-Goog-FieldMask")
+        state.delay()
+
+        failure = state.injected_failure()
+        if failure:
+            message = "Resource has been exhausted (e.g. check quota)." if failure == 429 else "The service is currently unavailable."
+            self.send_json(failure, error_body(failure, message), endpoint)
+            return
+
+        if not mask:
+            self.send_json(400, error_body(400, "FieldMask is a required parameter"), endpoint)
+            return
+
+        key = request_key(method, path, body)
+        replay = None
+        if state.record_file:
+            status, response = self.forward(method, path, body)
+            state.record(key, method, path, body, status, response)
+        elif state.recorded:
+            entry = state.recorded.get(key)
+            replay = entry is not None
+            if entry:
+                status, response = entry["status"], entry["response"]
+            else:
+                status, response = self.synthetic(endpoint, body, place_id)
+        else:
+            status, response = self.synthetic(endpoint, body, place_id)
+
+        if status == 200:
+            if endpoint == "searchText":
+                response = dict(apply_field_mask(response, mask),
+                                places=[apply_field_mask(p, mask, "places.") for p in response.get("places", [])])
+                if not response["places"]:
+                    response.pop("places")
+            else:
+                response = apply_field_mask(response, mask)
+        self.send_json(status, response, endpoint, replay)
+
+    def synthetic(self, endpoint, body, place_id):
+        if endpoint == "searchText":
+            if not body.get("textQuery"):
+                return 400, error_body(400, "textQuery is required")
+            return 200, self.state.synthetic.search(body)
+        return 200, self.state.synthetic.place(place_id)
+
+    def forward(self, method, path, body):
+        """Repassa a requisição para a API real (modo --record)"""
+        import requests
+
+        headers = {name: self.headers[name] for name in ("X-Goog-Api-Key", "X-Goog-FieldMask")
+                   if self.headers.get(name)}
+        headers["X-Goog-FieldMask"] = "*"  # grava tudo; a máscara é aplicada na resposta
+        if not headers.get("X-Goog-Api-Key"):
+            headers["X-Goog-Api-Key"] = os.getenv("GOOGLE_PLACES_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY", "")
+        url = self.state.upstream + path[len("/v1"):]
+        resp = requests.request(method, url, json=body if method == "POST" else None,
+                                headers=headers, timeout=30)
+        try:
+            return resp.status_code, resp.json()
+        except ValueError:
+            return resp.status_code, error_body(resp.status_code, resp.text[:200])
+
+
+def create_server(host="127.0.0.1", port=8765, verbose=False, **options):
+    """
+    Cria o servidor (sem iniciar), para uso dentro de outros scripts
+
+    Args:
+        host, port: Endereço (porta 0 = livre, ver server.server_address)
+        options: Mesmas opções da linha de comando (latency_ms=..., burst_429=(5, 50), ...)
+    """
+    defaults = dict(latency_ms=0.0, jitter_ms=0.0, burst_429=None, burst_5xx=None, quota_qps=0,
+                    replay=None, record=None, upstream=UPSTREAM_URL,
+                    synthetic_places=SYNTHETIC_PLACES, area=SYNTHETIC_AREA, seed=0)
+    defaults.update(options)
+    state = MockState(argparse.Namespace(**defaults))
+    handler = type("Handler", (PlacesMockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local no lugar da Places API (New)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--replay", help="Respostas gravadas (JSONL de --record)")
+    parser.add_argument("--record", help="Repassa para a API real e grava as respostas neste JSONL")
+    parser.add_argument("--upstream", default=UPSTREAM_URL, help="API real usada por --record")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência de cada resposta")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Variação (+/-) da latência")
+    parser.add_argument("--burst-429", type=parse_burst, help="N/M: N respostas 429 a cada M requisições")
+    parser.add_argument("--burst-5xx", type=parse_burst, help="N/M: N respostas 503 a cada M requisições")
+    parser.add_argument("--quota-qps", type=int, default=0, help="429 acima deste número de requisições/s")
+    parser.add_argument("--synthetic-places", type=int, default=SYNTHETIC_PLACES,
+                        help="Lugares sintéticos por textQuery")
+    parser.add_argument("--area", type=parse_area, default=SYNTHETIC_AREA,
+                        help="Área dos lugares sintéticos: sul,oeste,norte,leste")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Loga cada requisição")
+    args = parser.parse_args()
+
+    if args.record and args.replay:
+        parser.error("--record e --replay não podem ser usados juntos")
+
+    options = {k: v for k, v in vars(args).items() if k not in ("host", "port", "verbose")}
+    server = create_server(args.host, args.port, args.verbose, **options)
+    host, port = server.server_address[:2]
+    print(f"🧪 Places API local em http://{host}:{port}/v1")
+    print(f"   PLACES_API_BASE_URL=http://{host}:{port}/v1")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {json.dumps(server.state.snapshot())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 require('dotenv').config();
 const express = require('express');
 const cors = require('cors');
-const { spawn } = require('child_process');
 const https = require('https');
 const bcrypt = require('bcryptjs');
 const jwt = require('jsonwebtoken');
@@ -11,10 +10,47 @@ const path = require('path');
 const fs = require('fs');
 const pool = require('./db');
 const serveDynamicPage = require('./dynamic_page');
+const PythonWorkerPool = require('./services/pythonWorkerPool');
+const JobQueue = require('./services/jobQueue');
 
 const app = express();
 const port = process.env.PORT || 5000;
 
+// Workers Python rodam em daemons persistentes (src/worker_daemon.py):
+// sem custo de subir o interpretador, imports e conexão a cada requisição
+const pythonWorkers = new PythonWorkerPool();
+
+// Jobs em segundo plano (async=true): executados por src/worker_runner.py
+const jobQueue = new JobQueue(pool);
+
+function isAsyncRequest(req) {
+  return req.query.async === 'true' || req.body.async === true || req.body.async === 'true';
+}
+
+/**
+ * Enfileira o worker em vez de rodá-lo dentro da requisição e responde 202
+ * com o id do job (acompanhado em GET /api/jobs/:id)
+ */
+async function enqueueWorkerJob(res, worker, args, files = []) {
+  try {
+    const job = await jobQueue.enqueue(worker, args, { files });
+    console.log(`📥 Job #${job.id} enfileirado: ${worker}`);
+    res.status(202).json({
+      success: true,
+      message: "Job enfileirado",
+      jobId: job.id,
+      status: job.status,
+      statusUrl: `/api/jobs/${job.id}`
+    });
+  } catch (err) {
+    console.error('❌ Erro ao enfileirar job:', err);
+    for (const filePath of files) {
+      fs.unlink(filePath, () => {});
+    }
+    res.status(500).json({ success: false, message: "Erro ao enfileirar job" });
+  }
+}
+
 // Middleware CORS para permitir frontend React
 app.use(cors({
   origin: [
@@ -35,14 +71,63 @@ if (!fs.existsSync(uploadsDir)) {
   fs.mkdirSync(uploadsDir, { recursive: true });
 }
 
+// O worker_csv.py grava as linhas rejeitadas em uploads/<upload>.rejeitados.csv
+// (o nome volta na resposta como rejectsFile). O upload é apagado ao fim da
+// importação, o arquivo de rejeitados não: fica IMPORT_REJECTS_TTL_HOURS
+// (padrão 24h) para consulta e depois é removido aqui
+const IMPORT_REJECTS_TTL_HOURS = parseFloat(process.env.IMPORT_REJECTS_TTL_HOURS || '24');
+const REJECTS_SUFFIX = '.rejeitados.csv';
+
+function cleanupRejectFiles() {
+  const cutoff = Date.now() - IMPORT_REJECTS_TTL_HOURS * 60 * 60 * 1000;
+  fs.readdir(uploadsDir, (err, names) => {
+    if (err) {
+      console.error(`⚠️ Erro ao listar ${uploadsDir}: ${err}`);
+      return;
+    }
+    for (const name of names.filter(n => n.endsWith(REJECTS_SUFFIX))) {
+      const filePath = path.join(uploadsDir, name);
+      fs.stat(filePath, (statErr, stat) => {
+        if (!statErr && stat.mtimeMs < cutoff) {
+          fs.unlink(filePath, () => {});
+        }
+      });
+    }
+  });
+}
+
+cleanupRejectFiles();
+setInterval(cleanupRejectFiles, 60 * 60 * 1000).unref();
+
+// Extensões aceitas na importação (o worker detecta o formato pela extensão).
+// CSV comprimido (.gz/.zip/.zst) é descomprimido em streaming pelo worker.
+const IMPORT_EXTENSIONS = [
+  '.csv.gz', '.csv.zst', '.csv',
+  '.xlsx', '.parquet', '.arrow', '.feather',
+  '.geojson.gz', '.geojson', '.geojsonl', '.json', '.kml.gz', '.kml', '.kmz',
+  '.gz', '.zip', '.zst'
+];
+
+// Limite de upload da importação (MB), separado do limite de 2MB das imagens
+const IMPORT_MAX_UPLOAD_MB = parseInt(process.env.IMPORT_MAX_UPLOAD_MB || '500', 10);
+
+function importExtension(file) {
+  const name = file.originalname.toLowerCase();
+  if (file.mimetype === 'text/csv' && !IMPORT_EXTENSIONS.some(ext => name.endsWith(ext))) {
+    return '.csv';
+  }
+  return IMPORT_EXTENSIONS.find(ext => name.endsWith(ext)) || null;
+}
+
 const storage = multer.diskStorage({
   destination: function (req, file, cb) {
     cb(null, uploadsDir);
   },
   filename: function (req, file, cb) {
-    // Para CSV
-    if (file.mimetype === 'text/csv' || file.originalname.endsWith('.csv')) {
-      cb(null, 'import-' + Date.now() + '.csv');
+    // Para arquivos de importação (CSV, XLSX, Parquet, Arrow, comprimidos)
+    const importExt = importExtension(file);
+    if (importExt) {
+      cb(null, 'import-' + Date.now() + importExt);
     } 
     // Para imagens (logo)
     else {
@@ -56,8 +141,8 @@ const upload = multer({
   storage: storage,
   limits: { fileSize: 2 * 1024 * 1024 }, // 2MB
   fileFilter: function (req, file, cb) {
-    // Aceita CSV ou imagens
-    if (file.mimetype === 'text/csv' || file.originalname.endsWith('.csv')) {
+    // Aceita arquivos de importação ou imagens
+    if (importExtension(file)) {
       cb(null, true);
     } else {
       const allowedTypes = /jpeg|jpg|png|gif|svg/;
@@ -67,12 +152,24 @@ const upload = multer({
       if (mimetype && extname) {
         cb(null, true);
       } else {
-        cb(new Error('Apenas arquivos CSV ou imagens são permitidos!'));
+        cb(new Error('Apenas arquivos CSV, XLSX, Parquet, Arrow ou imagens são permitidos!'));
       }
     }
   }
 });
 
+const importUpload = multer({
+  storage: storage,
+  limits: { fileSize: IMPORT_MAX_UPLOAD_MB * 1024 * 1024 },
+  fileFilter: function (req, file, cb) {
+    if (importExtension(file)) {
+      cb(null, true);
+    } else {
+      cb(new Error('Formato não suportado! Use CSV (.csv, .csv.gz, .zip, .zst), XLSX, Parquet, Arrow, GeoJSON ou KML/KMZ.'));
+    }
+  }
+});
+
 // Middleware para processar JSON
 app.use(express.json());
 
@@ -506,7 +603,7 @@ app.put('/api/admin/change-password', authenticateAdmin, async (req, res) => {
 app.post('/api/import-test', (req, res) => {
   console.log('🔄 Iniciando Worker Python de Teste...');
 
-  const pythonProcess = spawn('python3', ['src/worker.py']);
+  const pythonProcess = pythonWorkers.spawn('worker');
 
   pythonProcess.stdout.on('data', (data) => {
     console.log(`🐍 Python Output: ${data}`);
@@ -533,7 +630,7 @@ app.post('/api/import-csv', (req, res) => {
   console.log(`📂 Iniciando importação do arquivo: ${fileName}...`);
 
   // Passamos o nome do arquivo como argumento para o Python
-  const pythonProcess = spawn('python3', ['src/worker_csv.py', fileName]);
+  const pythonProcess = pythonWorkers.spawn('worker_csv', [fileName]);
 
   pythonProcess.stdout.on('data', (data) => {
     console.log(`🐍 CSV Log: ${data}`);
@@ -553,7 +650,7 @@ app.post('/api/import-csv', (req, res) => {
 });
 
 // --- Rota 3.1: Importar CSV via Upload (worker_csv.py) ---
-app.post('/api/import-csv-upload', upload.single('file'), (req, res) => {
+app.post('/api/import-csv-upload', importUpload.single('file'), (req, res) => {
   try {
     if (!req.file) {
       return res.status(400).json({ 
@@ -566,7 +663,14 @@ app.post('/api/import-csv-upload', upload.single('file'), (req, res) => {
     console.log(`📂 Iniciando importação do arquivo: ${req.file.filename}...`);
 
     // Passamos o caminho completo do arquivo como argumento para o Python
-    const pythonProcess = spawn('python3', ['src/worker_csv.py', filePath]);
+    // --bulk: carga via COPY + INSERT ... SELECT (uploads grandes não estouram o timeout)
+    // --dry-run: só valida e conta duplicados, sem gravar (campo dryRun=true no form)
+    const dryRun = req.body.dryRun === 'true' || req.query.dryRun === 'true';
+    const workerArgs = [filePath, dryRun ? '--dry-run' : '--bulk'];
+    if (isAsyncRequest(req)) {
+      return enqueueWorkerJob(res, 'worker_csv', workerArgs, [filePath]);
+    }
+    const pythonProcess = pythonWorkers.spawn('worker_csv', workerArgs);
 
     let outputData = '';
     let errorData = '';
@@ -598,19 +702,27 @@ app.post('/api/import-csv-upload', upload.single('file'), (req, res) => {
         const duplicatesMatch = outputData.match(/Duplicados:\s*(\d+)/);
         const errorsMatch = outputData.match(/Erros:\s*(\d+)/);
         const totalMatch = outputData.match(/Total processado:\s*(\d+)/);
+        const rejectsMatch = outputData.match(/Arquivo de rejeitados:\s*(.+)/);
         
         const imported = successMatch ? parseInt(successMatch[1]) : 0;
         const duplicates = duplicatesMatch ? parseInt(duplicatesMatch[1]) : 0;
         const errors = errorsMatch ? parseInt(errorsMatch[1]) : 0;
         const total = totalMatch ? parseInt(totalMatch[1]) : 0;
+        // Linhas rejeitadas ficam num CSV em uploads/ (linha, motivo, detalhe, dados),
+        // removido por cleanupRejectFiles depois de IMPORT_REJECTS_TTL_HOURS
+        const rejectsFile = rejectsMatch ? path.basename(rejectsMatch[1].trim()) : null;
 
         res.json({ 
           success: true, 
-          message: "Importação de CSV finalizada com sucesso.",
+          message: dryRun
+            ? "Validação do CSV concluída (nada foi gravado)."
+            : "Importação de CSV finalizada com sucesso.",
+          dryRun,
           imported,
           duplicates,
           errors,
-          total
+          total,
+          rejectsFile
         });
       } else {
         res.status(500).json({ 
@@ -629,9 +741,150 @@ app.post('/api/import-csv-upload', upload.single('file'), (req, res) => {
   }
 });
 
+// --- Rota 3.1.1: Prévia de importação (worker_csv.py --preview) ---
+// Lê só o começo do arquivo: delimitador, mapeamento de colunas e amostra de
+// erros para a UI confirmar antes do upload completo. A UI pode enviar só os
+// primeiros KB do arquivo (Blob.slice) com o nome original.
+app.post('/api/import-csv-preview', importUpload.single('file'), (req, res) => {
+  if (!req.file) {
+    return res.status(400).json({
+      success: false,
+      message: "Nenhum arquivo enviado"
+    });
+  }
+
+  const filePath = req.file.path;
+  const pythonProcess = pythonWorkers.spawn('worker_csv', [filePath, '--preview']);
+
+  // A prévia tem orçamento de tempo próprio; isto só protege contra travamentos
+  const killTimer = setTimeout(() => pythonProcess.kill('SIGKILL'), 10000);
+
+  let outputData = '';
+  let errorData = '';
+
+  pythonProcess.stdout.on('data', (data) => {
+    outputData += data.toString();
+  });
+
+  pythonProcess.stderr.on('data', (data) => {
+    errorData += data.toString();
+  });
+
+  pythonProcess.on('close', (code) => {
+    clearTimeout(killTimer);
+    try {
+      fs.unlinkSync(filePath);
+    } catch (err) {
+      console.error(`⚠️ Erro ao remover arquivo temporário: ${err}`);
+    }
+
+    let preview = null;
+    try {
+      preview = JSON.parse(outputData.trim().split('\n').pop());
+    } catch (err) {
+      preview = null;
+    }
+
+    if (code !== 0 || !preview || preview.error) {
+      console.error(`❌ Prévia CSV Erro: ${errorData || (preview && preview.error)}`);
+      return res.status(500).json({
+        success: false,
+        message: "Não foi possível gerar a prévia do arquivo.",
+        error: (preview && preview.error) || errorData
+      });
+    }
+
+    res.json({ success: true, ...preview, file: req.file.originalname });
+  });
+});
+
+// --- Rota 3.2: Importar vários arquivos num único worker (worker_csv.py em lote) ---
+// Um só processo Python e uma só conexão para todos os arquivos; duplicatas
+// entre arquivos são detectadas pelo mesmo estado em memória.
+app.post('/api/import-csv-upload-batch', importUpload.array('files', 50), (req, res) => {
+  if (!req.files || req.files.length === 0) {
+    return res.status(400).json({
+      success: false,
+      message: "Nenhum arquivo enviado"
+    });
+  }
+
+  const filePaths = req.files.map(file => file.path);
+  console.log(`📂 Iniciando importação em lote de ${filePaths.length} arquivos...`);
+
+  const dryRun = req.body.dryRun === 'true' || req.query.dryRun === 'true';
+  const workerArgs = [...filePaths, dryRun ? '--dry-run' : '--bulk'];
+  if (isAsyncRequest(req)) {
+    return enqueueWorkerJob(res, 'worker_csv', workerArgs, filePaths);
+  }
+  const pythonProcess = pythonWorkers.spawn('worker_csv', workerArgs);
+
+  let outputData = '';
+  let errorData = '';
+
+  pythonProcess.stdout.on('data', (data) => {
+    const output = data.toString();
+    console.log(`🐍 CSV Log: ${output}`);
+    outputData += output;
+  });
+
+  pythonProcess.stderr.on('data', (data) => {
+    const error = data.toString();
+    console.error(`❌ CSV Erro: ${error}`);
+    errorData += error;
+  });
+
+  pythonProcess.on('close', (code) => {
+    for (const filePath of filePaths) {
+      try {
+        fs.unlinkSync(filePath);
+      } catch (err) {
+        console.error(`⚠️ Erro ao remover arquivo temporário: ${err}`);
+      }
+    }
+
+    // A última linha do worker é o JSON com os totais e o resultado de cada arquivo
+    const lastLine = outputData.trim().split('\n').pop();
+    let stats = null;
+    try {
+      stats = JSON.parse(lastLine);
+    } catch (err) {
+      stats = null;
+    }
+
+    if (!stats) {
+      return res.status(500).json({
+        success: false,
+        message: "Falha ao processar os arquivos.",
+        error: errorData
+      });
+    }
+
+    // Com um único arquivo o worker não entra em modo lote: o JSON é o do próprio arquivo
+    const fileResults = stats.files || [stats];
+    const originalNames = new Map(req.files.map(file => [file.path, file.originalname]));
+    res.status(code === 0 ? 200 : 207).json({
+      success: code === 0,
+      message: code === 0
+        ? `${filePaths.length} arquivos processados com sucesso.`
+        : `${stats.failed_files || 0} de ${filePaths.length} arquivos falharam.`,
+      dryRun,
+      imported: stats.success,
+      duplicates: stats.duplicates,
+      errors: stats.errors,
+      total: stats.total,
+      files: fileResults.map(file => ({
+        ...file,
+        file: originalNames.get(file.file) || path.basename(file.file),
+        rejects_file: file.rejects_file ? path.basename(file.rejects_file) : undefined
+      }))
+    });
+  });
+});
+
 // --- Rota 4: Importar via Google Places API ---
 app.post('/api/import-places-api', (req, res) => {
-  const { city, keywords, maxResults } = req.body;
+  const { city, keywords, maxResults, bbox, polygon, maxDepth, fields } = req.body;
   
   // Validações
   if (!city || !keywords) {
@@ -647,12 +900,33 @@ app.post('/api/import-places-api', (req, res) => {
 
   console.log(`🔍 Iniciando busca Places API: ${cityStr} | Keywords: ${keywordsStr}`);
 
-  const pythonProcess = spawn('python3', [
-    'src/worker_places_api.py',
+  const args = [
     cityStr,
     keywordsStr,
-    maxResultsStr
-  ]);
+    String(maxResultsStr)
+  ];
+
+  // Varredura por tiles: bbox [sul, oeste, norte, leste] ou polígono GeoJSON.
+  // --bbox=valor num só argumento: latitude negativa seria lida como opção
+  if (bbox) {
+    args.push(`--bbox=${Array.isArray(bbox) ? bbox.join(',') : String(bbox)}`);
+  }
+  if (polygon) {
+    args.push('--polygon', typeof polygon === 'string' ? polygon : JSON.stringify(polygon));
+  }
+  if (maxDepth) {
+    args.push('--max-depth', String(parseInt(maxDepth, 10)));
+  }
+  // Perfil de campos: ids | basic | full (custo por chamada)
+  if (fields) {
+    args.push('--fields', String(fields));
+  }
+
+  if (isAsyncRequest(req)) {
+    return enqueueWorkerJob(res, 'worker_places_api', args);
+  }
+
+  const pythonProcess = pythonWorkers.spawn('worker_places_api', args);
 
   let outputData = '';
   let errorData = '';
@@ -718,8 +992,11 @@ app.post('/api/enrich-contacts', (req, res) => {
 
   console.log(`📞 Iniciando enriquecimento: ${placeIdsStr} | Limit: ${limitStr}`);
 
-  const pythonProcess = spawn('python3', [
-    'src/worker_enrich_contacts.py',
+  if (isAsyncRequest(req)) {
+    return enqueueWorkerJob(res, 'worker_enrich_contacts', [placeIdsStr, limitStr]);
+  }
+
+  const pythonProcess = pythonWorkers.spawn('worker_enrich_contacts', [
     placeIdsStr,
     limitStr
   ]);
@@ -769,6 +1046,67 @@ app.post('/api/enrich-contacts', (req, res) => {
   });
 });
 
+// --- Rota 5.1: Jobs em segundo plano (worker_jobs) ---
+// As rotas de importação/enriquecimento com async=true respondem 202 com o
+// jobId; o status, o progresso (última linha do worker) e, ao terminar, o
+// resultado (JSON de estatísticas do worker) ficam aqui.
+app.get('/api/jobs/:id', async (req, res) => {
+  const id = parseInt(req.params.id, 10);
+  if (!id) {
+    return res.status(400).json({ success: false, message: "ID de job inválido" });
+  }
+
+  try {
+    const job = await jobQueue.get(id);
+    if (!job) {
+      return res.status(404).json({ success: false, message: "Job não encontrado" });
+    }
+    res.json({ success: true, job });
+  } catch (err) {
+    console.error('❌ Erro ao buscar job:', err);
+    res.status(500).json({ success: false, message: "Erro ao buscar job" });
+  }
+});
+
+app.get('/api/jobs', async (req, res) => {
+  const { status, limit } = req.query;
+  if (status && !JobQueue.JOB_STATUSES.includes(status)) {
+    return res.status(400).json({ success: false, message: `Status inválido: ${status}` });
+  }
+
+  try {
+    const jobs = await jobQueue.list({ status, limit });
+    res.json({ success: true, count: jobs.length, jobs });
+  } catch (err) {
+    console.error('❌ Erro ao listar jobs:', err);
+    res.status(500).json({ success: false, message: "Erro ao listar jobs" });
+  }
+});
+
+app.post('/api/jobs/:id/cancel', async (req, res) => {
+  const id = parseInt(req.params.id, 10);
+  if (!id) {
+    return res.status(400).json({ success: false, message: "ID de job inválido" });
+  }
+
+  try {
+    const job = await jobQueue.cancel(id);
+    if (!job) {
+      return res.status(409).json({
+        success: false,
+        message: "Só jobs ainda na fila podem ser cancelados"
+      });
+    }
+    for (const filePath of job.files || []) {
+      fs.unlink(filePath, () => {});
+    }
+    res.json({ success: true, message: "Job cancelado", jobId: job.id });
+  } catch (err) {
+    console.error('❌ Erro ao cancelar job:', err);
+    res.status(500).json({ success: false, message: "Erro ao cancelar job" });
+  }
+});
+
 // --- Rota 6: Geocoding (Converter endereço em coordenadas) ---
 app.get('/api/geocode', (req, res) => {
   console.log('🗺️ Requisição de geocoding recebida:', req.query);
@@ -0,0 +1,184 @@
+/**
+ * Job Queue
+ *
+ * Fila de jobs dos workers Python na tabela worker_jobs. As rotas chamadas
+ * com async=true enfileiram o job e respondem 202 com o id; o
+ * src/worker_runner.py (um ou mais, em qualquer máquina com acesso ao banco)
+ * pega os jobs com FOR UPDATE SKIP LOCKED, roda o worker e grava progresso,
+ * saída e resultado. O cliente consulta GET /api/jobs/:id até o job terminar.
+ *
+ * Os arquivos dos jobs (options.files e os argumentos de importação) são
+ * caminhos absolutos em uploads/ desta máquina, apagados pelo runner no fim:
+ * runners em outra máquina só funcionam com esse diretório compartilhado, no
+ * mesmo caminho.
+ */
+
+const pool = require('../db');
+const PythonWorkerPool = require('./pythonWorkerPool');
+
+// Canal do LISTEN do worker_runner.py
+const JOBS_CHANNEL = 'worker_jobs';
+
+const JOB_STATUSES = ['queued', 'running', 'completed', 'failed', 'cancelled'];
+
+// Colunas devolvidas na listagem (sem a saída completa)
+const SUMMARY_COLUMNS = `
+  id, worker, status, attempts, max_attempts, locked_by, progress,
+  exit_code, error_message, created_at, started_at, heartbeat_at, finished_at
+`;
+
+/**
+ * Classe de acesso à fila de jobs
+ */
+class JobQueue {
+  /**
+   * @param {Object} dbPool - Pool de conexões do PostgreSQL
+   */
+  constructor(dbPool = pool) {
+    this.pool = dbPool;
+    this.tableReady = null;
+  }
+
+  /**
+   * Cria a tabela na primeira chamada (ver migrations/006_worker_jobs.sql)
+   *
+   * @returns {Promise<void>}
+   */
+  ensureTable() {
+    if (!this.tableReady) {
+      this.tableReady = this.pool.query(`
+        CREATE TABLE IF NOT EXISTS worker_jobs (
+          id SERIAL PRIMARY KEY,
+          worker VARCHAR(50) NOT NULL,
+          args JSONB NOT NULL DEFAULT '[]',
+          files JSONB NOT NULL DEFAULT '[]',
+          status VARCHAR(20) NOT NULL DEFAULT 'queued'
+            CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+          attempts INTEGER NOT NULL DEFAULT 0,
+          max_attempts INTEGER NOT NULL DEFAULT 3,
+          locked_by VARCHAR(255),
+          progress TEXT,
+          output TEXT,
+          result JSONB,
+          exit_code INTEGER,
+          error_message TEXT,
+          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+          started_at TIMESTAMP,
+          heartbeat_at TIMESTAMP,
+          finished_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_worker_jobs_queued ON worker_jobs (id) WHERE status = 'queued';
+        CREATE INDEX IF NOT EXISTS idx_worker_jobs_status ON worker_jobs (status, created_at);
+      `).catch((err) => {
+        // Tenta de novo na próxima chamada
+        this.tableReady = null;
+        throw err;
+      });
+    }
+    return this.tableReady;
+  }
+
+  /**
+   * Enfileira um job e avisa os runners (NOTIFY)
+   *
+   * @param {string} worker - Nome do worker (ex: 'worker_csv')
+   * @param {Array} [args] - Argumentos da linha de comando do worker
+   * @param {Object} [options]
+   * @param {string[]} [options.files] - Uploads a remover quando o job terminar
+   * @param {number} [options.maxAttempts] - Tentativas se o runner morrer no meio
+   * @returns {Promise<Object>} Job criado (id, worker, status, created_at)
+   */
+  async enqueue(worker, args = [], options = {}) {
+    if (!PythonWorkerPool.WORKER_SCRIPTS[worker]) {
+      throw new Error(`Worker Python desconhecido: ${worker}`);
+    }
+    await this.ensureTable();
+
+    const result = await this.pool.query(
+      `INSERT INTO worker_jobs (worker, args, files, max_attempts)
+       VALUES ($1, $2, $3, $4)
+       RETURNING id, worker, status, created_at`,
+      [
+        worker,
+        JSON.stringify(args.map(String)),
+        JSON.stringify(options.files || []),
+        options.maxAttempts || 3
+      ]
+    );
+    const job = result.rows[0];
+
+    try {
+      await this.pool.query(`SELECT pg_notify($1, $2)`, [JOBS_CHANNEL, String(job.id)]);
+    } catch (err) {
+      // Sem o NOTIFY o runner acha o job no próximo polling
+      console.error('[JobQueue] Erro ao notificar runners:', err.message);
+    }
+    return job;
+  }
+
+  /**
+   * Busca um job com progresso, saída e resultado
+   *
+   * @param {number} id - ID do job
+   * @returns {Promise<Object|null>}
+   */
+  async get(id) {
+    await this.ensureTable();
+    const result = await this.pool.query(
+      `SELECT ${SUMMARY_COLUMNS}, args, result, output FROM worker_jobs WHERE id = $1`,
+      [id]
+    );
+    return result.rows[0] || null;
+  }
+
+  /**
+   * Lista os jobs mais recentes
+   *
+   * @param {Object} [filters]
+   * @param {string} [filters.status] - Filtra por status
+   * @param {number} [filters.limit] - Máximo de jobs (padrão 50, até 500)
+   * @returns {Promise<Object[]>}
+   */
+  async list(filters = {}) {
+    await this.ensureTable();
+    const limit = Math.min(Math.max(parseInt(filters.limit, 10) || 50, 1), 500);
+    const params = [limit];
+    let where = '';
+    if (filters.status) {
+      if (!JOB_STATUSES.includes(filters.status)) {
+        throw new Error(`Status inválido: ${filters.status}`);
+      }
+      params.push(filters.status);
+      where = 'WHERE status = $2';
+    }
+    const result = await this.pool.query(
+      `SELECT ${SUMMARY_COLUMNS} FROM worker_jobs ${where} ORDER BY id DESC LIMIT $1`,
+      params
+    );
+    return result.rows;
+  }
+
+  /**
+   * Cancela um job que ainda está na fila
+   *
+   * Jobs já em execução não são interrompidos.
+   *
+   * @param {number} id - ID do job
+   * @returns {Promise<Object|null>} Job cancelado, ou null se não estava na fila
+   */
+  async cancel(id) {
+    await this.ensureTable();
+    const result = await this.pool.query(
+      `UPDATE worker_jobs
+       SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP
+       WHERE id = $1 AND status = 'queued'
+       RETURNING id, status, files`,
+      [id]
+    );
+    return result.rows[0] || null;
+  }
+}
+
+JobQueue.JOB_STATUSES = JOB_STATUSES;
+
+module.exports = JobQueue;
@@ -0,0 +1,170 @@
+/**
+ * Unit Tests for Job Queue
+ *
+ * Tests the JobQueue class functionality including:
+ * - Enqueueing jobs and notifying runners
+ * - Fetching and listing jobs
+ * - Cancelling queued jobs
+ */
+
+const JobQueue = require('./jobQueue');
+
+describe('JobQueue', () => {
+  let queue;
+  let mockPool;
+
+  beforeEach(() => {
+    // Mock do pool de conexões
+    mockPool = {
+      query: jest.fn().mockResolvedValue({ rows: [] })
+    };
+
+    queue = new JobQueue(mockPool);
+  });
+
+  afterEach(() => {
+    jest.clearAllMocks();
+  });
+
+  describe('ensureTable', () => {
+    it('should create the table only once', async () => {
+      await queue.ensureTable();
+      await queue.ensureTable();
+
+      expect(mockPool.query).toHaveBeenCalledTimes(1);
+      expect(mockPool.query).toHaveBeenCalledWith(
+        expect.stringContaining('CREATE TABLE IF NOT EXISTS worker_jobs')
+      );
+    });
+
+    it('should retry table creation after a failure', async () => {
+      mockPool.query.mockRejectedValueOnce(new Error('connection refused'));
+
+      await expect(queue.ensureTable()).rejects.toThrow('connection refused');
+      await queue.ensureTable();
+
+      expect(mockPool.query).toHaveBeenCalledTimes(2);
+    });
+  });
+
+  describe('enqueue', () => {
+    it('should insert the job with stringified args and notify runners', async () => {
+      const job = { id: 7, worker: 'worker_csv', status: 'queued' };
+      mockPool.query
+        .mockResolvedValueOnce({ rows: [] })
+        .mockResolvedValueOnce({ rows: [job] })
+        .mockResolvedValueOnce({ rows: [] });
+
+      const result = await queue.enqueue('worker_csv', ['/uploads/a.csv', '--bulk'], {
+        files: ['/uploads/a.csv']
+      });
+
+      expect(result).toEqual(job);
+      expect(mockPool.query).toHaveBeenNthCalledWith(
+        2,
+        expect.stringContaining('INSERT INTO worker_jobs'),
+        ['worker_csv', '["/uploads/a.csv","--bulk"]', '["/uploads/a.csv"]', 3]
+      );
+      expect(mockPool.query).toHaveBeenNthCalledWith(
+        3,
+        expect.stringContaining('pg_notify'),
+        ['worker_jobs', '7']
+      );
+    });
+
+    it('should convert numeric args to strings', async () => {
+      mockPool.query
+        .mockResolvedValueOnce({ rows: [] })
+        .mockResolvedValueOnce({ rows: [{ id: 1 }] });
+
+      await queue.enqueue('worker_enrich_contacts', ['all', 20]);
+
+      expect(mockPool.query.mock.calls[1][1][1]).toBe('["all","20"]');
+    });
+
+    it('should still return the job when NOTIFY fails', async () => {
+      const consoleSpy = jest.spyOn(console, 'error').mockImplementation();
+      mockPool.query
+        .mockResolvedValueOnce({ rows: [] })
+        .mockResolvedValueOnce({ rows: [{ id: 3 }] })
+        .mockRejectedValueOnce(new Error('notify failed'));
+
+      const result = await queue.enqueue('worker_places_api', ['Jundiaí, SP', 'mercado']);
+
+      expect(result).toEqual({ id: 3 });
+      expect(consoleSpy).toHaveBeenCalled();
+      consoleSpy.mockRestore();
+    });
+
+    it('should reject unknown workers without touching the database', async () => {
+      await expect(queue.enqueue('rm -rf', [])).rejects.toThrow('Worker Python desconhecido');
+
+      expect(mockPool.query).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('get', () => {
+    it('should return the job with output and result', async () => {
+      const job = { id: 5, status: 'completed', result: { success: 10 } };
+      mockPool.query
+        .mockResolvedValueOnce({ rows: [] })
+        .mockResolvedValueOnce({ rows: [job] });
+
+      const result = await queue.get(5);
+
+      expect(result).toEqual(job);
+      expect(mockPool.query).toHaveBeenLastCalledWith(
+        expect.stringContaining('WHERE id = $1'),
+        [5]
+      );
+    });
+
+    it('should return null for a missing job', async () => {
+      expect(await queue.get(999)).toBeNull();
+    });
+  });
+
+  describe('list', () => {
+    it('should filter by status and cap the limit', async () => {
+      await queue.list({ status: 'running', limit: 10000 });
+
+      expect(mockPool.query).toHaveBeenLastCalledWith(
+        expect.stringContaining('WHERE status = $2'),
+        [500, 'running']
+      );
+    });
+
+    it('should default to the 50 most recent jobs', async () => {
+      await queue.list();
+
+      expect(mockPool.query).toHaveBeenLastCalledWith(
+        expect.stringContaining('ORDER BY id DESC LIMIT $1'),
+        [50]
+      );
+    });
+
+    it('should reject an invalid status', async () => {
+      await expect(queue.list({ status: 'done' })).rejects.toThrow('Status inválido');
+    });
+  });
+
+  describe('cancel', () => {
+    it('should only cancel queued jobs', async () => {
+      mockPool.query
+        .mockResolvedValueOnce({ rows: [] })
+        .mockResolvedValueOnce({ rows: [{ id: 4, status: 'cancelled', files: [] }] });
+
+      const result = await queue.cancel(4);
+
+      expect(result).toEqual({ id: 4, status: 'cancelled', files: [] });
+      expect(mockPool.query).toHaveBeenLastCalledWith(
+        expect.stringContaining("AND status = 'queued'"),
+        [4]
+      );
+    });
+
+    it('should return null when the job is not queued', async () => {
+      expect(await queue.cancel(4)).toBeNull();
+    });
+  });
+});
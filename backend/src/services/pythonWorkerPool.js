@@ -0,0 +1,239 @@
+/**
+ * Python Worker Pool
+ *
+ * Mantém processos de src/worker_daemon.py vivos e despacha os jobs dos
+ * workers Python (worker_csv, worker_places_api, ...) por JSON-RPC, uma
+ * mensagem por linha no stdin/stdout do daemon. Interpretador, imports,
+ * pool de conexões e sessões HTTP ficam quentes entre requisições, em vez
+ * de um spawn('python3', ...) por requisição.
+ *
+ * pool.spawn(worker, args) devolve um objeto com a mesma interface usada
+ * nas rotas com child_process.spawn (stdout/stderr emitindo 'data', evento
+ * 'close' com o código de saída e kill()), então trocar uma pela outra não
+ * muda o tratamento de saída das rotas.
+ *
+ * PY_WORKER_DAEMON=0 volta ao spawn por requisição.
+ */
+
+const { spawn } = require('child_process');
+const { EventEmitter } = require('events');
+const path = require('path');
+const readline = require('readline');
+
+// Script de cada worker (modo spawn por requisição)
+const WORKER_SCRIPTS = {
+  worker: 'src/worker.py',
+  worker_csv: 'src/worker_csv.py',
+  worker_geo: 'src/worker_geo.py',
+  worker_places_api: 'src/worker_places_api.py',
+  worker_enrich_contacts: 'src/worker_enrich_contacts.py'
+};
+
+const DAEMON_SCRIPT = 'src/worker_daemon.py';
+
+/**
+ * Job despachado para um daemon, com a interface de um ChildProcess
+ */
+class WorkerJob extends EventEmitter {
+  constructor(pool, id, worker, args) {
+    super();
+    this.pool = pool;
+    this.id = id;
+    this.worker = worker;
+    this.args = args;
+    this.stdout = new EventEmitter();
+    this.stderr = new EventEmitter();
+    this.daemon = null;
+    this.finished = false;
+  }
+
+  /**
+   * Interrompe o job: se já estiver rodando, o daemon dele é encerrado
+   * (e substituído por outro no próximo job)
+   */
+  kill(signal = 'SIGTERM') {
+    if (this.finished) {
+      return false;
+    }
+    if (this.daemon) {
+      this.daemon.proc.kill(signal);
+    } else {
+      this.pool.queue = this.pool.queue.filter(job => job !== this);
+      this.finish(null);
+    }
+    return true;
+  }
+
+  finish(code) {
+    if (this.finished) {
+      return;
+    }
+    this.finished = true;
+    this.emit('close', code);
+  }
+}
+
+/**
+ * Pool de processos worker_daemon.py
+ */
+class PythonWorkerPool {
+  /**
+   * @param {Object} [options]
+   * @param {number} [options.size] - Máximo de daemons (PY_WORKER_POOL_SIZE, padrão 4)
+   * @param {boolean} [options.useDaemon] - false = spawn por requisição (PY_WORKER_DAEMON=0)
+   * @param {string} [options.python] - Executável do Python (PYTHON_BIN, padrão python3)
+   * @param {string} [options.cwd] - Diretório dos processos (padrão: backend/)
+   * @param {Function} [options.spawnFn] - child_process.spawn (substituível nos testes)
+   */
+  constructor(options = {}) {
+    this.size = options.size || parseInt(process.env.PY_WORKER_POOL_SIZE || '4', 10);
+    this.useDaemon = options.useDaemon !== undefined
+      ? options.useDaemon
+      : process.env.PY_WORKER_DAEMON !== '0';
+    this.python = options.python || process.env.PYTHON_BIN || 'python3';
+    this.cwd = options.cwd || path.join(__dirname, '..', '..');
+    this.spawnFn = options.spawnFn || spawn;
+    this.daemons = [];
+    this.queue = [];
+    this.nextId = 1;
+  }
+
+  /**
+   * Roda um worker com os argumentos da linha de comando dele
+   *
+   * @param {string} worker - Nome do worker (ex: 'worker_csv')
+   * @param {string[]} [args] - Argumentos (ex: [filePath, '--bulk'])
+   * @returns {WorkerJob|ChildProcess} Objeto com stdout/stderr ('data'), 'close' e kill()
+   */
+  spawn(worker, args = []) {
+    if (!WORKER_SCRIPTS[worker]) {
+      throw new Error(`Worker Python desconhecido: ${worker}`);
+    }
+    const argv = args.map(String);
+
+    if (!this.useDaemon) {
+      return this.spawnFn(this.python, [WORKER_SCRIPTS[worker], ...argv], { cwd: this.cwd });
+    }
+
+    const job = new WorkerJob(this, this.nextId++, worker, argv);
+    this.queue.push(job);
+    // Assíncrono para quem chamou registrar os listeners antes da primeira saída
+    setImmediate(() => this.dispatch());
+    return job;
+  }
+
+  /**
+   * Entrega jobs da fila a daemons livres, subindo novos até o tamanho do pool
+   */
+  dispatch() {
+    while (this.queue.length > 0) {
+      let daemon = this.daemons.find(d => !d.job && !d.exited);
+      if (!daemon) {
+        if (this.daemons.length >= this.size) {
+          return;
+        }
+        daemon = this.startDaemon();
+      }
+
+      const job = this.queue.shift();
+      daemon.job = job;
+      job.daemon = daemon;
+      daemon.proc.stdin.write(JSON.stringify({
+        jsonrpc: '2.0',
+        id: job.id,
+        method: job.worker,
+        params: job.args
+      }) + '\n');
+    }
+  }
+
+  startDaemon() {
+    const proc = this.spawnFn(this.python, [DAEMON_SCRIPT], { cwd: this.cwd });
+    const daemon = { proc, job: null, exited: false };
+    this.daemons.push(daemon);
+
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (err) {
+        console.error(`⚠️ Worker daemon: linha inválida: ${line}`);
+        return;
+      }
+      this.handleMessage(daemon, message);
+    });
+
+    // Saída fora de um job (ex.: avisos de import)
+    proc.stderr.on('data', (data) => {
+      console.error(`🐍 Worker daemon: ${data}`);
+    });
+
+    // stdin fechado no meio de uma escrita: o 'exit' abaixo já trata o job
+    proc.stdin.on('error', () => {});
+
+    const onExit = (err) => {
+      if (daemon.exited) {
+        return;
+      }
+      daemon.exited = true;
+      this.daemons = this.daemons.filter(d => d !== daemon);
+      if (err) {
+        console.error(`❌ Worker daemon: ${err.message}`);
+      }
+      const job = daemon.job;
+      daemon.job = null;
+      if (job) {
+        job.stderr.emit('data', `Worker daemon encerrado durante o job${err ? `: ${err.message}` : ''}\n`);
+        job.finish(null);
+      }
+      this.dispatch();
+    };
+    proc.on('exit', () => onExit());
+    proc.on('error', onExit);
+
+    return daemon;
+  }
+
+  handleMessage(daemon, message) {
+    const job = daemon.job;
+
+    if (message.method === 'output') {
+      const { id, stream, data } = message.params || {};
+      if (job && id === job.id) {
+        job[stream === 'stderr' ? 'stderr' : 'stdout'].emit('data', data);
+      }
+      return;
+    }
+
+    if (!job || message.id !== job.id) {
+      return; // 'ready' e respostas de jobs já encerrados
+    }
+
+    daemon.job = null;
+    if (message.error) {
+      job.stderr.emit('data', `${message.error.message}\n`);
+      job.finish(1);
+    } else {
+      job.finish(message.result.code);
+    }
+    this.dispatch();
+  }
+
+  /**
+   * Encerra todos os daemons e descarta os jobs na fila
+   */
+  close() {
+    for (const job of this.queue) {
+      job.finish(null);
+    }
+    this.queue = [];
+    for (const daemon of this.daemons) {
+      daemon.proc.stdin.end();
+      daemon.proc.kill();
+    }
+  }
+}
+
+PythonWorkerPool.WORKER_SCRIPTS = WORKER_SCRIPTS;
+
+module.exports = PythonWorkerPool;
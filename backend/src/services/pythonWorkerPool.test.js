@@ -0,0 +1,189 @@
+/**
+ * Unit Tests for Python Worker Pool
+ *
+ * Tests the PythonWorkerPool dispatch over JSON-RPC:
+ * - Job output and exit code relayed like a ChildProcess
+ * - Queueing beyond the pool size
+ * - Daemon crash and kill() handling
+ * - Spawn-per-request fallback
+ */
+
+const { EventEmitter } = require('events');
+const { PassThrough } = require('stream');
+const PythonWorkerPool = require('./pythonWorkerPool');
+
+/**
+ * Processo falso do worker_daemon.py: guarda as requisições recebidas e
+ * permite responder linha a linha
+ */
+function createFakeDaemon() {
+  const proc = new EventEmitter();
+  proc.stdout = new PassThrough();
+  proc.stderr = new PassThrough();
+  proc.requests = [];
+  proc.stdin = new PassThrough();
+  proc.stdin.on('data', (chunk) => {
+    chunk.toString().trim().split('\n').forEach(line => proc.requests.push(JSON.parse(line)));
+  });
+  proc.kill = jest.fn(() => setImmediate(() => proc.emit('exit', null, 'SIGTERM')));
+  proc.reply = (message) => proc.stdout.write(JSON.stringify({ jsonrpc: '2.0', ...message }) + '\n');
+  return proc;
+}
+
+// Deixa o setImmediate do dispatch e os streams entregarem os dados
+const flush = () => new Promise(resolve => setImmediate(() => setImmediate(resolve)));
+
+describe('PythonWorkerPool', () => {
+  let daemons;
+  let spawnFn;
+  let pool;
+
+  beforeEach(() => {
+    daemons = [];
+    spawnFn = jest.fn(() => {
+      const proc = createFakeDaemon();
+      daemons.push(proc);
+      return proc;
+    });
+    pool = new PythonWorkerPool({ size: 2, useDaemon: true, spawnFn, cwd: '/tmp' });
+  });
+
+  afterEach(() => {
+    jest.clearAllMocks();
+  });
+
+  describe('spawn', () => {
+    it('should send the job as a JSON-RPC request to a daemon', async () => {
+      pool.spawn('worker_csv', ['/uploads/a.csv', '--bulk']);
+      await flush();
+
+      expect(spawnFn).toHaveBeenCalledWith('python3', ['src/worker_daemon.py'], { cwd: '/tmp' });
+      expect(daemons[0].requests).toEqual([
+        { jsonrpc: '2.0', id: 1, method: 'worker_csv', params: ['/uploads/a.csv', '--bulk'] }
+      ]);
+    });
+
+    it('should relay output and exit code like a child process', async () => {
+      const job = pool.spawn('worker_places_api', ['Jundiaí, SP', 'mercado']);
+      const stdout = [];
+      const stderr = [];
+      const onClose = jest.fn();
+      job.stdout.on('data', data => stdout.push(data.toString()));
+      job.stderr.on('data', data => stderr.push(data.toString()));
+      job.on('close', onClose);
+      await flush();
+
+      daemons[0].reply({ method: 'output', params: { id: 1, stream: 'stderr', data: 'log\n' } });
+      daemons[0].reply({ method: 'output', params: { id: 1, stream: 'stdout', data: '{"success": 3}\n' } });
+      daemons[0].reply({ id: 1, result: { code: 0, elapsed_ms: 10 } });
+      await flush();
+
+      expect(stdout).toEqual(['{"success": 3}\n']);
+      expect(stderr).toEqual(['log\n']);
+      expect(onClose).toHaveBeenCalledWith(0);
+    });
+
+    it('should reuse an idle daemon for the next job', async () => {
+      const first = pool.spawn('worker_csv', ['a.csv']);
+      await flush();
+      daemons[0].reply({ id: 1, result: { code: 0 } });
+      await flush();
+
+      pool.spawn('worker_csv', ['b.csv']);
+      await flush();
+
+      expect(first.finished).toBe(true);
+      expect(spawnFn).toHaveBeenCalledTimes(1);
+      expect(daemons[0].requests.map(r => r.params[0])).toEqual(['a.csv', 'b.csv']);
+    });
+
+    it('should queue jobs beyond the pool size', async () => {
+      pool.spawn('worker_csv', ['a.csv']);
+      pool.spawn('worker_csv', ['b.csv']);
+      pool.spawn('worker_csv', ['c.csv']);
+      await flush();
+
+      expect(spawnFn).toHaveBeenCalledTimes(2);
+      expect(pool.queue).toHaveLength(1);
+
+      daemons[1].reply({ id: 2, result: { code: 0 } });
+      await flush();
+
+      expect(pool.queue).toHaveLength(0);
+      expect(daemons[1].requests.map(r => r.params[0])).toEqual(['b.csv', 'c.csv']);
+    });
+
+    it('should report JSON-RPC errors as exit code 1', async () => {
+      const job = pool.spawn('worker', []);
+      const onClose = jest.fn();
+      job.on('close', onClose);
+      await flush();
+
+      daemons[0].reply({ id: 1, error: { code: -32601, message: 'Worker desconhecido' } });
+      await flush();
+
+      expect(onClose).toHaveBeenCalledWith(1);
+    });
+
+    it('should throw for unknown workers', () => {
+      expect(() => pool.spawn('rm -rf')).toThrow('Worker Python desconhecido');
+    });
+  });
+
+  describe('failures', () => {
+    it('should close a running job with null when its daemon dies', async () => {
+      const job = pool.spawn('worker_csv', ['a.csv']);
+      const onClose = jest.fn();
+      job.on('close', onClose);
+      await flush();
+
+      daemons[0].emit('exit', 1, null);
+      await flush();
+
+      expect(onClose).toHaveBeenCalledWith(null);
+      expect(pool.daemons).toHaveLength(0);
+    });
+
+    it('should kill the daemon running a job on kill()', async () => {
+      const job = pool.spawn('worker_csv', ['a.csv', '--preview']);
+      const onClose = jest.fn();
+      job.on('close', onClose);
+      await flush();
+
+      job.kill('SIGKILL');
+      await flush();
+
+      expect(daemons[0].kill).toHaveBeenCalledWith('SIGKILL');
+      expect(onClose).toHaveBeenCalledWith(null);
+    });
+
+    it('should drop a queued job on kill() without touching daemons', async () => {
+      pool.spawn('worker_csv', ['a.csv']);
+      pool.spawn('worker_csv', ['b.csv']);
+      const queued = pool.spawn('worker_csv', ['c.csv']);
+      const onClose = jest.fn();
+      queued.on('close', onClose);
+      await flush();
+
+      queued.kill();
+
+      expect(onClose).toHaveBeenCalledWith(null);
+      expect(pool.queue).toHaveLength(0);
+      expect(daemons[0].kill).not.toHaveBeenCalled();
+    });
+  });
+
+  describe('spawn per request', () => {
+    it('should spawn the worker script directly when the daemon is disabled', () => {
+      const direct = new PythonWorkerPool({ useDaemon: false, spawnFn, cwd: '/tmp' });
+
+      direct.spawn('worker_enrich_contacts', ['all', 20]);
+
+      expect(spawnFn).toHaveBeenCalledWith(
+        'python3',
+        ['src/worker_enrich_contacts.py', 'all', '20'],
+        { cwd: '/tmp' }
+      );
+    });
+  });
+});
@@ -1,15 +1,83 @@
 # backend/src/worker_csv.py
 import sys
 import os
+import io
 import csv
+import glob
+import gzip
+import json
+import hashlib
+import importlib
+import itertools
+import math
+import time
+import argparse
+import collections
+import contextlib
+import functools
+import multiprocessing
+import zipfile
+import zlib
 import psycopg2
+from psycopg2.extras import execute_values
 
-# Configurações do Banco
-DB_HOST = os.getenv("DB_HOST", "76.13.173.70")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "suphelp_geo")
-DB_USER = os.getenv("DB_USER", "admin")
-DB_PASS = os.getenv("DB_PASS", "***REMOVED***")
+import db
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional: sem ele, parse_float_column usa parse_float valor a valor
+    np = None
+
+# Registros por lote: cada lote é verificado (duplicatas), inserido e commitado
+CHUNK_SIZE = 5000
+
+# Formatos lidos sem passar por texto delimitado (extensão -> formato)
+TABULAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.xlsx': 'xlsx',
+}
+
+# Camadas de pontos lidas por worker_geo.py (extensão -> formato); aceitam
+# .gz/.zst, e .kmz é um KML dentro de um .zip
+GEO_FORMATS = {
+    '.geojson': 'geojson',
+    '.json': 'geojson',
+    '.geojsonl': 'geojsonseq',
+    '.geojsons': 'geojsonseq',
+    '.ndjson': 'geojsonseq',
+    '.kml': 'kml',
+    '.kmz': 'kml',
+}
+
+# Arquivo procurado dentro de um .zip, por formato
+ZIP_MEMBER_EXTENSIONS = {
+    'csv': ('.csv', '.txt'),
+    'geojson': ('.geojson', '.json'),
+    'geojsonseq': ('.geojsonl', '.geojsons', '.ndjson'),
+    'kml': ('.kml',),
+}
+
+# Prévia de importação: só o começo do arquivo, com tempo máximo de resposta
+PREVIEW_KB = 64
+PREVIEW_ROWS = 10
+PREVIEW_BUDGET_MS = 1000
+
+# CSV comprimido (extensão -> compressão), descomprimido em streaming
+COMPRESSED_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.zip': 'zip',
+    '.zst': 'zstd',
+    '.kmz': 'zip',
+}
+
+# Exemplos de linhas rejeitadas mostrados no stdout (o resto vai só para o arquivo)
+MAX_REJECT_SAMPLES = 10
+
+# Tamanho (bytes) de cada faixa do arquivo convertida por um worker no modo paralelo
+RANGE_SIZE = 8 * 1024 * 1024
 
 # Mapeamento flexível de nomes de colunas
 COLUMN_MAP = {
@@ -56,12 +124,29 @@ def normalize_columns(headers):
     return mapping
 
 def get_val(row, col_map, field, default=''):
-    """Pega valor de uma coluna mapeada"""
+    """Pega valor de uma coluna mapeada.
+
+    Strings voltam sem espaços; valores tipados (Parquet/Arrow/XLSX) voltam
+    como estão, e None conta como vazio.
+    """
     if field in col_map and col_map[field] < len(row):
-        val = row[col_map[field]].strip()
-        return val if val else default
+        val = row[col_map[field]]
+        if val is None:
+            return default
+        if isinstance(val, str):
+            val = val.strip()
+            return val if val else default
+        return val
     return default
 
+def as_text(val):
+    """Converte um valor tipado de planilha/Parquet em texto (ex.: telefone numérico)."""
+    if isinstance(val, str):
+        return val
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val)
+
 def parse_float(val):
     """Converte string para float, tratando formatos brasileiros e internacionais.
     Exemplos que precisa tratar:
@@ -130,126 +215,1471 @@ def parse_float(val):
     except ValueError:
         return None
 
-def import_csv(file_path):
-    conn = None
+# Limites do caminho vetorizado de parse_float_column. Acima deles o valor cai
+# no parse_float normal: mantissa até 2**53 e divisor até 10**22 são exatos em
+# float64, então mantissa / 10**k arredonda igual ao float() do Python.
+VECTOR_MAX_LEN = 64
+VECTOR_MAX_DIGITS = 18
+POW10 = [float(10 ** i) for i in range(23)]
+# Tabela code point -> é branco (str.isspace); 0 é o preenchimento da matriz
+WHITESPACE_TABLE = [c == 0 or chr(c).isspace() for c in range(0x3002)]
+
+def parse_float_column(values):
+    """Versão colunar de parse_float: converte uma lista de strings de uma vez.
+
+    Aplica as mesmas regras de parse_float (vírgula/ponto brasileiros, limpeza
+    de caracteres e divisão por 10 até caber em +-180) sobre uma matriz NumPy
+    de code points, sem laço Python por caractere. O resultado é bit a bit
+    igual ao de parse_float; valores longos demais para o caminho exato são
+    convertidos com parse_float.
+
+    Returns:
+        Lista de float ou None, na mesma ordem de `values`
+    """
+    typed = [i for i, v in enumerate(values) if v is not None and not isinstance(v, str)]
+    if typed:
+        # Colunas tipadas (Parquet/Arrow/XLSX): números já vêm prontos, sem as
+        # regras de formato brasileiro; o que não for número vira texto
+        result = parse_float_column([v if isinstance(v, str) else '' for v in values])
+        for i in typed:
+            v = values[i]
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                result[i] = float(v) if math.isfinite(v) else None
+            else:
+                result[i] = parse_float(as_text(v))
+        return result
+
+    if np is None or not values:
+        return [parse_float(v) for v in values]
+
+    values = [v or '' for v in values]
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    short = lengths <= VECTOR_MAX_LEN
+    if not short.all():
+        idx = np.flatnonzero(short)
+        result = [None] * len(values)
+        if len(idx):
+            for i, v in zip(idx.tolist(), parse_float_column([values[i] for i in idx.tolist()])):
+                result[i] = v
+        for i in np.flatnonzero(~short).tolist():
+            result[i] = parse_float(values[i])
+        return result
+
+    # Matriz (n, largura) de code points; posições vazias ficam com 0
+    arr = np.array(values, dtype=str)
+    width = max(arr.dtype.itemsize // 4, 1)
+    codes = arr.view(np.uint32).reshape(len(values), width)
+
+    is_digit = (codes >= 48) & (codes <= 57)
+    is_dot = codes == 46
+    is_comma = codes == 44
+    num_dots = is_dot.sum(axis=1)
+    num_commas = is_comma.sum(axis=1)
+
+    # Sinal: primeiro caractere não-branco é '-' (igual a strip + startswith)
+    blank = np.array(WHITESPACE_TABLE)[np.minimum(codes, len(WHITESPACE_TABLE) - 1)]
+    first_char = codes[np.arange(len(values)), (~blank).argmax(axis=1)]
+    negative = first_char == 45
+
+    # Separador decimal efetivo: a vírgula quando há exatamente uma (pontos
+    # viram milhar), senão o primeiro ponto; sem separador, fica após o fim
+    decimal_pos = np.where(
+        num_commas == 1, is_comma.argmax(axis=1),
+        np.where(num_dots >= 1, is_dot.argmax(axis=1), width)
+    )
+
+    # Mantissa inteira com todos os dígitos (Horner coluna a coluna) e
+    # quantidade de dígitos depois do separador
+    mantissa = np.zeros(len(values), dtype=np.int64)
+    frac_digits = np.zeros(len(values), dtype=np.int64)
+    digit_values = codes.astype(np.int64) - 48
+    with np.errstate(over='ignore'):
+        for j in range(width):
+            col = is_digit[:, j]
+            mantissa = np.where(col, mantissa * 10 + digit_values[:, j], mantissa)
+            frac_digits += col & (j > decimal_pos)
+
+    num_digits = is_digit.sum(axis=1)
+    exact = (
+        (num_digits > 0) & (num_digits <= VECTOR_MAX_DIGITS)
+        & (mantissa <= 2 ** 53) & (frac_digits < len(POW10))
+    )
+
+    divisor = np.array(POW10)[np.minimum(frac_digits, len(POW10) - 1)]
+    result = mantissa.astype(np.float64) / divisor
+    result = np.where(negative, -result, result)
+
+    # Mesma correção de parse_float: divide por 10 até |valor| <= 180
+    out_of_range = exact & (np.abs(result) > 180)
+    while out_of_range.any():
+        result[out_of_range] = result[out_of_range] / 10
+        out_of_range = exact & (np.abs(result) > 180)
+
+    parsed = result.tolist()
+    for i in np.flatnonzero(~exact).tolist():
+        parsed[i] = parse_float(values[i]) if num_digits[i] else None
+    return parsed
+
+class OffsetLineReader:
+    """Itera as linhas de um arquivo binário registrando offset e número da linha.
+
+    O csv.reader consome uma linha por vez, só quando precisa; assim, logo
+    depois de um registro ser entregue, `offset` é o byte exato onde ele
+    termina e `line_no` é sua última linha física. É isso que permite gravar
+    checkpoints e retomar a importação com seek().
+
+    Os bytes lidos também alimentam um SHA-256 (prefixado por `seed`), usado
+    como hash de conteúdo de cada lote no manifesto de importação.
+    """
+
+    def __init__(self, f, offset=0, line_no=0):
+        self.f = f
+        self.offset = offset
+        self.line_no = line_no
+        self.start_digest(b'')
+
+    def seek(self, offset, line_no):
+        self.f.seek(offset)
+        self.offset = offset
+        self.line_no = line_no
+        self.start_digest(self.seed)
+
+    def start_digest(self, seed):
+        self.seed = seed
+        self._digest = hashlib.sha256(seed)
+
+    def take_digest(self):
+        """Hash dos bytes lidos desde a última chamada; reinicia o acumulador."""
+        value = self._digest.hexdigest()
+        self.start_digest(self.seed)
+        return value
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        raw = self.f.readline()
+        if not raw:
+            raise StopIteration
+        self.offset += len(raw)
+        self.line_no += 1
+        self._digest.update(raw)
+        return raw.decode('utf-8', errors='replace')
+
+def compression_of(file_path):
+    """Compressão do arquivo pela extensão (None se não for comprimido)."""
+    lower = file_path.lower()
+    for ext, compression in COMPRESSED_EXTENSIONS.items():
+        if lower.endswith(ext):
+            return compression
+    return None
+
+def open_input(file_path, fmt='csv'):
+    """Abre o arquivo de entrada em modo binário, descomprimindo em streaming.
+
+    .csv.gz, .zip (primeiro arquivo do formato esperado) e .zst são lidos
+    direto do arquivo comprimido, sem gravar cópia descomprimida em disco.
+    Offsets de checkpoint passam a ser posições no conteúdo descomprimido.
+    """
+    compression = compression_of(file_path)
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'zip':
+        with zipfile.ZipFile(file_path) as zf:
+            members = [m for m in zf.infolist()
+                       if not m.is_dir() and not m.filename.startswith('__MACOSX/')]
+            expected = ZIP_MEMBER_EXTENSIONS.get(fmt, ZIP_MEMBER_EXTENSIONS['csv'])
+            matches = [m for m in members if m.filename.lower().endswith(expected)]
+            if not matches and len(members) != 1:
+                raise ValueError(f"Nenhum arquivo {'/'.join(expected)} encontrado em {file_path}")
+            member = (matches or members)[0]
+            print(f"📦 Lendo {member.filename} de dentro do .zip")
+            # O membro aberto mantém o arquivo .zip aberto até ser fechado
+            return zf.open(member)
+    if compression == 'zstd':
+        return io.BufferedReader(ZstdInput(file_path), buffer_size=1024 * 1024)
+    return open(file_path, 'rb')
+
+class ZstdInput(io.RawIOBase):
+    """Leitura de .zst com seek() para trás (o stream_reader só avança).
+
+    Voltar (ex.: depois de ler a amostra do Sniffer) reabre o stream e
+    descarta bytes até a posição pedida; seek para frente só descomprime.
+    """
+
+    def __init__(self, file_path):
+        self.zstd = require_module('zstandard', '.zst')
+        self.file_path = file_path
+        self._reader = None
+        self._open()
+
+    def _open(self):
+        if self._reader:
+            self._reader.close()
+        self._reader = self.zstd.ZstdDecompressor().stream_reader(
+            open(self.file_path, 'rb'), closefd=True
+        )
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._reader.read(len(buffer))
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("seek a partir do fim não suportado em .zst")
+        if offset < self._pos:
+            self._open()
+        while self._pos < offset:
+            data = self._reader.read(min(offset - self._pos, 1024 * 1024))
+            if not data:
+                break
+            self._pos += len(data)
+        return self._pos
+
+    def close(self):
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+        super().close()
+
+def map_columns(headers):
+    """Mapeia o header; ValueError se faltar coluna obrigatória.
+
+    No modo lote o erro marca só o arquivo como falho; num arquivo único
+    import_csv encerra o worker com código 1.
+    """
+    col_map = normalize_columns(headers)
+
+    print(f"📋 Colunas encontradas: {[h.strip() for h in headers]}")
+    print(f"📋 Mapeamento: {col_map}")
+
+    # Verifica colunas obrigatórias
+    if 'name' not in col_map:
+        raise ValueError("Coluna 'name' ou 'Nome' não encontrada no arquivo")
+
+    if 'lat' not in col_map or 'lon' not in col_map:
+        raise ValueError("Colunas de latitude/longitude não encontradas no arquivo "
+                         "(esperado: lat/latitude e lon/lng/longitude)")
+
+    return col_map
+
+def sniff_delimiter(sample):
+    """Detecta delimitador (vírgula, ponto-e-vírgula ou tab); vírgula se não der."""
+    sniffer = csv.Sniffer()
     try:
-        # 1. Detecta delimitador e lê o CSV
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            sample = f.read(4096)
-            f.seek(0)
-            
-            # Detecta delimitador (vírgula ou ponto-e-vírgula)
-            sniffer = csv.Sniffer()
-            try:
-                dialect = sniffer.sniff(sample, delimiters=',;\t')
-                delimiter = dialect.delimiter
-            except csv.Error:
-                delimiter = ','
-            
-            print(f"📋 Delimitador detectado: '{delimiter}'")
-            
-            reader = csv.reader(f, delimiter=delimiter)
-            
-            # Lê header
-            headers = next(reader)
-            col_map = normalize_columns(headers)
-            
-            print(f"📋 Colunas encontradas: {[h.strip() for h in headers]}")
-            print(f"📋 Mapeamento: {col_map}")
-            
-            # Verifica colunas obrigatórias
-            if 'name' not in col_map:
-                print("❌ Coluna 'name' ou 'Nome' não encontrada no CSV")
-                sys.exit(1)
-            
-            if 'lat' not in col_map or 'lon' not in col_map:
-                print("❌ Colunas de latitude/longitude não encontradas no CSV")
-                print("   Esperado: lat/latitude e lon/lng/longitude")
-                sys.exit(1)
-            
-            # Lê todas as linhas
-            rows = list(reader)
-        
-        print(f"📄 {len(rows)} registros encontrados.")
+        return sniffer.sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        return ','
 
-        if len(rows) == 0:
-            print("Sucesso: 0")
-            print("Duplicados: 0")
-            print("Erros: 0")
-            print("Total processado: 0")
-            return
+def open_csv_reader(f):
+    """Detecta delimitador, lê o header e mapeia as colunas.
+
+    Args:
+        f: arquivo aberto em modo binário
+
+    Returns:
+        (reader, col_map, lines) - csv.reader posicionado na primeira linha de
+        dados e o OffsetLineReader que o alimenta
+    """
+    sample = f.read(4096).decode('utf-8', errors='replace')
+    f.seek(0)
+
+    delimiter = sniff_delimiter(sample)
+    print(f"📋 Delimitador detectado: '{delimiter}'")
+
+    lines = OffsetLineReader(f)
+    reader = csv.reader(lines, delimiter=delimiter)
+
+    # Lê header
+    headers = next(reader, [])
+    col_map = map_columns(headers)
 
-        # 2. Conecta no Banco
-        conn = psycopg2.connect(
-            host=DB_HOST, port=DB_PORT,
-            database=DB_NAME, user=DB_USER, password=DB_PASS
+    # O hash do header entra em todos os hashes de lote: os mesmos bytes com
+    # outra ordem de colunas não são o mesmo dado
+    lines.start_digest(lines.take_digest().encode())
+
+    return reader, col_map, lines
+
+def detect_format(file_path):
+    """Formato de entrada pela extensão do arquivo ('csv' se não reconhecida)."""
+    lower = file_path.lower()
+    for ext, fmt in TABULAR_FORMATS.items():
+        if lower.endswith(ext):
+            return fmt
+    for ext in ('.gz', '.zst'):
+        if lower.endswith(ext):
+            lower = lower[:-len(ext)]
+    for ext, fmt in GEO_FORMATS.items():
+        if lower.endswith(ext):
+            return fmt
+    return 'csv'
+
+def require_module(name, fmt):
+    """Importa uma dependência opcional de formato, com mensagem clara se faltar."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        raise RuntimeError(
+            f"Leitura de {fmt} requer o pacote '{name.split('.')[0]}' (pip3 install -r requirements.txt)"
         )
-        cur = conn.cursor()
 
-        sucesso = 0
-        duplicados = 0
-        erros = 0
+def open_tabular_source(file_path, fmt):
+    """Abre Parquet/Arrow/XLSX e mapeia as colunas pelo mesmo COLUMN_MAP do CSV.
 
-        # 3. Itera sobre as linhas
-        for index, row in enumerate(rows):
-            try:
-                name = get_val(row, col_map, 'name')
-                if not name:
-                    erros += 1
-                    continue
-
-                address = get_val(row, col_map, 'address')
-                category = get_val(row, col_map, 'category', 'Importado')
-                phone = get_val(row, col_map, 'phone')
-                
-                lat_raw = get_val(row, col_map, 'lat')
-                lon_raw = get_val(row, col_map, 'lon')
-                lat = parse_float(lat_raw)
-                lon = parse_float(lon_raw)
-                rating_val = parse_float(get_val(row, col_map, 'rating'))
-
-                if lat is None or lon is None:
-                    print(f"⚠️ Linha {index + 2}: Coordenadas inválidas para '{name}' (lat_raw='{lat_raw}', lon_raw='{lon_raw}')")
-                    erros += 1
-                    continue
-                
-                if abs(lat) > 90 or abs(lon) > 180:
-                    print(f"⚠️ Linha {index + 2}: Coordenadas fora da faixa para '{name}' (lat={lat}, lon={lon})")
-                    erros += 1
-                    continue
-
-                # Verifica duplicata por nome (case-insensitive)
-                cur.execute(
-                    "SELECT id FROM places WHERE LOWER(name) = LOWER(%s) LIMIT 1",
-                    (name,)
+    Returns:
+        (col_map, columns) - col_map aponta para posições nas linhas estreitas
+        geradas por iter_tabular_rows, que só contêm as colunas em `columns`
+    """
+    print(f"📋 Formato detectado: {fmt}")
+
+    headers = read_tabular_headers(file_path, fmt)
+    full_map = map_columns(headers)
+    columns = sorted(set(full_map.values()))
+    col_map = {field: columns.index(i) for field, i in full_map.items()}
+    return col_map, [(i, headers[i]) for i in columns]
+
+def read_tabular_headers(file_path, fmt):
+    """Nomes das colunas de um arquivo Parquet/Arrow/XLSX (header na 1ª linha do XLSX)."""
+    if fmt == 'parquet':
+        pq = require_module('pyarrow.parquet', fmt)
+        return pq.ParquetFile(file_path).schema_arrow.names
+    if fmt == 'arrow':
+        return _open_arrow(file_path).schema.names
+
+    openpyxl = require_module('openpyxl', fmt)
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        first = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    return ['' if h is None else str(h) for h in first]
+
+def _open_arrow(file_path):
+    """Reader de Arrow IPC mapeado em memória (formato arquivo ou stream)."""
+    pa = require_module('pyarrow', 'Arrow')
+    source = pa.memory_map(file_path, 'r')
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+def _arrow_column_values(array):
+    """Valores Python de uma coluna Arrow.
+
+    Colunas numéricas sem nulos saem via to_numpy (sem cópia do buffer Arrow);
+    o restante usa to_pylist.
+    """
+    pa = require_module('pyarrow', 'Arrow')
+    if array.null_count == 0 and (pa.types.is_floating(array.type) or pa.types.is_integer(array.type)):
+        return array.to_numpy(zero_copy_only=False).tolist()
+    return array.to_pylist()
+
+def iter_tabular_rows(file_path, fmt, columns, batch_size):
+    """Gera linhas (tuplas só com as colunas mapeadas) de Parquet/Arrow/XLSX.
+
+    Parquet e Arrow são lidos em record batches, carregando apenas as colunas
+    usadas; XLSX é lido em modo read_only (streaming) pelo openpyxl.
+    """
+    if fmt == 'parquet':
+        pq = require_module('pyarrow.parquet', fmt)
+        parquet = pq.ParquetFile(file_path)
+        names = [name for _, name in columns]
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=names):
+            yield from zip(*[_arrow_column_values(batch.column(name)) for name in names])
+
+    elif fmt == 'arrow':
+        reader = _open_arrow(file_path)
+        indexes = [i for i, _ in columns]
+        if hasattr(reader, 'num_record_batches'):
+            batches = (reader.get_batch(b) for b in range(reader.num_record_batches))
+        else:
+            batches = reader
+        for batch in batches:
+            yield from zip(*[_arrow_column_values(batch.column(i)) for i in indexes])
+
+    else:
+        openpyxl = require_module('openpyxl', fmt)
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(min_row=2, values_only=True)
+            indexes = [i for i, _ in columns]
+            for row in rows:
+                yield tuple(row[i] if i < len(row) else None for i in indexes)
+        finally:
+            wb.close()
+
+def iter_records(reader, lines):
+    """Gera (line_no, row), onde line_no é a linha física onde o registro começa."""
+    start = lines.line_no + 1
+    for row in reader:
+        yield start, row
+        start = lines.line_no + 1
+
+def iter_chunks(items, size):
+    """Agrupa um iterável em listas de até `size` itens, sem materializar o todo."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_content_chunks(records, size):
+    """Agrupa (line_no, row) em lotes com corte definido pelo conteúdo.
+
+    Um lote termina depois de um registro cujo CRC32 cai num valor fixo (com
+    mínimo de size/4 e máximo de 2*size registros, média ~size). Como o corte
+    depende só das linhas e não da posição, inserir ou remover linhas num
+    arquivo reenviado muda apenas os lotes ao redor da alteração, e os demais
+    mantêm o mesmo hash no manifesto.
+    """
+    min_size = max(1, size // 4)
+    divisor = max(1, size - min_size)
+    chunk = []
+    for item in records:
+        chunk.append(item)
+        if len(chunk) >= 2 * size or (
+            len(chunk) >= min_size
+            and zlib.crc32('\x1f'.join(item[1]).encode('utf-8', 'replace')) % divisor == 0
+        ):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def parse_row(row, col_map, line_no):
+    """Extrai e valida os campos de uma linha do CSV.
+
+    Returns:
+        (record, reject) - record é a tupla (name, address, category, phone,
+        rating, lon, lat), ou None com reject = (motivo, detalhe)
+    """
+    return build_record(
+        row, col_map, line_no,
+        parse_float(get_val(row, col_map, 'lat')),
+        parse_float(get_val(row, col_map, 'lon')),
+        parse_float(get_val(row, col_map, 'rating')),
+    )
+
+def build_record(row, col_map, line_no, lat, lon, rating_val):
+    """Monta e valida o registro de uma linha com os números já convertidos.
+
+    Returns:
+        (record, reject) - como em parse_row
+    """
+    name = as_text(get_val(row, col_map, 'name'))
+    if not name:
+        return None, ('nome_vazio', "Nome vazio")
+
+    address = as_text(get_val(row, col_map, 'address'))
+    category = as_text(get_val(row, col_map, 'category', 'Importado'))
+    phone = as_text(get_val(row, col_map, 'phone'))
+
+    if lat is None or lon is None:
+        lat_raw = get_val(row, col_map, 'lat')
+        lon_raw = get_val(row, col_map, 'lon')
+        return None, ('coordenadas_invalidas',
+                      f"Coordenadas inválidas para '{name}' (lat_raw='{lat_raw}', lon_raw='{lon_raw}')")
+
+    if abs(lat) > 90 or abs(lon) > 180:
+        return None, ('coordenadas_fora_da_faixa',
+                      f"Coordenadas fora da faixa para '{name}' (lat={lat}, lon={lon})")
+
+    return (name, address, category, phone, rating_val, lon, lat), None
+
+class NameDeduper:
+    """Detecção de duplicatas por nome (case-insensitive) em lote.
+
+    Em vez de um SELECT por linha, cada lote de nomes é verificado contra o
+    banco com uma única consulta (usa o índice idx_places_name_lower). A
+    consulta roda na transação do lote, então já enxerga tudo o que foi
+    gravado antes (lotes commitados e os INSERTs ainda pendentes); o set
+    `seen` só guarda os nomes aceitos desde o último commit, para pegar
+    repetições dentro do mesmo lote, e é esvaziado por commit(). A memória
+    não cresce com o tamanho do arquivo.
+
+    A chave de comparação é sempre o LOWER() do Postgres, devolvido pela
+    mesma consulta: str.lower() do Python e LOWER() do banco divergem em
+    alguns caracteres Unicode, e misturar os dois deixaria passar (ou
+    barraria) nomes que a importação de verdade trataria diferente.
+
+    Com preload=True, os nomes de places são carregados uma única vez (cursor
+    do lado do servidor) e a verificação passa a ser só em memória — usado no
+    dry-run, que roda inteiro dentro de um mesmo snapshot. Como nada é
+    gravado, commit() junta os nomes aceitos ao snapshot em memória, que
+    faz o papel do banco.
+    """
+
+    def __init__(self, cur, preload=False):
+        self.cur = cur
+        self.seen = set()
+        self.keys = {}
+        self.existing = None
+        if preload:
+            self.existing = set()
+            with cur.connection.cursor(name='import_existing_names') as names_cur:
+                names_cur.itersize = 50000
+                names_cur.execute("SELECT DISTINCT LOWER(name) FROM places")
+                for (name,) in names_cur:
+                    self.existing.add(name)
+
+    def split_batch(self, records):
+        """Separa um lote de registros em (novos, quantidade de duplicados).
+
+        Args:
+            records: lista de tuplas cujo item [1] é o nome
+        """
+        names = list({r[1] for r in records})
+        existing = set()
+        self.keys = {}
+        if names:
+            if self.existing is not None:
+                # Só a chave: a verificação é contra o snapshot em memória
+                self.cur.execute(
+                    "SELECT n, LOWER(n), false FROM unnest(%s::text[]) AS n", (names,)
                 )
-                if cur.fetchone():
-                    duplicados += 1
-                    continue
-
-                # Insere novo lugar
-                cur.execute(
-                    """INSERT INTO places (name, address, category, phone, rating, location)
-                    VALUES (%s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326))
-                    RETURNING id""",
-                    (name, address, category, phone or None, rating_val, lon, lat)
+            else:
+                self.cur.execute(
+                    """SELECT n, LOWER(n),
+                        EXISTS (SELECT 1 FROM places p WHERE LOWER(p.name) = LOWER(n))
+                    FROM unnest(%s::text[]) AS n""",
+                    (names,)
                 )
-                result = cur.fetchone()
-                if result:
-                    sucesso += 1
+            for name, key, exists in self.cur.fetchall():
+                self.keys[name] = key
+                if exists or (self.existing is not None and key in self.existing):
+                    existing.add(key)
 
-            except Exception as e:
-                print(f"❌ Linha {index + 2}: {e}")
-                erros += 1
+        novos = []
+        duplicados = 0
+        for record in records:
+            key = self.keys[record[1]]
+            if key in self.seen or key in existing:
+                duplicados += 1
+                continue
+            self.seen.add(key)
+            novos.append(record)
+
+        return novos, duplicados
+
+    def forget(self, name):
+        """Nome aceito no lote mas não gravado: uma repetição dele pode entrar."""
+        self.seen.discard(self.keys.get(name))
+
+    def commit(self):
+        """Chamado depois do commit do lote: os nomes aceitos já estão no banco."""
+        if self.existing is not None:
+            self.existing.update(self.seen)
+        self.seen = set()
+
+    def rollback(self):
+        """Chamado quando o lote em aberto é desfeito: esquece os nomes dele."""
+        self.seen = set()
+
+def parse_chunk(chunk, col_map):
+    """Converte um lote de (line_no, row) em registros válidos.
+
+    Returns:
+        (records, rejects) - records são tuplas (line_no, name, address,
+        category, phone, rating, lon, lat); rejects são tuplas (line_no,
+        motivo, detalhe, row) para o RejectLog
+    """
+    records = []
+    rejects = []
+
+    # Converte as colunas numéricas do lote inteiro de uma vez
+    rows = [row for _, row in chunk]
+    lats = parse_float_column([get_val(row, col_map, 'lat') for row in rows])
+    lons = parse_float_column([get_val(row, col_map, 'lon') for row in rows])
+    ratings = parse_float_column([get_val(row, col_map, 'rating') for row in rows])
 
+    for (line_no, row), lat, lon, rating_val in zip(chunk, lats, lons, ratings):
+        try:
+            parsed, reject = build_record(row, col_map, line_no, lat, lon, rating_val)
+        except Exception as e:
+            parsed, reject = None, ('erro_conversao', str(e))
+        if parsed is None:
+            rejects.append((line_no,) + reject + (row,))
+            continue
+        records.append((line_no,) + parsed)
+    return records, rejects
+
+def insert_isolating_errors(cur, records, insert):
+    """Insere um lote sob SAVEPOINT, bisseccionando quando ele falha.
+
+    Um erro no INSERT abortaria a transação inteira (e o commit do lote não
+    gravaria nada). Aqui cada tentativa roda num savepoint: se falhar, volta
+    só até ele e tenta as duas metades separadamente, até isolar as linhas
+    com problema. Em dados limpos é um único INSERT por lote.
+
+    Args:
+        insert: função (cur, records) -> quantidade inserida
+
+    Returns:
+        (sucesso, rejects)
+    """
+    sucesso = 0
+    rejects = []
+    pending = [records]
+
+    while pending:
+        batch = pending.pop()
+        if not batch:
+            continue
+
+        cur.execute("SAVEPOINT import_batch")
+        try:
+            sucesso += insert(cur, batch)
+            cur.execute("RELEASE SAVEPOINT import_batch")
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT import_batch")
+            cur.execute("RELEASE SAVEPOINT import_batch")
+            if len(batch) == 1:
+                line_no, *row = batch[0]
+                rejects.append((line_no, 'erro_insercao', str(e).strip(), row))
+            else:
+                # A primeira metade sai da pilha primeiro, mantendo a ordem do arquivo
+                mid = len(batch) // 2
+                pending.append(batch[mid:])
+                pending.append(batch[:mid])
+
+    return sucesso, rejects
+
+def insert_places(cur, records):
+    """INSERT multi-linha de registros já deduplicados (um único comando)."""
+    execute_values(
+        cur,
+        """INSERT INTO places (name, address, category, phone, rating, location)
+        VALUES %s""",
+        [(name, address, category, phone or None, rating_val, lon, lat)
+         for _, name, address, category, phone, rating_val, lon, lat in records],
+        template="(%s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326))",
+        page_size=len(records)
+    )
+    return cur.rowcount
+
+def insert_records(cur, records, deduper):
+    """Modo padrão: verifica duplicatas do lote e insere os novos em lote.
+
+    Returns:
+        (sucesso, duplicados, rejects)
+    """
+    # Verifica duplicatas do lote inteiro de uma vez
+    novos, duplicados = deduper.split_batch(records)
+
+    sucesso, rejects = insert_isolating_errors(cur, novos, insert_places)
+
+    # Nome de linha rejeitada não foi gravado: uma repetição dele mais adiante
+    # no arquivo ainda pode ser inserida
+    for _, _, _, row in rejects:
+        deduper.forget(row[0])
+
+    return sucesso, duplicados, rejects
+
+class CopyStream:
+    """Objeto file-like que gera o texto do COPY sob demanda.
+
+    O psycopg2 chama read(size) repetidamente em copy_expert; as linhas são
+    serializadas em CSV só quando pedidas, sem montar o arquivo inteiro em memória.
+    """
+
+    def __init__(self, records):
+        self._records = iter(records)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+        self._pending = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            record = next(self._records, None)
+            if record is None:
+                break
+            self._writer.writerow(record)
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+def create_staging_table(cur):
+    """Cria a tabela temporária usada pelo modo bulk (esvaziada a cada commit)."""
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS places_import_staging (
+            line_no INTEGER,
+            name TEXT,
+            address TEXT,
+            category TEXT,
+            phone TEXT,
+            rating DOUBLE PRECISION,
+            lon DOUBLE PRECISION,
+            lat DOUBLE PRECISION
+        ) ON COMMIT DELETE ROWS
+    """)
+
+def bulk_insert_records(cur, records):
+    """Modo bulk: COPY do lote para a staging + um único INSERT ... SELECT.
+
+    Duplicatas (no banco, em lotes já commitados ou repetidas dentro do lote)
+    são descartadas no INSERT, mantendo a primeira ocorrência do arquivo como
+    no modo padrão. Se o lote falhar, insert_isolating_errors refaz COPY e
+    INSERT em metades até isolar as linhas com erro.
+
+    Returns:
+        (sucesso, duplicados, rejects)
+    """
+    if not records:
+        return 0, 0, []
+
+    sucesso, rejects = insert_isolating_errors(cur, records, copy_insert_places)
+
+    return sucesso, len(records) - sucesso - len(rejects), rejects
+
+def copy_insert_places(cur, records):
+    """COPY para a staging + INSERT ... SELECT deduplicado; retorna quantos entraram."""
+    cur.execute("TRUNCATE places_import_staging")
+    cur.copy_expert(
+        """COPY places_import_staging (line_no, name, address, category, phone, rating, lon, lat)
+        FROM STDIN WITH (FORMAT csv)""",
+        CopyStream(records)
+    )
+
+    cur.execute("""
+        INSERT INTO places (name, address, category, phone, rating, location)
+        SELECT name, COALESCE(address, ''), category, NULLIF(phone, ''), rating,
+               ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+        FROM (
+            SELECT DISTINCT ON (LOWER(s.name)) s.*
+            FROM places_import_staging s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM places p WHERE LOWER(p.name) = LOWER(s.name)
+            )
+            ORDER BY LOWER(s.name), s.line_no
+        ) novos
+        ORDER BY line_no
+    """)
+    return cur.rowcount
+
+def plan_byte_ranges(f, start_offset, start_line, range_size, seed=b''):
+    """Divide o arquivo em faixas de bytes alinhadas em fim de linha.
+
+    Conta as quebras de linha de cada faixa para que os workers saibam o
+    número absoluto da primeira linha (mensagens de erro batem com o arquivo)
+    e calcula o hash de conteúdo da faixa para o manifesto.
+
+    Yields:
+        (start, end, first_line, last_line, chunk_hash)
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    start = start_offset
+    line_no = start_line + 1
+
+    while start < size:
+        end = start + range_size
+        if end < size:
+            f.seek(end)
+            f.readline()
+            end = f.tell()
+        else:
+            end = size
+
+        f.seek(start)
+        data = f.read(end - start)
+        newlines = data.count(b'\n')
+        yield start, end, line_no, line_no + newlines - 1, hashlib.sha256(seed + data).hexdigest()
+
+        start = end
+        line_no += newlines
+
+def parse_byte_range(task):
+    """Worker do modo paralelo: lê e converte uma faixa de bytes do CSV.
+
+    Roda em outro processo; as linhas rejeitadas voltam junto com os registros
+    para o processo principal gravar no RejectLog na ordem do arquivo.
+
+    Returns:
+        (records, rejects, total)
+    """
+    file_path, start, end, first_line, delimiter, col_map = task
+    chunk = read_byte_range(file_path, start, end, first_line, delimiter)
+    records, rejects = parse_chunk(chunk, col_map)
+
+    return records, rejects, len(chunk)
+
+def read_byte_range(file_path, start, end, first_line, delimiter):
+    """Linhas (line_no, row) de uma faixa de bytes do CSV."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    lines = OffsetLineReader(io.BytesIO(data), offset=start, line_no=first_line - 1)
+    reader = csv.reader(lines, delimiter=delimiter)
+    return list(iter_records(reader, lines))
+
+def iter_parsed_sequential(reader, lines, col_map, chunk_size, known_chunk):
+    """Fonte de lotes do modo padrão: lê e converte no próprio processo.
+
+    Lotes cujo hash já está no manifesto (`known_chunk` devolve a entrada) não
+    são convertidos nem gravados.
+
+    Yields:
+        Dict com records, rejects, total, offset/line_no (fim do lote, ponto de
+        checkpoint), hash, known (entrada do manifesto ou None) e source
+        (função que devolve os (line_no, row) originais do lote, para o
+        RejectLog gravar as linhas que só falham no INSERT)
+    """
+    for chunk in iter_content_chunks(iter_records(reader, lines), chunk_size):
+        batch = {
+            'total': len(chunk), 'offset': lines.offset, 'line_no': lines.line_no,
+            'hash': lines.take_digest(), 'records': [], 'rejects': [],
+            'source': lambda chunk=chunk: chunk,
+        }
+        batch['known'] = known_chunk(batch['hash'])
+        if batch['known'] is None:
+            batch['records'], batch['rejects'] = parse_chunk(chunk, col_map)
+        yield batch
+
+def iter_parsed_tabular(file_path, fmt, columns, col_map, chunk_size, known_chunk, start_row=0):
+    """Fonte de lotes para Parquet/Arrow/XLSX, no mesmo formato de iter_parsed_sequential.
+
+    A posição de checkpoint é o número de linhas de dados já consumidas (no
+    lugar do offset em bytes do CSV); line_no segue a numeração da planilha,
+    com o header na linha 1.
+    """
+    seed = repr(columns).encode()
+    rows = iter_tabular_rows(file_path, fmt, columns, chunk_size)
+    position = 0
+    for _ in itertools.islice(rows, start_row):
+        position += 1
+
+    for chunk_rows in iter_chunks(rows, chunk_size):
+        chunk = [(position + i + 2, row) for i, row in enumerate(chunk_rows)]
+        position += len(chunk_rows)
+        batch = {
+            'total': len(chunk), 'offset': position, 'line_no': position + 1,
+            'hash': hashlib.sha256(seed + repr(chunk_rows).encode()).hexdigest(),
+            'records': [], 'rejects': [], 'source': lambda chunk=chunk: chunk,
+        }
+        batch['known'] = known_chunk(batch['hash'])
+        if batch['known'] is None:
+            batch['records'], batch['rejects'] = parse_chunk(chunk, col_map)
+        yield batch
+
+def iter_parsed_parallel(file_path, f, lines, delimiter, col_map, workers, range_size, known_chunk):
+    """Fonte de lotes do modo paralelo: faixas de bytes convertidas num pool.
+
+    No máximo 2 faixas por worker ficam em voo, então a memória continua
+    limitada mesmo se o banco for mais lento que o parse. Os resultados saem
+    na ordem do arquivo, o que mantém os checkpoints válidos. Faixas já
+    presentes no manifesto nem chegam ao pool. As linhas originais de uma
+    faixa só são relidas (no processo principal) se alguma falhar no INSERT.
+    """
+    ranges = plan_byte_ranges(f, lines.offset, lines.line_no, range_size, seed=lines.seed)
+
+    def collect(batch, result):
+        if result is not None:
+            records, rejects, total = result.get()
+            batch.update(records=records, rejects=rejects, total=total)
+        return batch
+
+    with multiprocessing.Pool(workers) as pool:
+        pending = collections.deque()
+        for start, end, first_line, last_line, chunk_hash in ranges:
+            batch = {
+                'total': 0, 'offset': end, 'line_no': last_line, 'hash': chunk_hash,
+                'records': [], 'rejects': [], 'known': known_chunk(chunk_hash),
+                'source': functools.partial(read_byte_range, file_path, start, end,
+                                            first_line, delimiter),
+            }
+            result = None
+            if batch['known'] is None:
+                task = (file_path, start, end, first_line, delimiter, col_map)
+                result = pool.apply_async(parse_byte_range, (task,))
+            pending.append((batch, result))
+            if len(pending) >= workers * 2:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+def file_sha256(file_path, block_size=1024 * 1024):
+    """Hash SHA-256 do conteúdo do arquivo (lido em blocos)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def ensure_import_tables(cur):
+    """Cria import_jobs e import_manifest_chunks se ainda não existirem (migrações 003 e 004)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id SERIAL PRIMARY KEY,
+            file_hash CHAR(64) NOT NULL,
+            file_path TEXT,
+            status VARCHAR(20) NOT NULL DEFAULT 'running'
+                CHECK (status IN ('running', 'completed', 'failed')),
+            byte_offset BIGINT NOT NULL DEFAULT 0,
+            line_no INTEGER NOT NULL DEFAULT 0,
+            success INTEGER NOT NULL DEFAULT 0,
+            duplicates INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_file_hash ON import_jobs (file_hash)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS import_manifest_chunks (
+            chunk_hash CHAR(64) PRIMARY KEY,
+            job_id INTEGER REFERENCES import_jobs(id) ON DELETE SET NULL,
+            rows INTEGER NOT NULL,
+            success INTEGER NOT NULL DEFAULT 0,
+            duplicates INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def find_completed_job(cur, file_hash):
+    """Último job concluído para este conteúdo de arquivo (manifesto de arquivos)."""
+    cur.execute(
+        """SELECT id, success, duplicates, errors, total
+        FROM import_jobs
+        WHERE file_hash = %s AND status = 'completed'
+        ORDER BY id DESC LIMIT 1""",
+        (file_hash,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(('id', 'success', 'duplicates', 'errors', 'total'), row))
+
+def lookup_manifest_chunk(cur, chunk_hash):
+    """Entrada do manifesto para um lote já importado, ou None."""
+    db.execute_prepared(
+        cur, "lookup_manifest_chunk",
+        "SELECT rows, errors FROM import_manifest_chunks WHERE chunk_hash = $1",
+        (chunk_hash,)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return {'rows': row[0], 'errors': row[1]}
+
+def record_manifest_chunk(cur, chunk_hash, job_id, rows, sucesso, duplicados, erros):
+    """Registra um lote no manifesto (mesma transação dos dados do lote)."""
+    db.execute_prepared(
+        cur, "record_manifest_chunk",
+        """INSERT INTO import_manifest_chunks (chunk_hash, job_id, rows, success, duplicates, errors)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (chunk_hash) DO NOTHING""",
+        (chunk_hash, job_id, rows, sucesso, duplicados, erros)
+    )
+
+def start_import_job(cur, file_hash, file_path, resume=True):
+    """Retoma o último job interrompido deste arquivo ou cria um novo.
+
+    O job fica com um advisory lock de sessão enquanto a conexão estiver
+    aberta, então dois processos não retomam o mesmo arquivo ao mesmo tempo.
+
+    Returns:
+        Dict com id, byte_offset, line_no e contadores acumulados
+    """
+    job = None
+    if resume:
+        cur.execute(
+            """SELECT id, byte_offset, line_no, success, duplicates, errors, total
+            FROM import_jobs
+            WHERE file_hash = %s AND status IN ('running', 'failed')
+            ORDER BY id DESC LIMIT 1""",
+            (file_hash,)
+        )
+        row = cur.fetchone()
+        if row:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (row[0],))
+            if not cur.fetchone()[0]:
+                raise RuntimeError(f"Importação #{row[0]} deste arquivo já está em andamento")
+            job = dict(zip(
+                ('id', 'byte_offset', 'line_no', 'success', 'duplicates', 'errors', 'total'), row
+            ))
+            cur.execute(
+                "UPDATE import_jobs SET status = 'running', error_message = NULL, "
+                "updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (job['id'],)
+            )
+
+    if job is None:
+        cur.execute(
+            "INSERT INTO import_jobs (file_hash, file_path) VALUES (%s, %s) RETURNING id",
+            (file_hash, file_path)
+        )
+        job = {'id': cur.fetchone()[0], 'byte_offset': 0, 'line_no': 0,
+               'success': 0, 'duplicates': 0, 'errors': 0, 'total': 0}
+        cur.execute("SELECT pg_advisory_lock(%s)", (job['id'],))
+
+    return job
+
+def save_checkpoint(cur, job_id, offset, line_no, sucesso, duplicados, erros, total, status='running'):
+    """Grava o ponto de retomada na mesma transação dos dados do lote."""
+    db.execute_prepared(
+        cur, "save_checkpoint",
+        """UPDATE import_jobs
+        SET byte_offset = $1, line_no = $2, success = $3, duplicates = $4,
+            errors = $5, total = $6, status = $7, updated_at = CURRENT_TIMESTAMP
+        WHERE id = $8""",
+        (offset, line_no, sucesso, duplicados, erros, total, status, job_id)
+    )
+
+def fail_import_job(conn, job_id, error):
+    """Marca o job como falho (best-effort), preservando o último checkpoint."""
+    try:
+        conn.rollback()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE import_jobs SET status = 'failed', error_message = %s, "
+            "updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+            (str(error)[:1000], job_id)
+        )
         conn.commit()
         cur.close()
+    except Exception:
+        pass
+
+class RejectLog:
+    """Grava as linhas rejeitadas num CSV e agrega as contagens por motivo.
+
+    Substitui o print por linha: cada lote é escrito de uma vez no arquivo
+    (linha, motivo, detalhe e os campos originais) e no stdout saem só os
+    totais por motivo e até MAX_REJECT_SAMPLES exemplos. O worker não apaga
+    o arquivo: o caminho sai no relatório e em stats['rejects_file'], e quem
+    chamou decide quando removê-lo (o server.js apaga os de uploads/ depois
+    de IMPORT_REJECTS_TTL_HOURS).
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.append = append
+        self.counts = collections.Counter()
+        self.samples = []
+        self._file = None
+        self._writer = None
+
+    def add(self, rejects):
+        if not rejects:
+            return
+        if self._writer is None:
+            mode = 'a' if self.append and os.path.exists(self.path) else 'w'
+            self._file = open(self.path, mode, newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            if mode == 'w':
+                self._writer.writerow(['linha', 'motivo', 'detalhe', 'dados'])
+
+        self._writer.writerows(
+            [line_no, reason, detail] + list(row) for line_no, reason, detail, row in rejects
+        )
+        for line_no, reason, detail, row in rejects:
+            self.counts[reason] += 1
+        room = MAX_REJECT_SAMPLES - len(self.samples)
+        if room > 0:
+            self.samples.extend(f"Linha {r[0]}: {r[2]}" for r in rejects[:room])
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def print_report(self):
+        """Resumo agregado dos rejeitados (não imprime nada se não houve)."""
+        if not self.counts:
+            return
+        print(f"⚠️ {sum(self.counts.values())} linhas rejeitadas nesta execução")
+        for reason, count in self.counts.most_common():
+            print(f"   {reason}: {count}")
+        for sample in self.samples:
+            print(f"   Ex.: {sample}")
+        print(f"Arquivo de rejeitados: {self.path}")
+
+def print_summary(stats):
+    """Resumo final: linhas no formato que o server.js extrai por regex + JSON."""
+    print(f"\n✅ Importação Finalizada!")
+    print(f"Sucesso: {stats['success']}")
+    print(f"Duplicados: {stats['duplicates']}")
+    print(f"Erros: {stats['errors']}")
+    print(f"Total processado: {stats['total']}")
+    print(json.dumps(stats, ensure_ascii=False))
+
+def preview_file(file_path, max_kb=PREVIEW_KB, sample_rows=PREVIEW_ROWS,
+                 budget_ms=PREVIEW_BUDGET_MS, input_format=None):
+    """Prévia rápida de um arquivo de importação, sem tocar no banco.
 
-        print(f"\n✅ Importação Finalizada!")
-        print(f"Sucesso: {sucesso}")
-        print(f"Duplicados: {duplicados}")
-        print(f"Erros: {erros}")
-        print(f"Total processado: {len(rows)}")
+    Lê só os primeiros `max_kb` KB (descomprimidos) do CSV ou as primeiras
+    linhas de Parquet/Arrow/XLSX, detecta delimitador e mapeamento de colunas
+    e converte a amostra com as mesmas regras da importação. A conversão para
+    quando `budget_ms` estoura, então o tempo de resposta não depende do
+    tamanho do arquivo.
+
+    Returns:
+        dict serializável em JSON
+    """
+    started = time.monotonic()
+    deadline = started + budget_ms / 1000
+    fmt = input_format or detect_format(file_path)
+    preview = {'file': file_path, 'format': fmt}
+
+    if fmt == 'csv':
+        limit = max_kb * 1024
+        with open_input(file_path) as f:
+            head = f.read(limit + 1)
+        truncated = len(head) > limit
+        head = head[:limit]
+        if truncated and b'\n' in head:
+            # Descarta a última linha, provavelmente cortada no meio
+            head = head[:head.rindex(b'\n') + 1]
+        text = head.decode('utf-8', errors='replace')
+
+        delimiter = sniff_delimiter(text[:4096])
+        reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+        headers = next(reader, [])
+
+        def iter_rows():
+            line_no = reader.line_num
+            for row in reader:
+                yield line_no + 1, row
+                line_no = reader.line_num
+
+        rows = iter_rows()
+        preview.update(delimiter=delimiter, bytes_read=len(head), truncated=truncated)
+    elif fmt in GEO_FORMATS.values():
+        import worker_geo
+        features = []
+        with open_input(file_path, fmt) as f:
+            for feature in worker_geo.iter_features(f, fmt):
+                features.append(feature)
+                if len(features) >= PREVIEW_ROWS * 100 or time.monotonic() > deadline:
+                    break
+        # As "colunas" são as propriedades das feições; lat/lon vêm da geometria
+        headers = list(dict.fromkeys(key for properties, _, _ in features for key in properties))
+        rows = ((i + 1, feature) for i, feature in enumerate(features))
+    else:
+        headers = read_tabular_headers(file_path, fmt)
+        columns = list(enumerate(headers))
+        rows = (
+            (i + 2, row) for i, row in enumerate(
+                iter_tabular_rows(file_path, fmt, columns, PREVIEW_ROWS * 100)
+            )
+        )
+
+    col_map = normalize_columns(headers)
+    if fmt in GEO_FORMATS.values():
+        missing = [] if 'name' in col_map else ['name']
+        parse = worker_geo.parse_features
+    else:
+        missing = [field for field in ('name', 'lat', 'lon') if field not in col_map]
+        parse = lambda chunk: parse_chunk(chunk, col_map)
+    preview.update(
+        columns=[h.strip() for h in headers],
+        mapping={field: headers[i].strip() for field, i in col_map.items()},
+        missing_columns=missing,
+        valid=not missing,
+    )
+
+    sampled = 0
+    valid_rows = 0
+    reasons = collections.Counter()
+    sample = []
+    reject_samples = []
+    budget_exceeded = False
+
+    if not missing:
+        max_rows = limit // 8 if fmt == 'csv' else PREVIEW_ROWS * 100
+        for chunk in iter_chunks(itertools.islice(rows, max_rows), 256):
+            # O primeiro lote sempre entra, para a prévia nunca voltar vazia
+            if sampled and time.monotonic() > deadline:
+                budget_exceeded = True
+                break
+            records, rejects = parse(chunk)
+            sampled += len(chunk)
+            valid_rows += len(records)
+            for line_no, name, address, category, phone, rating_val, lon, lat in records:
+                if len(sample) < sample_rows:
+                    sample.append({
+                        'line': line_no, 'name': name, 'address': address,
+                        'category': category, 'phone': phone, 'rating': rating_val,
+                        'lat': lat, 'lon': lon,
+                    })
+            for line_no, reason, detail, _ in rejects:
+                reasons[reason] += 1
+                if len(reject_samples) < sample_rows:
+                    reject_samples.append({'line': line_no, 'reason': reason, 'detail': detail})
+
+    preview.update(
+        rows_sampled=sampled,
+        valid_rows=valid_rows,
+        errors=sum(reasons.values()),
+        errors_by_reason=dict(reasons),
+        sample=sample,
+        rejects=reject_samples,
+        budget_exceeded=budget_exceeded,
+        elapsed_ms=round((time.monotonic() - started) * 1000, 1),
+    )
+    return preview
+
+def prepare_session(conn, bulk=False, dry_run=False):
+    """Prepara a conexão para importar um ou mais arquivos.
+
+    O estado de duplicatas (NameDeduper) e a staging do modo bulk são criados
+    uma vez por conexão e compartilhados por todos os arquivos do lote.
+
+    Returns:
+        (cur, deduper) - deduper é None no modo bulk (dedupe feito no INSERT)
+    """
+    deduper = None
+    if dry_run:
+        # Uma única transação somente leitura: todos os lotes veem o
+        # mesmo snapshot de places e nada pode ser gravado
+        conn.set_session(readonly=True, isolation_level='REPEATABLE READ')
+        cur = conn.cursor()
+        print("🔍 Modo dry-run: validação completa, nada será gravado no banco")
+        deduper = NameDeduper(cur, preload=True)
+    else:
+        cur = conn.cursor()
+        ensure_import_tables(cur)
+        if bulk:
+            print("🚀 Modo bulk (COPY) ativado")
+            create_staging_table(cur)
+        else:
+            deduper = NameDeduper(cur)
+        conn.commit()
+    return cur, deduper
+
+def import_file(conn, cur, deduper, file_path, bulk=False, chunk_size=CHUNK_SIZE, resume=True,
+                workers=1, range_size=RANGE_SIZE, force=False, rejects_path=None,
+                dry_run=False, input_format=None):
+    """Importa um arquivo numa conexão já preparada por prepare_session.
+
+    Se algo falhar, o job é marcado como falho (mantendo o checkpoint) e a
+    exceção é propagada.
+
+    Returns:
+        dict com as estatísticas do arquivo
+    """
+    job = None
+    reject_log = None
+    try:
+        # 1. Detecta delimitador e abre o CSV (lido em streaming, lote a lote,
+        #    descomprimindo .gz/.zip/.zst no caminho); Parquet/Arrow/XLSX e
+        #    GeoJSON/KML usam o mesmo mapeamento de colunas
+        fmt = input_format or detect_format(file_path)
+        with open_input(file_path, fmt) as f:
+            if fmt == 'csv':
+                reader, col_map, lines = open_csv_reader(f)
+            elif fmt in GEO_FORMATS.values():
+                print(f"📋 Formato detectado: {fmt}")
+            else:
+                col_map, columns = open_tabular_source(file_path, fmt)
+
+            if dry_run:
+                job = {'id': None, 'byte_offset': 0, 'line_no': 0,
+                       'success': 0, 'duplicates': 0, 'errors': 0, 'total': 0}
+            else:
+                file_hash = file_sha256(file_path)
+
+                # 2. Arquivo idêntico a um já importado: nada a fazer
+                done = None if force else find_completed_job(cur, file_hash)
+                if done:
+                    conn.commit()
+                    print(f"⏭️ Arquivo idêntico já importado (importação #{done['id']}), nada a fazer")
+                    return {
+                        'file': file_path,
+                        'success': 0, 'duplicates': done['total'] - done['errors'],
+                        'errors': done['errors'], 'total': done['total'], 'dry_run': False,
+                    }
+
+                # 3. Registra (ou retoma) o job de importação deste arquivo
+                job = start_import_job(cur, file_hash, file_path, resume=resume)
+                conn.commit()
+
+            sucesso = job['success']
+            duplicados = job['duplicates']
+            erros = job['errors']
+            total = job['total']
+            lotes_ignorados = 0
+
+            reject_log = RejectLog(
+                rejects_path or file_path + '.rejeitados.csv',
+                append=job['byte_offset'] > 0
+            )
+
+            if job['byte_offset'] > 0:
+                posicao = 'byte' if fmt == 'csv' else 'registro'
+                print(f"⏩ Retomando importação #{job['id']} a partir da linha {job['line_no'] + 1} "
+                      f"({posicao} {job['byte_offset']}, {total} registros já processados)")
+                if fmt == 'csv':
+                    lines.seek(job['byte_offset'], job['line_no'])
+
+            if force or dry_run:
+                known_chunk = lambda chunk_hash: None
+            else:
+                known_chunk = lambda chunk_hash: lookup_manifest_chunk(cur, chunk_hash)
+
+            if fmt in GEO_FORMATS.values():
+                # Feições lidas em streaming, com a geometria direto em lon/lat
+                import worker_geo
+                if workers > 1:
+                    print(f"ℹ️ --workers ignorado para {fmt}")
+                batches = worker_geo.iter_parsed_features(
+                    f, fmt, chunk_size, known_chunk, start_feature=job['byte_offset']
+                )
+            elif fmt != 'csv':
+                # Formatos colunares já vêm tipados: parse sequencial em lotes
+                if workers > 1:
+                    print(f"ℹ️ --workers ignorado para {fmt}")
+                batches = iter_parsed_tabular(
+                    file_path, fmt, columns, col_map, chunk_size, known_chunk,
+                    start_row=job['byte_offset']
+                )
+            elif workers > 1 and compression_of(file_path):
+                # Faixas de bytes exigem acesso aleatório ao arquivo descomprimido
+                print("ℹ️ --workers ignorado para arquivo comprimido")
+                batches = iter_parsed_sequential(reader, lines, col_map, chunk_size, known_chunk)
+            elif workers > 1:
+                print(f"⚙️ Parse paralelo com {workers} processos")
+                batches = iter_parsed_parallel(
+                    file_path, f, lines, reader.dialect.delimiter, col_map,
+                    workers, range_size, known_chunk
+                )
+            else:
+                batches = iter_parsed_sequential(reader, lines, col_map, chunk_size, known_chunk)
+
+            # 4. Um único escritor grava e commita um lote por vez (memória
+            #    constante); checkpoint e manifesto vão na mesma transação
+            offset, line_no = job['byte_offset'], job['line_no']
+            for batch in batches:
+                offset, line_no = batch['offset'], batch['line_no']
+
+                known = batch['known']
+                if known:
+                    # Lote idêntico a um já importado: conta como duplicado sem
+                    # converter nem tocar em places
+                    lotes_ignorados += 1
+                    total += known['rows']
+                    duplicados += known['rows'] - known['errors']
+                    erros += known['errors']
+                else:
+                    rejects = batch['rejects']
+                    insert_rejects = []
+                    s_lote, d_lote = 0, 0
+                    for records in iter_chunks(batch['records'], chunk_size):
+                        if dry_run:
+                            novos, d = deduper.split_batch(records)
+                            s, r = len(novos), []
+                        elif bulk:
+                            s, d, r = bulk_insert_records(cur, records)
+                        else:
+                            s, d, r = insert_records(cur, records, deduper)
+                        s_lote += s
+                        d_lote += d
+                        insert_rejects.extend(r)
+                    if insert_rejects:
+                        # O INSERT só conhece o registro convertido: o arquivo de
+                        # rejeitados recebe os campos originais da linha
+                        source = dict(batch['source']())
+                        rejects.extend(
+                            (line_no, reason, detail, source.get(line_no, row))
+                            for line_no, reason, detail, row in insert_rejects
+                        )
+                    e_lote = len(rejects)
+                    reject_log.add(rejects)
+
+                    if not dry_run:
+                        record_manifest_chunk(
+                            cur, batch['hash'], job['id'], batch['total'], s_lote, d_lote, e_lote
+                        )
+                    total += batch['total']
+                    sucesso += s_lote
+                    duplicados += d_lote
+                    erros += e_lote
+
+                if not dry_run:
+                    save_checkpoint(cur, job['id'], offset, line_no, sucesso, duplicados, erros, total)
+                    conn.commit()
+                    if deduper:
+                        deduper.commit()
+                print(f"💾 {total} registros processados")
+
+            if not dry_run:
+                save_checkpoint(cur, job['id'], offset, line_no, sucesso, duplicados, erros, total,
+                                status='completed')
+                conn.commit()
+            elif deduper:
+                # Dry-run: os nomes do arquivo contam para os próximos do lote
+                deduper.commit()
+
+        reject_log.close()
+        reject_log.print_report()
+        if lotes_ignorados:
+            print(f"⏭️ {lotes_ignorados} lotes idênticos a importações anteriores foram ignorados")
+
+        stats = {
+            'file': file_path,
+            'success': sucesso, 'duplicates': duplicados, 'errors': erros,
+            'total': total, 'dry_run': dry_run,
+        }
+        if reject_log.counts:
+            stats['errors_by_reason'] = dict(reject_log.counts)
+            stats['rejects_file'] = reject_log.path
+        return stats
+
+    except Exception as e:
+        if job and job['id']:
+            fail_import_job(conn, job['id'], e)
+            print(f"ℹ️ Rode novamente com o mesmo arquivo para retomar a importação #{job['id']}")
+        else:
+            conn.rollback()
+        if deduper:
+            deduper.rollback()
+        raise
+    finally:
+        if reject_log:
+            reject_log.close()
+
+def import_csv(file_path, bulk=False, chunk_size=CHUNK_SIZE, resume=True,
+               workers=1, range_size=RANGE_SIZE, force=False, rejects_path=None,
+               dry_run=False, input_format=None):
+    try:
+        with db.connection(bulk=bulk) as conn:
+            cur, deduper = prepare_session(conn, bulk=bulk, dry_run=dry_run)
+            stats = import_file(
+                conn, cur, deduper, file_path, bulk=bulk, chunk_size=chunk_size, resume=resume,
+                workers=workers, range_size=range_size, force=force, rejects_path=rejects_path,
+                dry_run=dry_run, input_format=input_format
+            )
+            if dry_run:
+                conn.rollback()
+            cur.close()
+        print_summary(stats)
 
     except FileNotFoundError:
         print(f"❌ Arquivo não encontrado: {file_path}")
@@ -259,10 +1689,160 @@ def import_csv(file_path):
         import traceback
         traceback.print_exc()
         sys.exit(1)
-    finally:
-        if conn:
-            conn.close()
+
+def import_batch(file_paths, bulk=False, dry_run=False, **options):
+    """Importa vários arquivos num único processo e numa única conexão.
+
+    O estado de duplicatas é compartilhado: um nome aceito num arquivo conta
+    como duplicado nos seguintes. Um arquivo com erro não interrompe os
+    demais (o job dele fica como falho, pronto para retomar); o processo sai
+    com código 1 se algum falhar.
+    """
+    resultados = []
+    try:
+        with db.connection(bulk=bulk) as conn:
+            cur, deduper = prepare_session(conn, bulk=bulk, dry_run=dry_run)
+
+            for i, file_path in enumerate(file_paths, 1):
+                print(f"\n📁 [{i}/{len(file_paths)}] {file_path}")
+                try:
+                    stats = import_file(conn, cur, deduper, file_path, bulk=bulk,
+                                        dry_run=dry_run, **options)
+                except FileNotFoundError:
+                    print(f"❌ Arquivo não encontrado: {file_path}")
+                    stats = {'file': file_path, 'error': 'Arquivo não encontrado'}
+                except Exception as e:
+                    print(f"❌ Erro ao importar {file_path}: {e}")
+                    stats = {'file': file_path, 'error': str(e).strip()}
+                resultados.append(stats)
+
+            if dry_run:
+                conn.rollback()
+            cur.close()
+
+    except Exception as e:
+        print(f"❌ Erro Crítico: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    falhas = [r for r in resultados if 'error' in r]
+    print(f"\n📊 {len(file_paths)} arquivos, {len(falhas)} com falha")
+    for r in resultados:
+        if 'error' in r:
+            print(f"   ❌ {r['file']}: {r['error']}")
+        else:
+            print(f"   ✅ {r['file']}: {r['success']} importados, {r['duplicates']} duplicados, "
+                  f"{r['errors']} erros de {r['total']}")
+
+    stats = {
+        key: sum(r.get(key, 0) for r in resultados)
+        for key in ('success', 'duplicates', 'errors', 'total')
+    }
+    stats['dry_run'] = dry_run
+    stats['failed_files'] = len(falhas)
+    stats['files'] = resultados
+    print_summary(stats)
+    if falhas:
+        sys.exit(1)
+
+def expand_paths(patterns):
+    """Expande globs (ex.: 'regioes/*.csv') preservando a ordem dos argumentos."""
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                print(f"⚠️ Nenhum arquivo corresponde a {pattern}")
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa lugares de um CSV (ou Parquet/Arrow/XLSX) para a tabela places")
+    parser.add_argument(
+        "arquivos", nargs="*", default=["dados.csv"],
+        help="Arquivos ou globs (ex.: 'regioes/*.csv'); mais de um importa em lote numa só conexão"
+    )
+    parser.add_argument(
+        "--bulk", action="store_true",
+        help="Carrega via COPY em tabela de staging e insere com um único INSERT ... SELECT"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=CHUNK_SIZE,
+        help=f"Registros por lote/commit (padrão: {CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--no-resume", action="store_true",
+        help="Ignora checkpoints de importações anteriores e começa do início"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Processos de parse em paralelo (o CSV não pode ter quebras de linha dentro de campos)"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Reimporta mesmo que o arquivo ou lotes dele já constem no manifesto"
+    )
+    parser.add_argument(
+        "--rejects",
+        help="CSV com as linhas rejeitadas (padrão: <arquivo>.rejeitados.csv; só para um arquivo)"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="Valida e conta duplicados contra um snapshot do banco, sem gravar nada"
+    )
+    parser.add_argument(
+        "--format",
+        choices=['csv', *sorted(set(TABULAR_FORMATS.values()) | set(GEO_FORMATS.values()))],
+        help="Formato do arquivo (padrão: detectado pela extensão)"
+    )
+    parser.add_argument(
+        "--preview", action="store_true",
+        help="Só mostra delimitador, mapeamento e uma amostra convertida (JSON), sem banco"
+    )
+    parser.add_argument(
+        "--preview-kb", type=int, default=PREVIEW_KB,
+        help=f"KB lidos do começo do arquivo na prévia (padrão: {PREVIEW_KB})"
+    )
+    parser.add_argument(
+        "--preview-budget-ms", type=int, default=PREVIEW_BUDGET_MS,
+        help=f"Tempo máximo de conversão da amostra na prévia (padrão: {PREVIEW_BUDGET_MS} ms)"
+    )
+    args = parser.parse_args()
+
+    arquivos = expand_paths(args.arquivos)
+    if not arquivos:
+        print("❌ Nenhum arquivo para importar")
+        sys.exit(1)
+
+    if args.preview:
+        # Saída só com JSON (uma linha por arquivo), para a UI consumir direto;
+        # mensagens de progresso vão para o stderr
+        for arquivo in arquivos:
+            try:
+                with contextlib.redirect_stdout(sys.stderr):
+                    preview = preview_file(
+                        arquivo, max_kb=args.preview_kb, budget_ms=args.preview_budget_ms,
+                        input_format=args.format
+                    )
+            except Exception as e:
+                preview = {'file': arquivo, 'error': str(e).strip() or type(e).__name__}
+            print(json.dumps(preview, ensure_ascii=False, default=str))
+        return
+
+    options = dict(
+        bulk=args.bulk, chunk_size=args.chunk_size, resume=not args.no_resume,
+        workers=args.workers, force=args.force, dry_run=args.dry_run,
+        input_format=args.format
+    )
+    if len(arquivos) == 1:
+        import_csv(arquivos[0], rejects_path=args.rejects, **options)
+    else:
+        if args.rejects:
+            print("ℹ️ --rejects ignorado no modo lote (cada arquivo usa <arquivo>.rejeitados.csv)")
+        import_batch(arquivos, **options)
 
 if __name__ == "__main__":
-    arquivo = sys.argv[1] if len(sys.argv) > 1 else 'dados.csv'
-    import_csv(arquivo)
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# backend/src/worker_daemon.py
+"""
+Daemon dos workers Python: recebe jobs JSON-RPC 2.0 pelo stdin e responde no stdout.
+
+O server.js mantém alguns destes processos vivos (services/pythonWorkerPool.js)
+em vez de um spawn('python3', ...) por requisição: o interpretador, os imports
+(requests, psycopg2, pyarrow...), o pool de conexões de db.py, as sessões HTTP
+e o cache de respostas da Places API ficam quentes entre um job e outro.
+
+Cada job roda o main() do worker com o argv que seria passado na linha de
+comando, então a saída é a mesma do spawn: o que o worker imprime chega ao
+Node como notificações "output" e o código de saída vem no resultado. Jobs
+rodam um por vez por processo; paralelismo = mais processos no pool.
+
+Protocolo (uma mensagem JSON por linha):
+    -> {"jsonrpc": "2.0", "id": 1, "method": "worker_csv", "params": ["arquivo.csv", "--bulk"]}
+    <- {"jsonrpc": "2.0", "method": "output", "params": {"id": 1, "stream": "stdout", "data": "..."}}
+    <- {"jsonrpc": "2.0", "id": 1, "result": {"code": 0, "elapsed_ms": 12.3}}
+
+Métodos: os nomes de WORKERS e "ping".
+
+Uso:
+    python3 src/worker_daemon.py
+"""
+
+import gc
+import importlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Worker -> (módulo, função de entrada); o argv do job vai em sys.argv
+WORKERS = {
+    "worker": ("worker", "run_import"),
+    "worker_csv": ("worker_csv", "main"),
+    "worker_geo": ("worker_csv", "main"),
+    "worker_places_api": ("worker_places_api", "main"),
+    "worker_enrich_contacts": ("worker_enrich_contacts", "main"),
+}
+
+# Códigos de erro do JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+
+# Canal do protocolo; tudo o mais que for impresso fora de um job vai para o stderr
+_rpc_out = sys.stdout
+_rpc_lock = threading.Lock()
+_started = time.monotonic()
+_jobs = 0
+
+
+def send(message):
+    """Escreve uma mensagem no canal (threads do job também emitem saída)"""
+    line = json.dumps(message, ensure_ascii=False, default=str)
+    with _rpc_lock:
+        _rpc_out.write(line + "\n")
+        _rpc_out.flush()
+
+
+class JobStream(io.TextIOBase):
+    """stdout/stderr de um job: entrega a saída linha a linha para emit(stream, data)"""
+
+    def __init__(self, stream, emit):
+        self.stream = stream
+        self.emit_ = emit
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        with self.lock:
+            if "\n" not in s:
+                self.pending.append(s)
+                return len(s)
+            head, _, rest = s.rpartition("\n")
+            data = "".join(self.pending) + head + "\n"
+            self.pending = [rest] if rest else []
+        self.emit(data)
+        return len(s)
+
+    def flush(self):
+        with self.lock:
+            data = "".join(self.pending)
+            self.pending = []
+        if data:
+            self.emit(data)
+
+    def emit(self, data):
+        self.emit_(self.stream, data)
+
+
+class CurrentStderr:
+    """Stream dos handlers de logging: escreve no sys.stderr do momento (o do job)"""
+
+    def write(self, s):
+        return sys.stderr.write(s)
+
+    def flush(self):
+        sys.stderr.flush()
+
+
+def load_worker(module_name):
+    """
+    Importa o módulo do worker (uma vez por processo, fora do redirecionamento)
+
+    Os handlers de logging criados no import (logging.basicConfig) apontam
+    para o stderr real; passam a escrever no stderr do job corrente.
+    """
+    module = importlib.import_module(module_name)
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.__stderr__:
+            handler.setStream(CurrentStderr())
+    return module
+
+
+def run_job(worker, args, emit):
+    """
+    Roda o worker como se fosse `python3 src/<worker>.py args...`
+
+    Args:
+        worker: Nome em WORKERS
+        args: Argumentos da linha de comando
+        emit: Função (stream, data) que recebe a saída, "stdout" ou "stderr"
+
+    Returns:
+        Código de saída
+    """
+    out = JobStream("stdout", emit)
+    err = JobStream("stderr", emit)
+
+    module_name, entry = WORKERS[worker]
+    try:
+        module = load_worker(module_name)
+    except Exception:
+        # Ex.: dependência faltando; o daemon segue atendendo os outros workers
+        err.write(traceback.format_exc())
+        err.flush()
+        return 1
+    func = getattr(module, entry)
+    argv = sys.argv
+    sys.argv = [module.__file__] + [str(a) for a in args]
+    code = 0
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                func()
+            except SystemExit as e:
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        sys.argv = argv
+        out.flush()
+        err.flush()
+    return code
+
+
+def handle(message):
+    """Processa uma requisição; devolve a resposta (ou None para notificações)"""
+    global _jobs
+
+    if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or "method" not in message:
+        return error_response(message.get("id") if isinstance(message, dict) else None,
+                              INVALID_REQUEST, "Requisição JSON-RPC inválida")
+
+    job_id = message.get("id")
+    method = message["method"]
+    params = message.get("params") or []
+
+    if method == "ping":
+        result = {"pid": os.getpid(), "jobs": _jobs,
+                  "uptime_s": round(time.monotonic() - _started, 1)}
+    elif method in WORKERS:
+        if not isinstance(params, list):
+            return error_response(job_id, INVALID_PARAMS, "params deve ser a lista de argumentos do worker")
+        started = time.monotonic()
+        code = run_job(method, params, lambda stream, data: send({
+            "jsonrpc": "2.0", "method": "output",
+            "params": {"id": job_id, "stream": stream, "data": data},
+        }))
+        _jobs += 1
+        gc.collect()
+        result = {"code": code, "elapsed_ms": round((time.monotonic() - started) * 1000, 1)}
+    else:
+        return error_response(job_id, METHOD_NOT_FOUND, f"Worker desconhecido: {method}")
+
+    if job_id is None:
+        return None
+    return {"jsonrpc": "2.0", "id": job_id, "result": result}
+
+
+def error_response(job_id, code, message):
+    return {"jsonrpc": "2.0", "id": job_id, "error": {"code": code, "message": message}}
+
+
+def main():
+    # Prints fora de um job não podem corromper o canal
+    sys.stdout = sys.stderr
+
+    send({"jsonrpc": "2.0", "method": "ready", "params": {"pid": os.getpid()}})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            send(error_response(None, PARSE_ERROR, f"JSON inválido: {e}"))
+            continue
+
+        response = handle(message)
+        if response is not None:
+            send(response)
+
+
+if __name__ == "__main__":
+    main()
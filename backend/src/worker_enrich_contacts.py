@@ -18,27 +18,22 @@ import logging
 from typing import Dict, List, Optional
 
 import requests
-import psycopg2
 from dotenv import load_dotenv
 
+import db
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Configurações do Banco
-DB_HOST = os.getenv("DB_HOST", "76.13.173.70")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "suphelp_geo")
-DB_USER = os.getenv("DB_USER", "admin")
-DB_PASS = os.getenv("DB_PASS", "***REMOVED***")
-
 # Google Places API
 GOOGLE_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY")
-PLACE_DETAILS_URL = "https://places.googleapis.com/v1/places"
+# PLACES_API_BASE_URL aponta para outro servidor (ex.: places_mock_server.py)
+PLACE_DETAILS_URL = os.getenv("PLACES_API_BASE_URL", "https://places.googleapis.com/v1").rstrip("/") + "/places"
 
 # Configurações
 MAX_RETRIES = 3
 BACKOFF_BASE = 1.5
-SLEEP_BETWEEN_CALLS = 0.5  # Respeita rate limit
+SLEEP_BETWEEN_CALLS = float(os.getenv("ENRICH_SLEEP_BETWEEN_CALLS", "0.5"))  # Respeita rate limit
 
 # Logging
 logging.basicConfig(
@@ -48,6 +43,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Sessão HTTP reaproveitada entre chamadas (keep-alive com a API)
+_session = None
+
+
 class EnrichmentError(Exception):
     """Erro customizado para enriquecimento"""
     pass
@@ -62,6 +61,14 @@ def validate_api_key():
         )
 
 
+def get_session() -> requests.Session:
+    """Sessão requests do worker (criada na primeira chamada)"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
 def get_place_details(place_id: str) -> Dict:
     """
     Busca detalhes de um lugar via Place Details API (New)
@@ -97,7 +104,7 @@ def get_place_details(place_id: str) -> Dict:
         try:
             logger.debug(f"Buscando detalhes: {clean_place_id} (tentativa {attempt}/{MAX_RETRIES})")
             
-            resp = requests.get(
+            resp = get_session().get(
                 url,
                 headers=headers,
                 timeout=15
@@ -163,26 +170,24 @@ def get_place_details(place_id: str) -> Dict:
     return {"status": "ERROR"}
 
 
-def get_places_from_database(place_ids: Optional[List[str]] = None, limit: int = 50) -> List[Dict]:
+def get_places_from_database(place_ids: Optional[List[str]] = None, limit: int = 50,
+                             conn=None) -> List[Dict]:
     """
     Busca lugares no banco que precisam de enriquecimento
     
     Args:
         place_ids: Lista de place_ids específicos (opcional)
         limit: Limite de registros (se place_ids não fornecido)
+        conn: Conexão já aberta; se None, usa uma do pool só para esta chamada
         
     Returns:
         Lista de lugares do banco
     """
-    conn = None
+    if conn is None:
+        with db.connection() as conn:
+            return get_places_from_database(place_ids, limit, conn)
+    
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS
-        )
         cur = conn.cursor()
         
         if place_ids:
@@ -225,69 +230,71 @@ def get_places_from_database(place_ids: Optional[List[str]] = None, limit: int =
     except Exception as e:
         logger.error(f"❌ Erro ao buscar lugares: {e}")
         raise
-    finally:
-        if conn:
-            conn.close()
 
 
-def update_place_in_database(place_id: int, details: Dict) -> bool:
+def ensure_contact_columns(conn) -> None:
+    """Cria as colunas de contato em places se não existirem (uma vez por execução)"""
+    cur = conn.cursor()
+    
+    # Verifica se colunas existem, se não, cria
+    cur.execute("""
+        SELECT column_name 
+        FROM information_schema.columns 
+        WHERE table_name = 'places' AND column_name IN ('phone', 'website', 'rating', 'user_ratings_total')
+    """)
+    existing_columns = [row[0] for row in cur.fetchall()]
+    
+    # Adiciona colunas se não existirem
+    if 'phone' not in existing_columns:
+        cur.execute("ALTER TABLE places ADD COLUMN phone VARCHAR(50)")
+        logger.info("✅ Coluna 'phone' criada")
+    
+    if 'website' not in existing_columns:
+        cur.execute("ALTER TABLE places ADD COLUMN website TEXT")
+        logger.info("✅ Coluna 'website' criada")
+    
+    if 'rating' not in existing_columns:
+        cur.execute("ALTER TABLE places ADD COLUMN rating DECIMAL(2,1)")
+        logger.info("✅ Coluna 'rating' criada")
+    
+    if 'user_ratings_total' not in existing_columns:
+        cur.execute("ALTER TABLE places ADD COLUMN user_ratings_total INTEGER")
+        logger.info("✅ Coluna 'user_ratings_total' criada")
+    
+    conn.commit()
+    cur.close()
+
+
+def update_place_in_database(place_id: int, details: Dict, conn=None) -> bool:
     """
     Atualiza lugar no banco com dados enriquecidos
     
     Args:
         place_id: ID do lugar no banco (não é google_place_id)
         details: Dicionário com dados do Place Details
+        conn: Conexão já aberta (reaproveitada entre lugares); se None,
+            usa uma do pool só para esta chamada
         
     Returns:
         True se atualizado com sucesso
     """
-    conn = None
+    if conn is None:
+        with db.connection() as conn:
+            ensure_contact_columns(conn)
+            return update_place_in_database(place_id, details, conn)
+    
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS
-        )
         cur = conn.cursor()
         
-        # Verifica se colunas existem, se não, cria
-        cur.execute("""
-            SELECT column_name 
-            FROM information_schema.columns 
-            WHERE table_name = 'places' AND column_name IN ('phone', 'website', 'rating', 'user_ratings_total')
-        """)
-        existing_columns = [row[0] for row in cur.fetchall()]
-        
-        # Adiciona colunas se não existirem
-        if 'phone' not in existing_columns:
-            cur.execute("ALTER TABLE places ADD COLUMN phone VARCHAR(50)")
-            logger.info("✅ Coluna 'phone' criada")
-        
-        if 'website' not in existing_columns:
-            cur.execute("ALTER TABLE places ADD COLUMN website TEXT")
-            logger.info("✅ Coluna 'website' criada")
-        
-        if 'rating' not in existing_columns:
-            cur.execute("ALTER TABLE places ADD COLUMN rating DECIMAL(2,1)")
-            logger.info("✅ Coluna 'rating' criada")
-        
-        if 'user_ratings_total' not in existing_columns:
-            cur.execute("ALTER TABLE places ADD COLUMN user_ratings_total INTEGER")
-            logger.info("✅ Coluna 'user_ratings_total' criada")
-        
-        # Atualiza o lugar
-        query = """
+        # Atualiza o lugar (statement preparado uma vez por conexão)
+        db.execute_prepared(cur, "update_place_contacts", """
             UPDATE places
-            SET phone = %s,
-                website = %s,
-                rating = %s,
-                user_ratings_total = %s
-            WHERE id = %s
-        """
-        
-        cur.execute(query, (
+            SET phone = $1,
+                website = $2,
+                rating = $3,
+                user_ratings_total = $4
+            WHERE id = $5
+        """, (
             details.get("phone"),
             details.get("website"),
             details.get("rating"),
@@ -302,12 +309,8 @@ def update_place_in_database(place_id: int, details: Dict) -> bool:
         
     except Exception as e:
         logger.error(f"❌ Erro ao atualizar lugar {place_id}: {e}")
-        if conn:
-            conn.rollback()
+        conn.rollback()
         return False
-    finally:
-        if conn:
-            conn.close()
 
 
 def enrich_places(place_ids: Optional[List[str]] = None, limit: int = 50) -> Dict:
@@ -331,51 +334,54 @@ def enrich_places(place_ids: Optional[List[str]] = None, limit: int = 50) -> Dic
         "api_calls": 0
     }
     
-    # Busca lugares no banco
-    places = get_places_from_database(place_ids, limit)
-    stats["total"] = len(places)
-    
-    if not places:
-        logger.warning("⚠️  Nenhum lugar para enriquecer")
-        return stats
-    
-    logger.info(f"🔍 Iniciando enriquecimento de {len(places)} lugares...")
-    
-    for idx, place in enumerate(places, 1):
-        place_db_id = place["id"]
-        google_place_id = place["google_place_id"]
-        name = place["name"]
+    # Uma conexão do pool para a execução inteira (antes: uma por lugar)
+    with db.connection() as conn:
+        # Busca lugares no banco
+        places = get_places_from_database(place_ids, limit, conn)
+        stats["total"] = len(places)
         
-        logger.info(f"[{idx}/{len(places)}] {name}")
+        if not places:
+            logger.warning("⚠️  Nenhum lugar para enriquecer")
+            return stats
         
-        # Busca detalhes na API
-        details = get_place_details(google_place_id)
-        stats["api_calls"] += 1
+        ensure_contact_columns(conn)
+        logger.info(f"🔍 Iniciando enriquecimento de {len(places)} lugares...")
         
-        if details.get("status") == "OK":
-            # Atualiza no banco
-            if update_place_in_database(place_db_id, details):
-                stats["enriched"] += 1
-                
-                phone = details.get("phone", "Sem telefone")
-                rating = details.get("rating", "-")
-                logger.info(f"   ✅ Enriquecido: {phone} | Rating: {rating}")
+        for idx, place in enumerate(places, 1):
+            place_db_id = place["id"]
+            google_place_id = place["google_place_id"]
+            name = place["name"]
+            
+            logger.info(f"[{idx}/{len(places)}] {name}")
+            
+            # Busca detalhes na API
+            details = get_place_details(google_place_id)
+            stats["api_calls"] += 1
+            
+            if details.get("status") == "OK":
+                # Atualiza no banco
+                if update_place_in_database(place_db_id, details, conn):
+                    stats["enriched"] += 1
+                    
+                    phone = details.get("phone", "Sem telefone")
+                    rating = details.get("rating", "-")
+                    logger.info(f"   ✅ Enriquecido: {phone} | Rating: {rating}")
+                else:
+                    stats["errors"] += 1
+                    logger.error(f"   ❌ Erro ao atualizar no banco")
+            
+            elif details.get("status") == "NOT_FOUND":
+                stats["not_found"] += 1
+                logger.warning(f"   ⚠️  Não encontrado na API")
+            
             else:
                 stats["errors"] += 1
-                logger.error(f"   ❌ Erro ao atualizar no banco")
-        
-        elif details.get("status") == "NOT_FOUND":
-            stats["not_found"] += 1
-            logger.warning(f"   ⚠️  Não encontrado na API")
-        
-        else:
-            stats["errors"] += 1
-            logger.error(f"   ❌ Erro ao buscar detalhes")
+                logger.error(f"   ❌ Erro ao buscar detalhes")
+            
+            # Respeita rate limit
+            if idx < len(places):
+                time.sleep(SLEEP_BETWEEN_CALLS)
         
-        # Respeita rate limit
-        if idx < len(places):
-            time.sleep(SLEEP_BETWEEN_CALLS)
-    
     logger.info("="*70)
     logger.info("📊 RESULTADO DO ENRIQUECIMENTO")
     logger.info("="*70)
@@ -0,0 +1,308 @@
+# backend/src/worker_geo.py
+"""
+Leitura em streaming de camadas de pontos (GeoJSON e KML) para a tabela places.
+
+As feições são lidas uma a uma, sem json.load nem DOM do arquivo inteiro, e
+as propriedades passam pelo mesmo COLUMN_MAP do CSV. Os lotes gerados têm o
+mesmo formato dos de worker_csv.py, então a importação reaproveita o mesmo
+caminho de dedupe, inserção em lote, manifesto e checkpoints; as coordenadas
+vêm da geometria como números, sem passar por texto.
+
+Uso:
+    python3 src/worker_geo.py <arquivo.geojson|arquivo.kml|arquivo.kmz> [opções do worker_csv.py]
+"""
+
+import hashlib
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import worker_csv
+from worker_csv import iter_chunks, normalize_columns, parse_chunk
+
+# Posições na linha montada a partir de cada feição
+GEO_FIELDS = ('name', 'address', 'category', 'phone', 'rating', 'lon', 'lat')
+GEO_COL_MAP = {field: i for i, field in enumerate(GEO_FIELDS)}
+
+# Elementos padrão do KML que já são campos de places
+KML_FIELDS = {'name': 'name', 'address': 'address', 'phoneNumber': 'phone'}
+
+# Bloco lido por vez do GeoJSON; cresce se uma feição não couber
+GEOJSON_BLOCK_SIZE = 64 * 1024
+
+JSON_WHITESPACE = ' \t\n\r'
+
+def iter_geojson_features(f, block_size=GEOJSON_BLOCK_SIZE):
+    """Gera as feições de uma FeatureCollection lendo o arquivo em blocos.
+
+    Percorre os membros do objeto raiz até o array "features" (chaves
+    "features" aninhadas, em propriedades ou foreign members, não contam) e
+    decodifica um objeto por vez com JSONDecoder.raw_decode; só a feição
+    corrente (e o resto do bloco) fica em memória. Arquivos que são uma única
+    Feature também são aceitos; sem array "features" na raiz, ValueError.
+    """
+    text = io.TextIOWrapper(f, encoding='utf-8-sig', errors='replace')
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill(size):
+        nonlocal buf, pos, eof
+        data = text.read(size)
+        if not data:
+            eof = True
+        buf = buf[pos:] + data
+        pos = 0
+
+    # 1. Avança pelos membros do objeto raiz até o início do array "features"
+    members = {}
+    state = 'start'
+    key = None
+    size = block_size
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("GeoJSON truncado antes do array 'features'")
+            fill(block_size)
+            continue
+        char = buf[pos]
+
+        if state == 'start':
+            if char != '{':
+                raise ValueError("GeoJSON inválido: o arquivo não é um objeto JSON")
+            pos += 1
+            state = 'key'
+        elif state == 'key' and char == ',':
+            pos += 1
+        elif state == 'key' and char == '}':
+            # Sem FeatureCollection: aceita uma Feature solta
+            if members.get('type') == 'Feature':
+                yield members
+                return
+            raise ValueError("GeoJSON sem array 'features' no objeto raiz")
+        elif state == 'key' and char != '"':
+            raise ValueError("GeoJSON inválido: chave do objeto raiz fora de aspas")
+        elif state == 'colon':
+            if char != ':':
+                raise ValueError(f"GeoJSON inválido: esperado ':' depois de {key!r}")
+            pos += 1
+            state = 'value'
+        elif state == 'value' and key == 'features':
+            if char != '[':
+                raise ValueError("GeoJSON inválido: 'features' não é um array")
+            pos += 1
+            break
+        else:
+            # Chave (state 'key') ou valor de outro membro do objeto raiz
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill(size)
+                size *= 2
+                continue
+            if end == len(buf) and not eof:
+                # Um número no fim do bloco pode continuar no próximo
+                fill(size)
+                continue
+            size = block_size
+            pos = end
+            if state == 'key':
+                key = value
+                state = 'colon'
+            else:
+                members[key] = value
+                state = 'key'
+
+    # 2. Um objeto por vez até o ']'
+    size = block_size
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_WHITESPACE + ',':
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                raise ValueError("GeoJSON truncado: array 'features' sem ']'")
+            fill(block_size)
+            continue
+        if buf[pos] == ']':
+            return
+
+        try:
+            feature, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # Feição incompleta no buffer: lê mais (dobrando, para feições
+            # grandes não serem decodificadas de novo a cada bloco)
+            fill(size)
+            size *= 2
+            continue
+
+        size = block_size
+        pos = end
+        yield feature
+        if pos > block_size:
+            buf, pos = buf[pos:], 0
+
+def iter_geojson_seq(f):
+    """GeoJSON por linha (GeoJSONSeq / NDJSON): uma feição por linha."""
+    for raw in f:
+        line = raw.decode('utf-8-sig', errors='replace').strip().lstrip('\x1e')
+        if line:
+            yield json.loads(line)
+
+def geojson_point(geometry):
+    """(lon, lat) de uma geometria Point/MultiPoint, ou None se não for ponto."""
+    if not geometry:
+        return None
+    kind = geometry.get('type')
+    coords = geometry.get('coordinates')
+    if kind == 'MultiPoint' and coords:
+        coords = coords[0]
+    elif kind != 'Point':
+        return None
+    if not coords or len(coords) < 2:
+        return None
+    return coords[0], coords[1]
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def iter_kml_placemarks(f):
+    """Gera (propriedades, (lon, lat) | None, tipo de geometria) de cada Placemark.
+
+    Usa iterparse e remove cada Placemark da árvore depois de lido, então a
+    memória não cresce com o tamanho do arquivo.
+    """
+    parents = []
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if _local_name(elem.tag) != 'Placemark':
+            continue
+
+        properties = {}
+        point = None
+        geometry = None
+        for child in elem.iter():
+            tag = _local_name(child.tag)
+            if tag in KML_FIELDS and child is not elem:
+                properties.setdefault(KML_FIELDS[tag], (child.text or '').strip())
+            elif tag == 'Data':
+                value = next((v for v in child if _local_name(v.tag) == 'value'), None)
+                properties.setdefault(child.get('name', ''), (value.text or '').strip() if value is not None else '')
+            elif tag == 'SimpleData':
+                properties.setdefault(child.get('name', ''), (child.text or '').strip())
+            elif tag in ('Point', 'LineString', 'LinearRing', 'Polygon', 'Track', 'Model'):
+                geometry = geometry or tag
+            elif tag == 'coordinates' and point is None and geometry == 'Point':
+                parts = (child.text or '').split()
+                values = parts[0].split(',') if parts else []
+                try:
+                    point = (float(values[0]), float(values[1]))
+                except (IndexError, ValueError):
+                    point = None
+
+        yield properties, point, geometry
+
+        if parents:
+            parents[-1].remove(elem)
+        else:
+            elem.clear()
+
+def iter_features(f, fmt):
+    """Feições normalizadas de um arquivo: (propriedades, (lon, lat) | None, tipo)."""
+    if fmt == 'kml':
+        yield from iter_kml_placemarks(f)
+        return
+
+    features = iter_geojson_seq(f) if fmt == 'geojsonseq' else iter_geojson_features(f)
+    for feature in features:
+        if not isinstance(feature, dict):
+            continue
+        geometry = feature.get('geometry')
+        yield (feature.get('properties') or {}, geojson_point(geometry),
+               geometry.get('type') if geometry else None)
+
+def feature_row(properties, point, field_for):
+    """Monta a linha (name, address, category, phone, rating, lon, lat) de uma feição.
+
+    As propriedades são mapeadas pelo COLUMN_MAP; as coordenadas da geometria
+    têm prioridade sobre lat/lon vindos das propriedades.
+    """
+    row = [None] * len(GEO_FIELDS)
+    for key, value in properties.items():
+        if key not in field_for:
+            mapped = normalize_columns([key])
+            field_for[key] = next(iter(mapped), None)
+        field = field_for[key]
+        if field in GEO_COL_MAP and row[GEO_COL_MAP[field]] is None:
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            row[GEO_COL_MAP[field]] = value
+    if point is not None:
+        row[GEO_COL_MAP['lon']], row[GEO_COL_MAP['lat']] = point
+    return row
+
+def parse_features(chunk):
+    """Como parse_chunk, para um lote de (número da feição, (propriedades, ponto, tipo)).
+
+    Geometrias que não são ponto viram rejeitadas; as demais passam pelo
+    mesmo build_record do CSV, com lat/lon já numéricos.
+    """
+    field_for = {}
+    rows = []
+    rejects = []
+    for feature_no, (properties, point, geometry) in chunk:
+        row = feature_row(properties, point, field_for)
+        if point is None and geometry:
+            rejects.append((feature_no, 'geometria_nao_suportada',
+                            f"Geometria {geometry} não é ponto", row))
+            continue
+        rows.append((feature_no, row))
+
+    records, row_rejects = parse_chunk(rows, GEO_COL_MAP)
+    return records, rejects + row_rejects
+
+def iter_parsed_features(f, fmt, chunk_size, known_chunk, start_feature=0):
+    """Fonte de lotes para GeoJSON/KML, no mesmo formato de iter_parsed_sequential.
+
+    A posição de checkpoint é o número de feições já consumidas; o "número
+    da linha" dos rejeitados é o número da feição (1 = primeira).
+    """
+    features = iter_features(f, fmt)
+    position = 0
+    for _ in range(start_feature):
+        if next(features, None) is None:
+            break
+        position += 1
+
+    for chunk_features in iter_chunks(features, chunk_size):
+        chunk = [(position + i + 1, feature) for i, feature in enumerate(chunk_features)]
+        position += len(chunk_features)
+        batch = {
+            'total': len(chunk), 'offset': position, 'line_no': position,
+            'hash': hashlib.sha256(
+                fmt.encode() + json.dumps(chunk_features, sort_keys=True, default=str).encode()
+            ).hexdigest(),
+            'records': [], 'rejects': [],
+            # Mesma linha que os rejeitados do parse levam ao RejectLog
+            'source': lambda chunk=chunk: [
+                (feature_no, feature_row(properties, point, {}))
+                for feature_no, (properties, point, _) in chunk
+            ],
+        }
+        batch['known'] = known_chunk(batch['hash'])
+        if batch['known'] is None:
+            batch['records'], batch['rejects'] = parse_features(chunk)
+        yield batch
+
+if __name__ == "__main__":
+    worker_csv.main()
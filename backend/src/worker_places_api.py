@@ -4,7 +4,8 @@ Worker para buscar lugares via Google Places API (New) e salvar no PostgreSQL.
 Baseado no código do Diego (mapeamentojundiainovo.py).
 
 Uso:
-    python3 src/worker_places_api.py <cidade> <keywords> <max_results>
+    python3 src/worker_places_api.py <cidade> <keywords> <max_results> [--fields ids|basic|full]
+    python3 src/worker_places_api.py --details [--fields basic|full] [--limit N]
     
 Exemplo:
     python3 src/worker_places_api.py "Jundiaí, SP" "condomínio,mercado" 50
@@ -12,33 +13,75 @@ Exemplo:
 
 import sys
 import os
+import argparse
 import json
 import time
+import hashlib
+import sqlite3
 import logging
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from typing import Dict, List, Optional
 
 import requests
 import psycopg2
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+import db
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
-# Configurações do Banco
-DB_HOST = os.getenv("DB_HOST", "76.13.173.70")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "suphelp_geo")
-DB_USER = os.getenv("DB_USER", "admin")
-DB_PASS = os.getenv("DB_PASS", "***REMOVED***")
-
 # Google Places API
 GOOGLE_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY") or os.getenv("GOOGLE_MAPS_API_KEY")
-PLACES_URL = "https://places.googleapis.com/v1/places:searchText"
+# PLACES_API_BASE_URL aponta para outro servidor (ex.: places_mock_server.py)
+PLACES_API_BASE_URL = os.getenv("PLACES_API_BASE_URL", "https://places.googleapis.com/v1").rstrip("/")
+PLACES_URL = f"{PLACES_API_BASE_URL}/places:searchText"
+PLACE_DETAILS_URL = PLACES_API_BASE_URL + "/places/{place_id}"
 
 # Configurações
 MAX_RETRIES = 3
 BACKOFF_BASE = 1.5
-SLEEP_BETWEEN_CALLS = 0.3
+
+# Cota da API: requisições por segundo (compartilhada por todas as threads),
+# rajada máxima e quantas keywords são buscadas ao mesmo tempo
+PLACES_QPS = float(os.getenv("PLACES_QPS", "5"))
+PLACES_BURST = int(os.getenv("PLACES_BURST", "5"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("PLACES_MAX_CONCURRENCY", "8"))
+
+# Text Search entrega no máximo 60 lugares por busca (3 páginas de 20);
+# na varredura, célula que volta com 60 é dividida até SWEEP_MAX_DEPTH
+SEARCH_RESULT_CAP = 60
+SWEEP_MAX_DEPTH = 6
+
+# Perfis de campos pedidos à API. O campo mais caro da máscara define o SKU
+# cobrado em cada chamada:
+#   ids   - só o place_id (Text Search IDs Only); os ids ficam numa fila e os
+#           detalhes vêm depois, com --details, só para quem ainda não está no banco
+#   basic - nome, endereço, localização e tipos (Text Search Pro)
+#   full  - basic + rating e userRatingCount (Text Search Enterprise)
+# A máscara entra na chave do cache: outra máscara, outra resposta
+FIELD_PROFILES = {
+    "ids": ["id"],
+    "basic": ["id", "displayName", "formattedAddress", "location", "types"],
+    "full": ["id", "displayName", "formattedAddress", "location", "types",
+             "rating", "userRatingCount"],
+}
+FIELD_PROFILE = os.getenv("PLACES_FIELD_PROFILE", "full")
+
+# Place Details do passe --details: lote por transação e tentativas por id
+DETAILS_BATCH_SIZE = 100
+DETAILS_MAX_ATTEMPTS = 3
+
+# Cache local das respostas do searchText (TTL 0 desliga)
+PLACES_CACHE_PATH = os.getenv(
+    "PLACES_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "places_search.sqlite")
+)
+PLACES_CACHE_TTL_HOURS = float(os.getenv("PLACES_CACHE_TTL_HOURS", "24"))
+PLACES_CACHE_MAX_MB = float(os.getenv("PLACES_CACHE_MAX_MB", "100"))
 
 # Logging
 logging.basicConfig(
@@ -53,6 +96,172 @@ class PlacesAPIError(Exception):
     pass
 
 
+class TokenBucket:
+    """
+    Rate limiter token bucket, seguro entre threads.
+
+    Os tokens são repostos continuamente a `rate` por segundo, até `capacity`.
+    Cada requisição consome um token; sem token disponível, a thread espera
+    só o tempo até o próximo, em vez de uma pausa fixa entre chamadas.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloqueia até haver um token e o consome"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+# Limiter único do processo: todas as chamadas (inclusive retries) passam por ele
+rate_limiter = TokenBucket(PLACES_QPS, PLACES_BURST)
+
+# Uma sessão HTTP por thread (reaproveita conexões TLS entre chamadas)
+_thread_local = threading.local()
+
+# Pool de conexões HTTP (urllib3) compartilhado pelas sessões de todas as
+# threads: as conexões TLS com a API sobrevivem ao fim de cada execução
+# quando o worker roda dentro do worker_daemon.py
+_http_adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+
+
+class ResponseCache:
+    """
+    Cache persistente (SQLite) das respostas do searchText.
+
+    Cada entrada guarda as páginas cruas de uma busca e se a paginação foi
+    até o fim. Entradas vencidas (TTL) são ignoradas e apagadas; quando o
+    total passa de `max_bytes`, as menos usadas recentemente são removidas.
+    Seguro entre threads (uma conexão protegida por lock) e entre processos
+    (WAL + timeout do SQLite).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS search_cache (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body TEXT NOT NULL
+            )
+        """)
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)"
+        )
+        self.db.commit()
+
+    @staticmethod
+    def make_key(payload: Dict, field_mask: str) -> str:
+        """
+        Chave da busca: query normalizada + demais parâmetros + máscara de campos
+        
+        pageSize e pageToken ficam de fora (a entrada guarda todas as páginas).
+        """
+        params = {k: v for k, v in payload.items() if k not in ("pageSize", "pageToken")}
+        params["textQuery"] = " ".join(params.get("textQuery", "").split()).casefold()
+        params["fieldMask"] = ",".join(sorted(field_mask.split(",")))
+        raw = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self.db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, entry: Dict) -> None:
+        body = json.dumps(entry, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, created_at, accessed_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                # Tamanho em bytes (UTF-8), a mesma unidade de max_bytes: nomes
+                # e endereços acentuados ocupam mais de um byte por caractere
+                (key, now, now, len(body.encode("utf-8")), body)
+            )
+            self.evict()
+            self.db.commit()
+
+    def evict(self) -> None:
+        """Remove vencidas e, se preciso, as menos usadas até caber no limite"""
+        self.db.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl,))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        for key, size in self.db.execute(
+            "SELECT key, size FROM search_cache ORDER BY accessed_at"
+        ).fetchall():
+            if excess <= 0:
+                break
+            self.db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            excess -= size
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Cache de respostas do processo (None se desligado ou indisponível)"""
+    global _response_cache
+    if PLACES_CACHE_TTL_HOURS <= 0:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            try:
+                _response_cache = ResponseCache(
+                    PLACES_CACHE_PATH,
+                    PLACES_CACHE_TTL_HOURS * 3600,
+                    int(PLACES_CACHE_MAX_MB * 1024 * 1024)
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Cache de respostas indisponível ({e}), seguindo sem cache")
+                _response_cache = False
+        return _response_cache or None
+
+
+def get_session() -> requests.Session:
+    """Sessão requests da thread atual"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = requests.Session()
+        session.mount("https://", _http_adapter)
+        session.mount("http://", _http_adapter)
+    return session
+
+
 def validate_api_key():
     """Valida se a API key está configurada"""
     if not GOOGLE_API_KEY:
@@ -62,54 +271,191 @@ def validate_api_key():
         )
 
 
-def call_places_api(query: str, max_results: int = 20) -> List[Dict]:
+def field_mask(fields: str, search: bool = True) -> str:
+    """
+    Máscara X-Goog-FieldMask de um perfil de FIELD_PROFILES
+    
+    Args:
+        fields: Perfil ("ids", "basic" ou "full")
+        search: True para o searchText (campos em places.* e nextPageToken,
+            sem o qual a API não devolve as próximas páginas); False para o
+            Place Details
+    """
+    if fields not in FIELD_PROFILES:
+        raise PlacesAPIError(
+            f"Perfil de campos inválido: {fields!r} (use {', '.join(FIELD_PROFILES)})"
+        )
+    if not search:
+        return ",".join(FIELD_PROFILES[fields])
+    return ",".join([f"places.{name}" for name in FIELD_PROFILES[fields]] + ["nextPageToken"])
+
+
+def call_places_api(query: str, max_results: int = 20, fields: str = FIELD_PROFILE) -> List[Dict]:
     """
-    Chama Google Places API (New) - Text Search
+    Chama Google Places API (New) - Text Search, seguindo a paginação
     
     Args:
         query: Texto de busca (ex: "condomínio residencial Jundiaí, SP")
         max_results: Número máximo de resultados
+        fields: Perfil de campos (FIELD_PROFILES)
         
     Returns:
         Lista de lugares encontrados
     """
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": GOOGLE_API_KEY,
-        "X-Goog-FieldMask": (
-            "places.id,"
-            "places.displayName,"
-            "places.formattedAddress,"
-            "places.location,"
-            "places.types,"
-            "places.rating,"
-            "places.userRatingCount"
-        ),
-    }
+    results = []
+    for page, _ in iter_places_pages(query, max_results, fields=fields):
+        results.extend(page)
+    return results
 
+
+def build_payload(query: str, restriction: Optional[tuple] = None) -> Dict:
+    """
+    Corpo do searchText (sem pageToken)
+    
+    Args:
+        restriction: retângulo (sul, oeste, norte, leste) para locationRestriction
+    """
     payload = {
         "textQuery": query,
         "languageCode": "pt-BR",
         "regionCode": "BR",
-        "pageSize": min(max_results, 20),  # API limita a 20 por página
+        "pageSize": 20,  # API limita a 20 por página (cobrança é por chamada)
+    }
+    if restriction:
+        south, west, north, east = restriction
+        payload["locationRestriction"] = {
+            "rectangle": {
+                "low": {"latitude": south, "longitude": west},
+                "high": {"latitude": north, "longitude": east},
+            }
+        }
+    return payload
+
+
+def iter_places_pages(query: str, max_results: int = 20, restriction: Optional[tuple] = None,
+                      fields: str = FIELD_PROFILE):
+    """
+    Gera (página de lugares adaptados, veio_do_cache) até `max_results` lugares
+    
+    Segue o nextPageToken como PlacesClient.search_text (mapeamentojundiai.py).
+    Com o cache ligado, uma busca igual feita dentro do TTL é servida do disco
+    sem nenhuma chamada paga; senão as páginas buscadas são gravadas no cache
+    ao final.
+    """
+    payload = build_payload(query, restriction)
+    mask = field_mask(fields)
+    cache = get_response_cache()
+    key = ResponseCache.make_key(payload, mask) if cache else None
+    
+    if cache:
+        entry = cache.get(key)
+        if entry and (entry["complete"] or sum(map(len, entry["pages"])) >= max_results):
+            logger.info(f"💾 Cache: {query!r} ({len(entry['pages'])} páginas)")
+            remaining = max_results
+            for raw in entry["pages"]:
+                if remaining <= 0:
+                    break
+                places = adapt_places_response(raw[:remaining])
+                remaining -= len(places)
+                yield places, True
+            return
+    
+    raw_pages = []
+    remaining = max_results
+    page_token = None
+    page_idx = 0
+    
+    while remaining > 0:
+        page_idx += 1
+        raw, page_token = fetch_places_page(payload, page_token, page_idx, mask)
+        raw_pages.append(raw)
+        places = adapt_places_response(raw[:remaining])
+        remaining -= len(places)
+        yield places, False
+        
+        if not page_token or not raw:
+            break
+    
+    if cache:
+        cache.put(key, {"pages": raw_pages, "complete": not page_token or not raw})
+
+
+def fetch_places_page(payload: Dict, page_token: Optional[str] = None,
+                      page_idx: int = 1, mask: Optional[str] = None) -> tuple:
+    """
+    Busca uma página do Text Search, com retry
+    
+    Returns:
+        (lugares crus da API, nextPageToken ou None)
+    """
+    query = payload["textQuery"]
+    if page_token:
+        payload = dict(payload, pageToken=page_token)
+    mask = mask or field_mask(FIELD_PROFILE)
+    if "nextPageToken" not in mask.split(","):
+        # Fora da máscara a API omite o token e a busca para na 1ª página
+        mask += ",nextPageToken"
+
+    data = places_request(
+        "POST", PLACES_URL, mask,
+        f"Buscando: {query!r} página {page_idx}", payload
+    )
+    places = data.get("places", [])
+    logger.info(f"✅ {len(places)} lugares encontrados")
+    return places, data.get("nextPageToken")
+
+
+def fetch_place_details(place_id: str, fields: str = "full") -> Dict:
+    """
+    Place Details (GET /places/{id}) com os campos do perfil, com retry
+    
+    Returns:
+        Lugar cru da API (mesmo formato de um item de "places" do searchText)
+    """
+    return places_request(
+        "GET", PLACE_DETAILS_URL.format(place_id=place_id), field_mask(fields, search=False),
+        f"Detalhes: {place_id}"
+    )
+
+
+def places_request(method: str, url: str, mask: str, label: str,
+                   payload: Optional[Dict] = None) -> Dict:
+    """
+    Chamada à Places API com rate limit, retry e backoff
+    
+    Args:
+        method: "POST" (searchText) ou "GET" (Place Details)
+        url: Endpoint
+        mask: X-Goog-FieldMask
+        label: Descrição para o log
+        payload: Corpo JSON (POST)
+        
+    Returns:
+        JSON da resposta
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "X-Goog-Api-Key": GOOGLE_API_KEY,
+        "X-Goog-FieldMask": mask,
     }
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            logger.info(f"Buscando: {query!r} (tentativa {attempt}/{MAX_RETRIES})")
+            logger.info(f"{label} (tentativa {attempt}/{MAX_RETRIES})")
             
-            resp = requests.post(
-                PLACES_URL,
-                json=payload,
-                headers=headers,
-                timeout=20
-            )
+            rate_limiter.acquire()
+            if method == "GET":
+                resp = get_session().get(url, headers=headers, timeout=20)
+            else:
+                resp = get_session().post(
+                    url,
+                    json=payload,
+                    headers=headers,
+                    timeout=20
+                )
 
             if resp.status_code == 200:
-                data = resp.json()
-                places = data.get("places", [])
-                logger.info(f"✅ {len(places)} lugares encontrados")
-                return adapt_places_response(places)
+                return resp.json()
 
             # Erros recuperáveis (retry)
             if resp.status_code in (429, 500, 502, 503, 504):
@@ -175,75 +521,82 @@ def adapt_places_response(places: List[Dict]) -> List[Dict]:
     return results
 
 
-def save_to_database(places: List[Dict], category: str = "Importado") -> Dict:
+def save_to_database(places: List[Dict], category: str = "Importado", conn=None) -> Dict:
     """
     Salva lugares no PostgreSQL com geometria PostGIS
     
     Args:
         places: Lista de lugares para salvar
         category: Categoria dos lugares
+        conn: Conexão já aberta (reaproveitada entre chamadas); se None,
+            usa uma do pool só para esta chamada
         
     Returns:
         Estatísticas da importação
     """
-    conn = None
+    if conn is None:
+        with db.connection() as conn:
+            return save_to_database(places, category, conn)
+    
     stats = {"success": 0, "duplicates": 0, "errors": 0}
     
     try:
-        # Conecta no banco
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS
-        )
         cur = conn.cursor()
         
         logger.info(f"💾 Salvando {len(places)} lugares no banco...")
         
+        # Monta as linhas válidas; place_id repetido no lote vira uma linha só
+        # (um mesmo comando ON CONFLICT não pode atualizar a linha duas vezes)
+        rows = {}
         for place in places:
-            try:
-                name = place.get("name", "Sem nome")
-                address = place.get("address", "")
-                place_id = place.get("place_id", "")
-                lat = place.get("lat")
-                lng = place.get("lng")
-                
-                # Valida coordenadas
-                if lat is None or lng is None:
-                    logger.warning(f"⚠️  {name}: sem coordenadas, pulando...")
-                    stats["errors"] += 1
-                    continue
-                
-                # Query com UPSERT (evita duplicatas por google_place_id)
-                query = """
-                    INSERT INTO places (name, address, google_place_id, category, location)
-                    VALUES (%s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326))
-                    ON CONFLICT (google_place_id) 
-                    DO UPDATE SET
-                        name = EXCLUDED.name,
-                        address = EXCLUDED.address,
-                        category = EXCLUDED.category,
-                        location = EXCLUDED.location
-                    RETURNING id, (xmax = 0) AS inserted;
-                """
-                
-                cur.execute(query, (name, address, place_id, category, lng, lat))
-                result = cur.fetchone()
-                
-                if result:
-                    place_db_id, inserted = result
-                    if inserted:
-                        stats["success"] += 1
-                        logger.debug(f"✅ Inserido: {name} (ID: {place_db_id})")
-                    else:
-                        stats["duplicates"] += 1
-                        logger.debug(f"🔄 Atualizado: {name} (ID: {place_db_id})")
-                
-            except Exception as e:
+            name = place.get("name", "Sem nome")
+            place_id = place.get("place_id", "")
+            lat = place.get("lat")
+            lng = place.get("lng")
+            
+            # Valida coordenadas
+            if lat is None or lng is None:
+                logger.warning(f"⚠️  {name}: sem coordenadas, pulando...")
                 stats["errors"] += 1
-                logger.error(f"❌ Erro ao salvar {place.get('name')}: {e}")
+                continue
+            
+            if place_id in rows:
+                stats["duplicates"] += 1
+            rows[place_id] = (
+                name, place.get("address", ""), place_id, category,
+                place.get("rating"), place.get("user_ratings_total"), lng, lat
+            )
+        
+        if rows:
+            # Um único UPSERT multi-linha (uma ida e volta ao banco por lote);
+            # se falhar, cai para linha a linha só para isolar quem tem erro
+            cur.execute("SAVEPOINT places_upsert")
+            try:
+                results = upsert_places(cur, list(rows.values()))
+                cur.execute("RELEASE SAVEPOINT places_upsert")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT places_upsert")
+                cur.execute("RELEASE SAVEPOINT places_upsert")
+                logger.warning(f"⚠️  Upsert em lote falhou ({e}), gravando linha a linha...")
+                results = []
+                for row in rows.values():
+                    cur.execute("SAVEPOINT places_upsert")
+                    try:
+                        results.extend(upsert_places(cur, [row]))
+                        cur.execute("RELEASE SAVEPOINT places_upsert")
+                    except psycopg2.Error as row_error:
+                        cur.execute("ROLLBACK TO SAVEPOINT places_upsert")
+                        cur.execute("RELEASE SAVEPOINT places_upsert")
+                        stats["errors"] += 1
+                        logger.error(f"❌ Erro ao salvar {row[0]}: {row_error}")
+            
+            # xmax = 0 só para linhas recém-inseridas; no UPDATE do ON CONFLICT
+            # a versão nova carrega o xmax da transação
+            for place_db_id, inserted in results:
+                if inserted:
+                    stats["success"] += 1
+                else:
+                    stats["duplicates"] += 1
         
         conn.commit()
         cur.close()
@@ -257,17 +610,190 @@ def save_to_database(places: List[Dict], category: str = "Importado") -> Dict:
         
     except Exception as e:
         logger.error(f"❌ Erro crítico no banco: {e}")
-        if conn:
-            conn.rollback()
+        conn.rollback()
         raise
-    finally:
-        if conn:
-            conn.close()
     
     return stats
 
 
-def search_and_save(city: str, keywords: List[str], max_results: int = 50) -> Dict:
+def upsert_places(cur, rows: List[tuple]) -> List[tuple]:
+    """
+    UPSERT multi-linha por google_place_id
+    
+    rating/user_ratings_total só sobrescrevem quando vieram na resposta: uma
+    busca "basic" não apaga o que uma "full" já gravou.
+    
+    Returns:
+        Lista de (id, inserted) na ordem das linhas
+    """
+    return execute_values(
+        cur,
+        """
+        INSERT INTO places (name, address, google_place_id, category,
+                            rating, user_ratings_total, location)
+        VALUES %s
+        ON CONFLICT (google_place_id) 
+        DO UPDATE SET
+            name = EXCLUDED.name,
+            address = EXCLUDED.address,
+            category = EXCLUDED.category,
+            rating = COALESCE(EXCLUDED.rating, places.rating),
+            user_ratings_total = COALESCE(EXCLUDED.user_ratings_total, places.user_ratings_total),
+            location = EXCLUDED.location
+        RETURNING id, (xmax = 0) AS inserted
+        """,
+        rows,
+        template="(%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326))",
+        page_size=len(rows),
+        fetch=True
+    )
+
+
+def ensure_pending_table(cur) -> None:
+    """Cria places_pending_details se ainda não existir (migração 005)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS places_pending_details (
+            google_place_id VARCHAR(255) PRIMARY KEY,
+            category VARCHAR(100),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def queue_place_ids(places: List[Dict], category: str, conn) -> Dict:
+    """
+    Enfileira place_ids (perfil "ids") para o passe de detalhes
+    
+    Ids que já estão em places não entram: os detalhes pagos ficam só para
+    lugares novos.
+    
+    Returns:
+        Estatísticas (success = enfileirados, duplicates = já conhecidos)
+    """
+    ids = [(p["place_id"], category) for p in places if p.get("place_id")]
+    stats = {"success": 0, "duplicates": 0, "errors": len(places) - len(ids)}
+    if not ids:
+        return stats
+    
+    try:
+        cur = conn.cursor()
+        ensure_pending_table(cur)
+        queued = execute_values(
+            cur,
+            """
+            INSERT INTO places_pending_details (google_place_id, category)
+            SELECT v.google_place_id, v.category
+            FROM (VALUES %s) AS v (google_place_id, category)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM places p WHERE p.google_place_id = v.google_place_id
+            )
+            ON CONFLICT (google_place_id) DO NOTHING
+            RETURNING google_place_id
+            """,
+            ids,
+            page_size=len(ids),
+            fetch=True
+        )
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        logger.error(f"❌ Erro ao enfileirar ids: {e}")
+        conn.rollback()
+        raise
+    
+    stats["success"] = len(queued)
+    stats["duplicates"] = len(ids) - len(queued)
+    logger.info(f"📥 {stats['success']} ids enfileirados para detalhes, {stats['duplicates']} já conhecidos")
+    return stats
+
+
+def write_pages(pages: "queue.Queue", category: str, result: Dict,
+                fields: str = FIELD_PROFILE) -> None:
+    """
+    Escritor do banco: grava cada página assim que ela chega da API
+    
+    Roda numa thread própria, com uma única conexão, enquanto as próximas
+    páginas ainda estão sendo buscadas. Lugares repetidos entre keywords e
+    páginas (mesmo place_id) são gravados uma vez só. Termina ao receber None.
+    Com o perfil "ids" os ids vão para a fila de detalhes em vez de places.
+    """
+    seen = set()
+    try:
+        with db.connection() as conn:
+            while True:
+                page = pages.get()
+                if page is None:
+                    break
+                
+                novos = []
+                for place in page:
+                    place_id = place.get("place_id")
+                    if place_id and place_id not in seen:
+                        seen.add(place_id)
+                        novos.append(place)
+                if not novos:
+                    continue
+                
+                if fields == "ids":
+                    page_stats = queue_place_ids(novos, category, conn)
+                else:
+                    page_stats = save_to_database(novos, category, conn=conn)
+                for key in ("success", "duplicates", "errors"):
+                    result[key] += page_stats[key]
+    except Exception as e:
+        result["exception"] = e
+        # Continua consumindo a fila para as threads de busca não ficarem presas
+        while pages.get() is not None:
+            pass
+    finally:
+        result["unique"] = len(seen)
+
+
+def start_writer(category: str, fields: str = FIELD_PROFILE) -> tuple:
+    """
+    Inicia a thread escritora do banco
+    
+    Páginas vão para o escritor assim que chegam: a gravação de uma página
+    acontece enquanto as próximas ainda estão sendo buscadas.
+    
+    Returns:
+        (fila de páginas, estatísticas do escritor, thread)
+    """
+    pages = queue.Queue()
+    db_stats = {"success": 0, "duplicates": 0, "errors": 0}
+    writer = threading.Thread(target=write_pages, args=(pages, category, db_stats, fields), daemon=True)
+    writer.start()
+    return pages, db_stats, writer
+
+
+def finish_writer(pages: "queue.Queue", db_stats: Dict, writer: threading.Thread,
+                  total_stats: Dict) -> None:
+    """Encerra o escritor e consolida as estatísticas do banco em total_stats"""
+    pages.put(None)
+    writer.join()
+    
+    if "exception" in db_stats:
+        raise db_stats["exception"]
+    
+    if db_stats["unique"]:
+        logger.info(f"📊 Total de lugares únicos encontrados: {db_stats['unique']}")
+    else:
+        logger.warning("⚠️  Nenhum lugar encontrado")
+    
+    # Consolida estatísticas
+    total_stats["success"] = db_stats["success"]
+    total_stats["duplicates"] = db_stats["duplicates"]
+    total_stats["errors"] += db_stats["errors"]
+
+
+def keywords_category(keywords: List[str]) -> str:
+    """Determina categoria baseada nas keywords"""
+    return ", ".join(keywords[:2]) if len(keywords) <= 2 else "Múltiplas categorias"
+
+
+def search_and_save(city: str, keywords: List[str], max_results: int = 50,
+                    fields: str = FIELD_PROFILE) -> Dict:
     """
     Busca lugares e salva no banco (função principal)
     
@@ -275,53 +801,378 @@ def search_and_save(city: str, keywords: List[str], max_results: int = 50) -> Di
         city: Cidade para buscar (ex: "Jundiaí, SP")
         keywords: Lista de palavras-chave (ex: ["condomínio", "mercado"])
         max_results: Máximo de resultados por keyword
+        fields: Perfil de campos (FIELD_PROFILES)
         
     Returns:
         Estatísticas consolidadas
     """
     validate_api_key()
     
-    all_places = {}  # Usa dict para evitar duplicatas por place_id
-    total_stats = {"success": 0, "duplicates": 0, "errors": 0, "api_calls": 0}
+    total_stats = {"success": 0, "duplicates": 0, "errors": 0, "api_calls": 0, "cache_hits": 0}
     
-    logger.info(f"🔍 Iniciando busca em {city}")
+    logger.info(f"🔍 Iniciando busca em {city} (campos: {fields})")
     logger.info(f"📋 Keywords: {', '.join(keywords)}")
     
-    for keyword in keywords:
-        query = f"{keyword} {city}"
+    pages, db_stats, writer = start_writer(keywords_category(keywords), fields)
+    
+    def fetch_keyword(keyword: str) -> tuple:
+        calls = 0
+        hits = 0
+        for page, cached in iter_places_pages(f"{keyword} {city}", max_results, fields=fields):
+            if cached:
+                hits += 1
+            else:
+                calls += 1
+            pages.put(page)
+        return calls, hits
+    
+    # Keywords buscadas em paralelo; o token bucket mantém a cota de QPS
+    workers = max(1, min(MAX_CONCURRENT_REQUESTS, len(keywords)))
+    logger.info(f"⚙️  {workers} buscas simultâneas, limite de {PLACES_QPS:g} req/s")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(keyword, executor.submit(fetch_keyword, keyword)) for keyword in keywords]
+            
+            for keyword, future in futures:
+                try:
+                    calls, hits = future.result()
+                    total_stats["api_calls"] += calls
+                    total_stats["cache_hits"] += hits
+                except PlacesAPIError as e:
+                    logger.error(f"❌ Erro na busca '{keyword}': {e}")
+                    total_stats["errors"] += 1
+    finally:
+        finish_writer(pages, db_stats, writer, total_stats)
+    
+    return total_stats
+
+
+def parse_bbox(value: str) -> tuple:
+    """
+    Converte "sul,oeste,norte,leste" (lat/lng em graus) em tupla
+    
+    Ex.: "-23.35,-47.05,-23.05,-46.75" (Jundiaí)
+    """
+    try:
+        south, west, north, east = (float(v) for v in value.split(","))
+    except ValueError:
+        raise PlacesAPIError(f"bbox inválido: {value!r} (esperado sul,oeste,norte,leste)")
+    if south >= north or west >= east:
+        raise PlacesAPIError(f"bbox inválido: {value!r} (sul < norte e oeste < leste)")
+    return south, west, north, east
+
+
+def load_polygon(value: str) -> List[List[List[tuple]]]:
+    """
+    Lê um polígono GeoJSON (arquivo ou JSON inline)
+    
+    Aceita Polygon, MultiPolygon, Feature ou FeatureCollection (todas as
+    feições poligonais entram).
+    
+    Returns:
+        Lista de polígonos; cada um é uma lista de anéis [(lng, lat), ...],
+        o primeiro externo e os demais buracos
+    """
+    if value.lstrip().startswith("{"):
+        data = json.loads(value)
+    else:
+        with open(value, encoding="utf-8") as f:
+            data = json.load(f)
+    
+    if data.get("type") == "FeatureCollection":
+        geometries = [f.get("geometry") or {} for f in data.get("features", [])]
+    elif data.get("type") == "Feature":
+        geometries = [data.get("geometry") or {}]
+    else:
+        geometries = [data]
+    
+    polygons = []
+    for geometry in geometries:
+        if geometry.get("type") == "Polygon":
+            coords = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            coords = geometry["coordinates"]
+        else:
+            continue
+        for polygon in coords:
+            polygons.append([[(p[0], p[1]) for p in ring] for ring in polygon])
+    
+    if not polygons:
+        raise PlacesAPIError("Nenhum Polygon/MultiPolygon encontrado no GeoJSON")
+    return polygons
+
+
+def polygons_bbox(polygons: List) -> tuple:
+    """bbox (sul, oeste, norte, leste) que cobre os polígonos"""
+    points = [p for polygon in polygons for p in polygon[0]]
+    lngs = [p[0] for p in points]
+    lats = [p[1] for p in points]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def _point_in_ring(lng: float, lat: float, ring: List[tuple]) -> bool:
+    """Ray casting: ponto dentro de um anel"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_polygons(lng: float, lat: float, polygons: List) -> bool:
+    """Ponto dentro de algum polígono (fora dos buracos dele)"""
+    for polygon in polygons:
+        if _point_in_ring(lng, lat, polygon[0]) and not any(
+            _point_in_ring(lng, lat, hole) for hole in polygon[1:]
+        ):
+            return True
+    return False
+
+
+def _segments_cross(a: tuple, b: tuple, c: tuple, d: tuple) -> bool:
+    def orient(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return (orient(a, b, c) * orient(a, b, d) < 0) and (orient(c, d, a) * orient(c, d, b) < 0)
+
+
+def cell_intersects_polygons(cell: tuple, polygons: List) -> bool:
+    """Retângulo (sul, oeste, norte, leste) toca algum dos polígonos"""
+    south, west, north, east = cell
+    corners = [(west, south), (east, south), (east, north), (west, north)]
+    edges = list(zip(corners, corners[1:] + corners[:1]))
+    
+    if any(point_in_polygons(lng, lat, polygons) for lng, lat in corners):
+        return True
+    for polygon in polygons:
+        ring = polygon[0]
+        if any(west <= lng <= east and south <= lat <= north for lng, lat in ring):
+            return True
+        for p, q in zip(ring, ring[1:] + ring[:1]):
+            if any(_segments_cross(p, q, c, d) for c, d in edges):
+                return True
+    return False
+
+
+def split_cell(cell: tuple) -> List[tuple]:
+    """Divide o retângulo em 4 quadrantes"""
+    south, west, north, east = cell
+    mid_lat = (south + north) / 2
+    mid_lng = (west + east) / 2
+    return [
+        (south, west, mid_lat, mid_lng),
+        (south, mid_lng, mid_lat, east),
+        (mid_lat, west, north, mid_lng),
+        (mid_lat, mid_lng, north, east),
+    ]
+
+
+def sweep_and_save(city: str, keywords: List[str], bbox: Optional[tuple] = None,
+                   polygons: Optional[List] = None, max_depth: int = SWEEP_MAX_DEPTH,
+                   fields: str = FIELD_PROFILE) -> Dict:
+    """
+    Varredura por tiles (quadtree) para passar do teto de 60 resultados por busca
+    
+    Cada keyword é buscada com locationRestriction em retângulos, começando
+    pelo bbox (ou pelo bbox do polígono). Célula que volta cheia (60
+    resultados, o máximo do Text Search) provavelmente tem mais lugares e é
+    dividida em 4; célula que volta com menos já está completa e para ali.
+    Com polígono, células fora dele são descartadas sem chamada e lugares fora
+    dele não são gravados (exceto no perfil "ids", que não traz localização).
+    
+    Args:
+        city: Cidade (entra no texto da busca, ex: "Jundiaí, SP"; pode ser vazio)
+        keywords: Lista de palavras-chave
+        bbox: (sul, oeste, norte, leste)
+        polygons: Polígonos de load_polygon
+        max_depth: Profundidade máxima da quadtree (célula inicial = 0)
+        fields: Perfil de campos (FIELD_PROFILES); "ids" é o mais barato para
+            varrer e deixa os detalhes para o passe --details
         
-        try:
-            places = call_places_api(query, max_results)
-            total_stats["api_calls"] += 1
+    Returns:
+        Estatísticas consolidadas
+    """
+    validate_api_key()
+    
+    if bbox is None:
+        if not polygons:
+            raise PlacesAPIError("Varredura exige bbox ou polígono")
+        bbox = polygons_bbox(polygons)
+    
+    total_stats = {
+        "success": 0, "duplicates": 0, "errors": 0, "api_calls": 0, "cache_hits": 0,
+        "cells": 0, "cells_split": 0, "cells_saturated": 0,
+    }
+    
+    logger.info(f"🗺️  Varredura por tiles em {city or 'área'} (bbox {bbox}, profundidade máx. {max_depth}, campos: {fields})")
+    logger.info(f"📋 Keywords: {', '.join(keywords)}")
+    
+    # Sem localização na resposta não há como filtrar lugares pelo polígono;
+    # as células fora dele continuam sendo descartadas
+    filter_polygons = polygons if fields != "ids" else None
+    
+    pages, db_stats, writer = start_writer(keywords_category(keywords), fields)
+    
+    def search_cell(keyword: str, cell: tuple) -> tuple:
+        query = f"{keyword} {city}".strip()
+        calls = 0
+        hits = 0
+        found = 0
+        for page, cached in iter_places_pages(query, SEARCH_RESULT_CAP, restriction=cell, fields=fields):
+            if cached:
+                hits += 1
+            else:
+                calls += 1
+            found += len(page)
+            if filter_polygons:
+                page = [
+                    p for p in page
+                    if p.get("lat") is not None and p.get("lng") is not None
+                    and point_in_polygons(p["lng"], p["lat"], filter_polygons)
+                ]
+            pages.put(page)
+        return calls, hits, found
+    
+    workers = max(1, MAX_CONCURRENT_REQUESTS)
+    logger.info(f"⚙️  {workers} buscas simultâneas, limite de {PLACES_QPS:g} req/s")
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
             
-            # Adiciona ao dicionário (evita duplicatas)
-            for place in places:
-                place_id = place.get("place_id")
-                if place_id and place_id not in all_places:
-                    all_places[place_id] = place
+            def submit(keyword: str, cell: tuple, depth: int) -> None:
+                if polygons and not cell_intersects_polygons(cell, polygons):
+                    return
+                future = executor.submit(search_cell, keyword, cell)
+                pending[future] = (keyword, cell, depth)
             
-            # Respeita rate limit
-            time.sleep(SLEEP_BETWEEN_CALLS)
+            for keyword in keywords:
+                submit(keyword, bbox, 0)
             
-        except PlacesAPIError as e:
-            logger.error(f"❌ Erro na busca '{keyword}': {e}")
-            total_stats["errors"] += 1
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    keyword, cell, depth = pending.pop(future)
+                    total_stats["cells"] += 1
+                    try:
+                        calls, hits, found = future.result()
+                    except PlacesAPIError as e:
+                        logger.error(f"❌ Erro na busca '{keyword}' em {cell}: {e}")
+                        total_stats["errors"] += 1
+                        continue
+                    total_stats["api_calls"] += calls
+                    total_stats["cache_hits"] += hits
+                    
+                    if found < SEARCH_RESULT_CAP:
+                        continue
+                    if depth >= max_depth:
+                        # Ainda cheia no limite: pode haver lugares não cobertos
+                        total_stats["cells_saturated"] += 1
+                        logger.warning(f"⚠️  '{keyword}': célula {cell} cheia na profundidade máxima")
+                        continue
+                    total_stats["cells_split"] += 1
+                    for child in split_cell(cell):
+                        submit(keyword, child, depth + 1)
+    finally:
+        finish_writer(pages, db_stats, writer, total_stats)
+    
+    return total_stats
+
+
+def details_and_save(fields: str = "full", limit: Optional[int] = None) -> Dict:
+    """
+    Passe de detalhes: busca Place Details dos ids enfileirados e salva em places
+    
+    Complementa uma busca/varredura feita com o perfil "ids": só os lugares
+    que ainda não estavam no banco pagam a chamada de detalhes. Processa a
+    fila em lotes de DETAILS_BATCH_SIZE, cada um numa transação; ids que
+    falham DETAILS_MAX_ATTEMPTS vezes deixam de ser tentados.
+    
+    Args:
+        fields: Perfil dos detalhes ("basic" ou "full")
+        limit: Máximo de ids processados nesta execução
+        
+    Returns:
+        Estatísticas consolidadas (pending = ids que ainda restam na fila)
+    """
+    validate_api_key()
+    
+    if fields == "ids":
+        raise PlacesAPIError("O passe de detalhes precisa do perfil 'basic' ou 'full'")
+    field_mask(fields)
+    
+    total_stats = {"success": 0, "duplicates": 0, "errors": 0, "api_calls": 0, "cache_hits": 0, "pending": 0}
     
-    # Salva no banco
-    if all_places:
-        logger.info(f"📊 Total de lugares únicos encontrados: {len(all_places)}")
+    with db.connection() as conn:
+        cur = conn.cursor()
+        ensure_pending_table(cur)
+        conn.commit()
         
-        # Determina categoria baseada nas keywords
-        category = ", ".join(keywords[:2]) if len(keywords) <= 2 else "Múltiplas categorias"
+        workers = max(1, MAX_CONCURRENT_REQUESTS)
+        logger.info(f"🔎 Passe de detalhes (campos: {fields}, {workers} buscas simultâneas)")
         
-        db_stats = save_to_database(list(all_places.values()), category)
+        processed = 0
+        failed_ids = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while limit is None or processed < limit:
+                batch_size = DETAILS_BATCH_SIZE if limit is None else min(DETAILS_BATCH_SIZE, limit - processed)
+                cur.execute(
+                    """
+                    SELECT google_place_id, category FROM places_pending_details
+                    WHERE attempts < %s AND NOT (google_place_id = ANY(%s))
+                    ORDER BY queued_at, google_place_id
+                    LIMIT %s
+                    """,
+                    (DETAILS_MAX_ATTEMPTS, failed_ids, batch_size)
+                )
+                pending = cur.fetchall()
+                if not pending:
+                    break
+                processed += len(pending)
+                
+                futures = {
+                    executor.submit(fetch_place_details, place_id, fields): (place_id, category)
+                    for place_id, category in pending
+                }
+                by_category = {}
+                done, failed = [], []
+                for future in as_completed(futures):
+                    place_id, category = futures[future]
+                    total_stats["api_calls"] += 1
+                    try:
+                        raw = future.result()
+                    except PlacesAPIError as e:
+                        logger.error(f"❌ Erro nos detalhes de {place_id}: {e}")
+                        failed.append(place_id)
+                        continue
+                    by_category.setdefault(category or "Importado", []).extend(adapt_places_response([raw]))
+                    done.append(place_id)
+                
+                for category, places in by_category.items():
+                    page_stats = save_to_database(places, category, conn=conn)
+                    for key in ("success", "duplicates", "errors"):
+                        total_stats[key] += page_stats[key]
+                
+                # Falhas ficam na fila com uma tentativa a mais (e não voltam
+                # no resto desta execução)
+                cur.execute(
+                    "DELETE FROM places_pending_details WHERE google_place_id = ANY(%s)", (done,)
+                )
+                cur.execute(
+                    "UPDATE places_pending_details SET attempts = attempts + 1 WHERE google_place_id = ANY(%s)",
+                    (failed,)
+                )
+                conn.commit()
+                failed_ids.extend(failed)
+                total_stats["errors"] += len(failed)
         
-        # Consolida estatísticas
-        total_stats["success"] = db_stats["success"]
-        total_stats["duplicates"] = db_stats["duplicates"]
-        total_stats["errors"] += db_stats["errors"]
-    else:
-        logger.warning("⚠️  Nenhum lugar encontrado")
+        cur.execute("SELECT COUNT(*) FROM places_pending_details WHERE attempts < %s", (DETAILS_MAX_ATTEMPTS,))
+        total_stats["pending"] = cur.fetchone()[0]
+        cur.close()
     
     return total_stats
 
@@ -332,35 +1183,65 @@ def main():
     logger.info("🚀 Worker Google Places API - SupHelp Geo")
     logger.info("="*70)
     
-    # Parse argumentos
-    if len(sys.argv) < 3:
-        logger.error(
-            "❌ Uso incorreto!\n"
-            "Uso: python3 worker_places_api.py <cidade> <keywords> [max_results]\n"
-            "Exemplo: python3 worker_places_api.py 'Jundiaí, SP' 'condomínio,mercado' 50"
-        )
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Busca lugares via Google Places API (New) e salva no PostgreSQL",
+        epilog="Exemplo: python3 worker_places_api.py 'Jundiaí, SP' 'condomínio,mercado' 50"
+    )
+    parser.add_argument("cidade", nargs="?", help="Cidade da busca (ex: 'Jundiaí, SP')")
+    parser.add_argument("keywords", nargs="?", help="Palavras-chave separadas por vírgula")
+    parser.add_argument("max_results", nargs="?", type=int, default=50,
+                        help="Máximo de resultados por keyword (padrão: 50; ignorado na varredura)")
+    parser.add_argument("--bbox", help="Varredura por tiles no retângulo sul,oeste,norte,leste "
+                                       "(use --bbox=-23.3,... com latitude negativa)")
+    parser.add_argument("--polygon", help="Varredura por tiles num polígono GeoJSON (arquivo ou JSON)")
+    parser.add_argument("--max-depth", type=int, default=SWEEP_MAX_DEPTH,
+                        help=f"Profundidade máxima da varredura (padrão: {SWEEP_MAX_DEPTH})")
+    parser.add_argument("--fields", choices=list(FIELD_PROFILES), default=FIELD_PROFILE,
+                        help=f"Perfil de campos: ids, basic ou full (padrão: {FIELD_PROFILE})")
+    parser.add_argument("--details", action="store_true",
+                        help="Busca os detalhes dos ids enfileirados por uma execução com --fields ids")
+    parser.add_argument("--limit", type=int, help="Máximo de ids processados por --details")
+    args = parser.parse_args()
     
-    city = sys.argv[1]
-    keywords_str = sys.argv[2]
-    max_results = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    city = args.cidade
+    max_results = args.max_results
     
     # Processa keywords
-    keywords = [k.strip() for k in keywords_str.split(",") if k.strip()]
+    keywords = [k.strip() for k in (args.keywords or "").split(",") if k.strip()]
+    
+    if not args.details and not city:
+        parser.error("cidade e keywords são obrigatórios (exceto com --details)")
     
-    if not keywords:
+    if not args.details and not keywords:
         logger.error("❌ Nenhuma keyword fornecida")
         sys.exit(1)
     
     try:
         # Executa busca
-        stats = search_and_save(city, keywords, max_results)
+        if args.details:
+            stats = details_and_save(
+                args.fields if args.fields != "ids" else "full", args.limit
+            )
+        elif args.bbox or args.polygon:
+            stats = sweep_and_save(
+                city, keywords,
+                bbox=parse_bbox(args.bbox) if args.bbox else None,
+                polygons=load_polygon(args.polygon) if args.polygon else None,
+                max_depth=args.max_depth,
+                fields=args.fields
+            )
+        else:
+            stats = search_and_save(city, keywords, max_results, args.fields)
         
         # Resultado final
         logger.info("="*70)
         logger.info("📊 RESULTADO FINAL")
         logger.info("="*70)
-        logger.info(f"Chamadas à API: {stats['api_calls']}")
+        logger.info(f"Chamadas à API: {stats['api_calls']} (+{stats['cache_hits']} páginas do cache)")
+        if "cells" in stats:
+            logger.info(f"Células buscadas: {stats['cells']} ({stats['cells_split']} divididas)")
+        if "pending" in stats:
+            logger.info(f"Ids ainda na fila de detalhes: {stats['pending']}")
         logger.info(f"Novos registros: {stats['success']}")
         logger.info(f"Atualizados: {stats['duplicates']}")
         logger.info(f"Erros: {stats['errors']}")
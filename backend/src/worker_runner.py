@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# backend/src/worker_runner.py
+"""
+Executor dos jobs em segundo plano da tabela worker_jobs.
+
+As rotas do server.js chamadas com async=true só inserem o job (worker +
+argv) e respondem 202; este processo pega os jobs da fila e roda o main()
+do worker como o worker_daemon.py faz, gravando progresso, cauda da saída,
+heartbeat e, no fim, o JSON de estatísticas e o status. O Node consulta o
+status em GET /api/jobs/:id em vez de segurar a requisição aberta.
+
+Cada processo pega um job por vez com SELECT ... FOR UPDATE SKIP LOCKED:
+quantos runners e processos houver (nesta ou em outras máquinas apontando
+para o mesmo banco), cada job roda uma vez só e ninguém espera lock de
+ninguém. Os jobs de importação trazem só o caminho absoluto do upload em
+uploads/ (e o runner apaga os arquivos do job ao terminar): um runner em
+outra máquina precisa desse diretório compartilhado, no mesmo caminho. Novos jobs acordam os runners por NOTIFY worker_jobs; sem ele, a
+fila é consultada a cada --poll-interval segundos.
+
+Se um runner morre no meio de um job, o heartbeat para e o job volta para
+a fila (até max_attempts tentativas, depois fica como failed). Heartbeat e
+resultado só são gravados se o job ainda for desta tentativa (locked_by e
+attempts); se o job foi devolvido à fila enquanto este runner estava parado,
+a execução em andamento é abandonada sem gravar nada.
+
+Uso:
+    python3 src/worker_runner.py [--processes N] [--poll-interval S] [--once]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import Json
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import db
+from worker_daemon import WORKERS, run_job
+
+# Canal do NOTIFY enviado por services/jobQueue.js a cada job novo
+JOBS_CHANNEL = "worker_jobs"
+
+# Intervalo do heartbeat/progresso e tempo sem heartbeat para um job ser
+# considerado órfão (runner morto) e voltar para a fila
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "5"))
+JOB_STALE_AFTER_S = int(os.getenv("JOB_STALE_AFTER_S", "120"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "10"))
+
+# Cauda da saída guardada em worker_jobs.output
+OUTPUT_TAIL_CHARS = 20000
+
+# Pedido de parada (SIGTERM/SIGINT): o job em andamento termina antes
+_stop = threading.Event()
+
+
+# Só há worker para interromper (abandon_job) enquanto execute_job o roda
+_job_running = threading.Event()
+
+
+class JobLost(BaseException):
+    """
+    Levantada no meio do worker quando o job deixa de ser deste runner
+
+    BaseException, como KeyboardInterrupt: os `except Exception` dos workers
+    não a engolem.
+    """
+
+
+def ensure_jobs_table(cur):
+    """Cria a tabela da fila se ainda não existir (ver migrations/006_worker_jobs.sql)"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS worker_jobs (
+            id SERIAL PRIMARY KEY,
+            worker VARCHAR(50) NOT NULL,
+            args JSONB NOT NULL DEFAULT '[]',
+            files JSONB NOT NULL DEFAULT '[]',
+            status VARCHAR(20) NOT NULL DEFAULT 'queued'
+                CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            locked_by VARCHAR(255),
+            progress TEXT,
+            output TEXT,
+            result JSONB,
+            exit_code INTEGER,
+            error_message TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_jobs_queued ON worker_jobs (id) WHERE status = 'queued'")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_worker_jobs_status ON worker_jobs (status, created_at)")
+
+
+def requeue_stale(cur):
+    """
+    Devolve à fila os jobs cujo runner parou de mandar heartbeat
+
+    Jobs que já usaram max_attempts tentativas ficam como failed.
+
+    Returns:
+        Lista de (id, novo status)
+    """
+    cur.execute("""
+        UPDATE worker_jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+            error_message = 'Runner ' || COALESCE(locked_by, '?') || ' parou de responder',
+            locked_by = NULL
+        WHERE status = 'running'
+          AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        RETURNING id, status
+    """, (JOB_STALE_AFTER_S,))
+    return cur.fetchall()
+
+
+def claim_job(cur, runner_id):
+    """
+    Pega o próximo job da fila para este runner
+
+    FOR UPDATE SKIP LOCKED: um job sendo pego por outro runner é pulado
+    em vez de esperado, então N runners consomem a fila em paralelo.
+
+    Returns:
+        Dict do job ou None se a fila estiver vazia
+    """
+    cur.execute("""
+        UPDATE worker_jobs
+        SET status = 'running', attempts = attempts + 1, locked_by = %s,
+            started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP,
+            progress = NULL, output = NULL, error_message = NULL
+        WHERE id = (
+            SELECT id FROM worker_jobs
+            WHERE status = 'queued'
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING id, worker, args, files, attempts
+    """, (runner_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return {"id": row[0], "worker": row[1], "args": row[2] or [],
+            "files": row[3] or [], "attempts": row[4]}
+
+
+class JobReporter:
+    """
+    Recebe a saída do job (emit do run_job) e grava progresso e heartbeat
+
+    Uma thread atualiza worker_jobs a cada JOB_HEARTBEAT_INTERVAL com a
+    última linha impressa (progress) e a cauda da saída (output). A última
+    linha JSON do stdout vira o resultado do job.
+    """
+
+    def __init__(self, job_id, runner_id, attempts):
+        self.job_id = job_id
+        self.runner_id = runner_id
+        self.attempts = attempts
+        self.lock = threading.Lock()
+        self.chunks = []
+        self.size = 0
+        self.progress = None
+        self.last_error = None
+        self.result = None
+        self.done = threading.Event()
+        self.lost = threading.Event()
+        self.thread = threading.Thread(target=self.heartbeat_loop, daemon=True)
+
+    def emit(self, stream, data):
+        # O sys.stdout do processo está redirecionado para o job: eco no original
+        echo = sys.__stderr__ if stream == "stderr" else sys.__stdout__
+        for line in data.splitlines():
+            echo.write(f"[job {self.job_id}] {line}\n")
+        echo.flush()
+
+        with self.lock:
+            self.chunks.append(data)
+            self.size += len(data)
+            if self.size > 2 * OUTPUT_TAIL_CHARS:
+                tail = "".join(self.chunks)[-OUTPUT_TAIL_CHARS:]
+                self.chunks, self.size = [tail], len(tail)
+
+            for line in data.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+                self.progress = line[:500]
+                if stream == "stderr":
+                    self.last_error = line[:500]
+                elif line.startswith("{"):
+                    try:
+                        parsed = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(parsed, dict):
+                        self.result = parsed
+
+    def output(self):
+        with self.lock:
+            return "".join(self.chunks)[-OUTPUT_TAIL_CHARS:]
+
+    def heartbeat(self):
+        """Returns: False se o job não é mais desta tentativa"""
+        with db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE worker_jobs
+                SET heartbeat_at = CURRENT_TIMESTAMP, progress = %s, output = %s
+                WHERE id = %s AND locked_by = %s AND attempts = %s
+            """, (self.progress, self.output(), self.job_id, self.runner_id, self.attempts))
+            conn.commit()
+            return cur.rowcount > 0
+
+    def heartbeat_loop(self):
+        while not self.done.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                alive = self.heartbeat()
+            except psycopg2.Error as e:
+                # Banco fora por pouco tempo não derruba o job; se passar de
+                # JOB_STALE_AFTER_S, outro runner o devolve à fila
+                print(f"⚠️ Heartbeat do job #{self.job_id} falhou: {e}", file=sys.__stderr__)
+                continue
+            if not alive:
+                # Devolvido à fila (ou cancelado) enquanto este runner estava
+                # parado: outro runner pode já estar rodando a nova tentativa.
+                # O SIGUSR1 interrompe o worker na thread principal (abandon_job)
+                print(f"⚠️ Job #{self.job_id} não é mais deste runner: abandonando",
+                      file=sys.__stderr__)
+                self.lost.set()
+                signal.pthread_kill(threading.main_thread().ident, signal.SIGUSR1)
+                return
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+
+def finish_job(job, runner_id, code, reporter, error_message=None):
+    """
+    Grava o resultado final do job (só se ele ainda for desta tentativa)
+
+    Returns:
+        Status gravado, ou None se o job não era mais deste runner
+    """
+    status = "completed" if code == 0 else "failed"
+    if status == "failed" and not error_message:
+        error_message = reporter.last_error or f"Worker terminou com código {code}"
+
+    with db.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE worker_jobs
+            SET status = %s, exit_code = %s, result = %s, progress = %s, output = %s,
+                error_message = %s, finished_at = CURRENT_TIMESTAMP,
+                heartbeat_at = CURRENT_TIMESTAMP, locked_by = NULL
+            WHERE id = %s AND locked_by = %s AND attempts = %s
+        """, (status, code, Json(reporter.result) if reporter.result is not None else None,
+              reporter.progress, reporter.output(), error_message, job["id"], runner_id,
+              job["attempts"]))
+        conn.commit()
+        if cur.rowcount == 0:
+            return None
+    return status
+
+
+def remove_files(paths):
+    """Remove os uploads do job (arquivos temporários em uploads/)"""
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠️ Erro ao remover arquivo temporário {path}: {e}")
+
+
+def execute_job(job, runner_id):
+    """Roda um job já pego da fila e grava o resultado"""
+    worker = job["worker"]
+    print(f"▶️ Job #{job['id']}: {worker} {' '.join(map(str, job['args']))} "
+          f"(tentativa {job['attempts']})")
+
+    reporter = JobReporter(job["id"], runner_id, job["attempts"])
+    started = time.monotonic()
+    if worker not in WORKERS:
+        code = 1
+        error_message = f"Worker desconhecido: {worker}"
+    else:
+        reporter.start()
+        _job_running.set()
+        try:
+            try:
+                code = run_job(worker, job["args"], reporter.emit)
+            finally:
+                reporter.stop()
+            _job_running.clear()
+        except JobLost:
+            _job_running.clear()
+        error_message = None
+
+    status = None
+    if not reporter.lost.is_set():
+        status = finish_job(job, runner_id, code, reporter, error_message)
+    if status is None:
+        # Os uploads agora são da tentativa que pegou o job
+        print(f"⏹️ Job #{job['id']} abandonado após {time.monotonic() - started:.1f}s: "
+              f"não é mais deste runner")
+        return
+    remove_files(job["files"])
+    icon = "✅" if status == "completed" else "❌"
+    print(f"{icon} Job #{job['id']} {status} em {time.monotonic() - started:.1f}s")
+
+
+def open_listener():
+    """Conexão fora do pool escutando o canal de jobs novos (None se falhar)"""
+    try:
+        conn = db.connect()
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {JOBS_CHANNEL}")
+        return conn
+    except psycopg2.Error as e:
+        print(f"⚠️ LISTEN {JOBS_CHANNEL} indisponível, só polling: {e}")
+        return None
+
+
+def wait_for_jobs(listener, timeout):
+    """
+    Espera um NOTIFY de job novo ou o timeout
+
+    Returns:
+        O listener (None se a conexão caiu; é reaberto na próxima volta)
+    """
+    if listener is None:
+        _stop.wait(timeout)
+        return open_listener() if not _stop.is_set() else None
+    try:
+        select.select([listener], [], [], timeout)
+        listener.poll()
+        listener.notifies.clear()
+        return listener
+    except (psycopg2.Error, OSError):
+        listener.close()
+        return None
+
+
+def run_loop(runner_id, poll_interval=JOB_POLL_INTERVAL, once=False):
+    """
+    Loop de um processo: reaproveita órfãos, pega um job, roda, repete
+
+    Args:
+        runner_id: Identificação gravada em locked_by (host:pid/n)
+        poll_interval: Espera máxima por jobs novos (segundos)
+        once: Sai quando a fila estiver vazia
+    """
+    listener = None if once else open_listener()
+    while not _stop.is_set():
+        try:
+            with db.connection() as conn:
+                cur = conn.cursor()
+                for job_id, status in requeue_stale(cur):
+                    print(f"♻️ Job #{job_id} sem heartbeat: {status}")
+                job = claim_job(cur, runner_id)
+                conn.commit()
+        except psycopg2.Error as e:
+            print(f"❌ Erro ao consultar a fila: {e}")
+            _stop.wait(poll_interval)
+            continue
+
+        if job:
+            execute_job(job, runner_id)
+        elif once:
+            break
+        else:
+            listener = wait_for_jobs(listener, poll_interval)
+
+    if listener is not None:
+        listener.close()
+
+
+def request_stop(signum, frame):
+    if not _stop.is_set():
+        print(f"🛑 Sinal {signum}: terminando o job em andamento antes de sair")
+    _stop.set()
+
+
+def abandon_job(signum, frame):
+    """SIGUSR1 do heartbeat: o job em andamento não é mais deste runner"""
+    if _job_running.is_set():
+        raise JobLost()
+
+
+def process_main(runner_id, poll_interval, once):
+    """Entrada de cada processo filho"""
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGUSR1, abandon_job)
+    try:
+        run_loop(runner_id, poll_interval, once)
+    finally:
+        db.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executor dos jobs da tabela worker_jobs")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_RUNNER_PROCESSES", "2")),
+                        help="Processos executando jobs em paralelo (padrão: JOB_RUNNER_PROCESSES ou 2)")
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL,
+                        help="Segundos entre consultas à fila sem NOTIFY")
+    parser.add_argument("--once", action="store_true",
+                        help="Processa a fila até esvaziar e sai")
+    args = parser.parse_args()
+
+    # Tabela criada antes dos filhos (CREATE concorrente pode colidir) e
+    # numa conexão avulsa, para nenhum pool ser herdado pelo fork
+    try:
+        conn = db.connect()
+        ensure_jobs_table(conn.cursor())
+        conn.commit()
+        conn.close()
+    except psycopg2.Error as e:
+        print(f"❌ Erro ao preparar a tabela worker_jobs: {e}")
+        sys.exit(1)
+
+    runner_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"🚀 Runner {runner_id} com {args.processes} processo(s)")
+
+    if args.processes <= 1:
+        process_main(runner_id, args.poll_interval, args.once)
+        return
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def start(n):
+        proc = multiprocessing.Process(target=process_main,
+                                       args=(f"{runner_id}/{n}", args.poll_interval, args.once))
+        proc.start()
+        return proc
+
+    procs = {n: start(n) for n in range(1, args.processes + 1)}
+    stopping = False
+    while any(proc.is_alive() for proc in procs.values()):
+        if _stop.is_set() and not stopping:
+            stopping = True
+            for proc in procs.values():
+                if proc.is_alive():
+                    proc.terminate()
+        if not stopping and not args.once:
+            # Processo que caiu (ex.: OOM) é substituído; o job dele volta à fila pelo heartbeat
+            for n, proc in procs.items():
+                if not proc.is_alive():
+                    print(f"⚠️ Processo {runner_id}/{n} saiu com código {proc.exitcode}, reiniciando")
+                    procs[n] = start(n)
+        _stop.wait(1)
+
+    for proc in procs.values():
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,5 +16,27 @@ module.exports = {
     out_file: 'logs/output.log',
     log_file: 'logs/combined.log',
     time: true
+  }, {
+    // Executor dos jobs async=true (tabela worker_jobs). Pode rodar também
+    // em outras máquinas apontando para o mesmo banco, desde que vejam o
+    // diretório uploads/ do Node no mesmo caminho absoluto (armazenamento
+    // compartilhado): os jobs de importação só levam esse caminho e o runner
+    // apaga os arquivos ao terminar
+    name: 'suphelp-geo-jobs',
+    script: 'src/worker_runner.py',
+    interpreter: 'python3',
+    interpreter_args: '-u',
+    cwd: '/home/dev/suphelp-geo/backend',
+    instances: 1,
+    autorestart: true,
+    watch: false,
+    // SIGINT: o runner termina o job em andamento antes de sair
+    kill_timeout: 60000,
+    env: {
+      JOB_RUNNER_PROCESSES: 2
+    },
+    error_file: 'logs/jobs-error.log',
+    out_file: 'logs/jobs-output.log',
+    time: true
   }]
 };